@@ -0,0 +1 @@
+"""Performance benchmarks for the vault CLI (see benchmarks/README.md)."""
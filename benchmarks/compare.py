@@ -0,0 +1,66 @@
+"""Compare two benchmark result files.
+
+Usage::
+
+    python -m benchmarks.compare base.json head.json [--threshold 0.2]
+
+Prints the median time of every benchmark present in both files and exits
+with status 1 if any got slower by more than ``threshold`` (a fraction).
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def load_results(path: str | Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def compare(base: dict, head: dict, threshold: float = 0.2):
+    """
+    Return ``(rows, regressions)`` where each row is
+    ``(name, base_ms, head_ms, ratio)`` for benchmarks in both results.
+    """
+    rows, regressions = [], []
+    for name in sorted(base["results"].keys() & head["results"].keys()):
+        before = base["results"][name]["median_ms"]
+        after = head["results"][name]["median_ms"]
+        ratio = after / before if before else float("inf")
+        rows.append((name, before, after, ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Slowdown fraction reported as a regression",
+    )
+    args = parser.parse_args(argv)
+    base, head = load_results(args.base), load_results(args.head)
+    for side, data in (("base", base), ("head", head)):
+        meta = data.get("meta", {})
+        print(
+            f"{side}: {meta.get('commit')} rows={meta.get('rows')} kdf={meta.get('kdf')}"
+        )
+
+    rows, regressions = compare(base, head, args.threshold)
+    print(f"{'benchmark':<32} {'base ms':>12} {'head ms':>12} {'ratio':>8}")
+    for name, before, after, ratio in rows:
+        flag = "  <-- slower" if name in regressions else ""
+        print(f"{name:<32} {before:12.3f} {after:12.3f} {ratio:8.2f}{flag}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
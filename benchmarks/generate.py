@@ -0,0 +1,168 @@
+"""Deterministic generator for large synthetic vaults.
+
+The same ``seed`` always yields the same projects, environments, keys and
+plaintexts, so results from different commits measure the same workload.
+Ciphertexts differ between runs (IVs and salts are random), which does not
+affect timings.
+
+Rows are encrypted with one salt per project/environment and inserted with
+``executemany`` in batches, so generating 1M rows costs one KDF run per
+environment instead of one per secret.
+"""
+
+import argparse
+import mimetypes
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from vault.crypto.aes import encrypt
+from vault.crypto.fingerprint import FINGERPRINT_CONTEXT, derive_subkey, fingerprint
+from vault.crypto.kdf import KdfParams, derive_key, generate_salt
+from vault.storage.db import VaultDB
+
+BENCH_PASSWORD = "benchmark-password"
+
+# Reduced-cost KDF so large vaults and many unlocks are cheap to benchmark.
+# Never use these parameters for a real vault.
+FAST_KDF = KdfParams.pbkdf2(1000)
+
+FILE_EXTENSIONS = (".jks", ".p12", ".pem", ".json", ".env")
+
+_INSERT = """
+    INSERT OR REPLACE INTO secrets
+    (project, environment, key, value, iv, salt, created_at, updated_at,
+     is_file, filename, size, fingerprint, kind, mime, kdf)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+@dataclass
+class VaultSpec:
+    """Shape of a synthetic vault."""
+
+    rows: int = 10_000
+    projects: int = 50
+    environments: tuple[str, ...] = ("dev", "staging", "prod")
+    file_ratio: float = 0.1
+    file_sizes: tuple[int, ...] = (1024, 16 * 1024, 256 * 1024)
+    text_size: int = 40
+    seed: int = 1234
+    kdf: KdfParams = field(default_factory=lambda: FAST_KDF)
+
+
+def project_name(index: int) -> str:
+    return f"project-{index:05d}"
+
+
+def _plaintexts(spec: VaultSpec):
+    """Yield ``(project, environment, key, plaintext, filename)`` in PK order."""
+    rng = random.Random(spec.seed)
+    environments = sorted(spec.environments)
+    slots = spec.projects * len(environments)
+    per_slot, extra = divmod(spec.rows, slots)
+    for p in range(spec.projects):
+        for e, environment in enumerate(environments):
+            count = per_slot + (1 if p * len(environments) + e < extra else 0)
+            for k in range(count):
+                if rng.random() < spec.file_ratio:
+                    size = rng.choice(spec.file_sizes)
+                    filename = f"file-{k:06d}{rng.choice(FILE_EXTENSIONS)}"
+                    yield project_name(p), environment, filename, rng.randbytes(
+                        size
+                    ), filename
+                else:
+                    value = rng.randbytes(spec.text_size // 2).hex().encode()
+                    yield project_name(p), environment, f"KEY_{k:06d}", value, None
+
+
+def generate_vault(
+    db_path: str,
+    spec: VaultSpec | None = None,
+    password: str = BENCH_PASSWORD,
+    batch_size: int = 5000,
+) -> int:
+    """
+    Populate ``db_path`` with a synthetic vault.
+
+    :param db_path: Vault DB to create or extend
+    :param spec: Shape of the vault (default: ``VaultSpec()``)
+    :param password: Master password for every generated secret
+    :param batch_size: Rows inserted per transaction
+    :return: Number of rows written
+    """
+    spec = spec or VaultSpec()
+    now = datetime.now(timezone.utc).isoformat()
+    kdf = spec.kdf.encode()
+    written = 0
+    with VaultDB(db_path, kdf=spec.kdf) as db:
+        fp_key = derive_subkey(db.vault_key(password), FINGERPRINT_CONTEXT)
+        keys = {}
+        batch = []
+        for project, environment, key, data, filename in _plaintexts(spec):
+            slot = keys.get((project, environment))
+            if slot is None:
+                salt = generate_salt()
+                slot = keys[(project, environment)] = (
+                    salt,
+                    derive_key(password, salt, spec.kdf),
+                )
+            salt, key_bytes = slot
+            iv, ciphertext = encrypt(key_bytes, data)
+            batch.append(
+                (
+                    project,
+                    environment,
+                    key,
+                    ciphertext,
+                    iv,
+                    salt,
+                    now,
+                    now,
+                    int(filename is not None),
+                    filename,
+                    len(data),
+                    fingerprint(fp_key, data),
+                    "file" if filename else "text",
+                    mimetypes.guess_type(filename)[0] if filename else None,
+                    kdf,
+                )
+            )
+            if len(batch) >= batch_size:
+                with db.write_transaction():
+                    db.conn.executemany(_INSERT, batch)
+                written += len(batch)
+                batch.clear()
+        if batch:
+            with db.write_transaction():
+                db.conn.executemany(_INSERT, batch)
+            written += len(batch)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic vault DB")
+    parser.add_argument("db_path")
+    parser.add_argument("--rows", type=int, default=VaultSpec.rows)
+    parser.add_argument("--projects", type=int, default=VaultSpec.projects)
+    parser.add_argument("--file-ratio", type=float, default=VaultSpec.file_ratio)
+    parser.add_argument("--seed", type=int, default=VaultSpec.seed)
+    parser.add_argument(
+        "--kdf",
+        default=FAST_KDF.encode(),
+        help="Encoded KDF parameters, e.g. pbkdf2-sha256$i=1000",
+    )
+    args = parser.parse_args(argv)
+    spec = VaultSpec(
+        rows=args.rows,
+        projects=args.projects,
+        file_ratio=args.file_ratio,
+        seed=args.seed,
+        kdf=KdfParams.decode(args.kdf),
+    )
+    rows = generate_vault(args.db_path, spec)
+    print(f"Generated {rows} secrets in {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
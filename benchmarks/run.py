@@ -0,0 +1,484 @@
+"""Run the vault benchmark suite and write JSON results.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.run --rows 100000 --output results/HEAD.json
+    python -m benchmarks.compare results/base.json results/HEAD.json
+
+Every benchmark reports per-operation wall-time statistics in milliseconds.
+All secrets use the reduced-cost KDF from ``--kdf`` so the suite measures
+storage, crypto and I/O rather than key stretching; the ``kdf_*`` entries
+report the KDF cost on its own, including the production default.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.generate import (
+    BENCH_PASSWORD,
+    FAST_KDF,
+    VaultSpec,
+    generate_vault,
+    project_name,
+)
+from vault.crypto.kdf import DEFAULT_KDF, KdfParams, derive_key, generate_salt
+from vault.crypto.stream import ChunkReader, ChunkWriter, default_workers
+from vault.server import SecretService, UnixHTTPConnection, make_server
+from vault.storage.backup import backup_db, encrypt_backup
+from vault.storage.db import VaultDB
+from vault.storage.rekey import rekey_vault
+from vault.storage.workspace import sync_workspace
+
+RESULTS_VERSION = 1
+DEFAULT_FILE_SIZES = (1024, 1024 * 1024, 16 * 1024 * 1024)
+DEFAULT_STREAM_SIZE = 256 * 1024 * 1024
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """Call ``fn`` ``repeat`` times and summarise the wall times in ms."""
+    times = []
+    for i in range(repeat):
+        args = (setup(i),) if setup else ()
+        started = time.perf_counter()
+        fn(*args)
+        times.append(_ms_since(started))
+    return summarize(times)
+
+
+def summarize(times: list[float]) -> dict:
+    times = sorted(times)
+    return {
+        "n": len(times),
+        "min_ms": times[0],
+        "median_ms": statistics.median(times),
+        "mean_ms": statistics.fmean(times),
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "max_ms": times[-1],
+    }
+
+
+class Suite:
+    def __init__(
+        self,
+        workdir: Path,
+        spec: VaultSpec,
+        repeat: int,
+        file_sizes,
+        stream_size: int = DEFAULT_STREAM_SIZE,
+        stream_workers=None,
+    ):
+        self.workdir = workdir
+        self.spec = spec
+        self.repeat = repeat
+        self.file_sizes = file_sizes
+        self.stream_size = stream_size
+        self.stream_workers = stream_workers or sorted({1, default_workers()})
+        self.db_path = workdir / "vault.db"
+        self.results: dict[str, dict] = {}
+        self.rng = random.Random(spec.seed)
+
+    def record(self, name: str, stats: dict, **extra):
+        stats.update(extra)
+        self.results[name] = stats
+        print(f"{name:<32} median {stats['median_ms']:10.3f} ms  (n={stats['n']})")
+
+    def run(self):
+        started = time.perf_counter()
+        rows = generate_vault(str(self.db_path), self.spec)
+        self.record("generate", summarize([_ms_since(started)]), rows=rows)
+        self.bench_kdf()
+        with VaultDB(str(self.db_path), kdf=self.spec.kdf) as db:
+            db.unlock(BENCH_PASSWORD)
+            self.bench_text(db)
+            self.bench_listing(db)
+            self.bench_files(db)
+        self.bench_backup()
+        self.bench_stream()
+        self.bench_workspace_sync()
+        self.bench_rekey()
+        self.bench_cli()
+        self.bench_serve()
+        return self.results
+
+    def bench_kdf(self):
+        salt = generate_salt()
+        for label, params, repeat in (
+            ("bench", self.spec.kdf, self.repeat),
+            ("default", DEFAULT_KDF, min(self.repeat, 5)),
+        ):
+            self.record(
+                f"kdf_{label}",
+                measure(lambda: derive_key(BENCH_PASSWORD, salt, params), repeat),
+                params=params.encode(),
+            )
+
+    def _random_entry(self, db):
+        project = project_name(self.rng.randrange(self.spec.projects))
+        environment = self.rng.choice(sorted(self.spec.environments))
+        return project, environment
+
+    def bench_text(self, db):
+        self.record(
+            "add_text",
+            measure(
+                lambda i: db.add_text_secret(
+                    "bench-add", "dev", f"KEY_{i:06d}", "x" * 40, BENCH_PASSWORD
+                ),
+                self.repeat,
+                setup=lambda i: i,
+            ),
+        )
+        keys = [
+            info.key for info in db.list_entries("bench-add", "dev") if not info.is_file
+        ]
+        self.record(
+            "get_text",
+            measure(
+                lambda key: db.decrypt_secret(
+                    db.get_secret("bench-add", "dev", key), BENCH_PASSWORD
+                ),
+                self.repeat,
+                setup=lambda i: keys[i % len(keys)],
+            ),
+        )
+
+    def bench_listing(self, db):
+        self.record(
+            "list_projects",
+            measure(lambda: sum(1 for _ in db.list_projects()), self.repeat),
+        )
+        self.record(
+            "list_entries",
+            measure(
+                lambda scope: sum(1 for _ in db.list_entries(*scope)),
+                self.repeat,
+                setup=lambda i: self._random_entry(db),
+            ),
+        )
+        self.record(
+            "search_prefix",
+            measure(
+                lambda: sum(1 for _ in db.search_secrets("KEY_0001", mode="prefix")),
+                self.repeat,
+            ),
+        )
+        self.record(
+            "search_regex",
+            measure(
+                lambda: sum(1 for _ in db.search_secrets(r"\.p12$", mode="regex")),
+                min(self.repeat, 5),
+            ),
+        )
+
+    def bench_files(self, db):
+        for size in self.file_sizes:
+            src = self.workdir / f"payload-{size}.bin"
+            src.write_bytes(random.Random(size).randbytes(size))
+            key = src.name
+            repeat = max(1, min(self.repeat, (64 * 1024 * 1024) // size))
+            add = measure(
+                lambda: db.add_file_secret(
+                    "bench-files", "dev", key, str(src), BENCH_PASSWORD
+                ),
+                repeat,
+            )
+            self.record(
+                f"add_file_{size}", add, mb_per_s=_throughput(size, add["median_ms"])
+            )
+            get = measure(
+                lambda: db.decrypt_file_secret(
+                    "bench-files", "dev", key, BENCH_PASSWORD
+                ),
+                repeat,
+            )
+            self.record(
+                f"get_file_{size}", get, mb_per_s=_throughput(size, get["median_ms"])
+            )
+            src.unlink()
+
+    def bench_backup(self):
+        backup_dir = self.workdir / "backups"
+        size = self.db_path.stat().st_size
+
+        def backup_and_encrypt():
+            encrypt_backup(
+                backup_db(str(self.db_path), str(backup_dir)), BENCH_PASSWORD
+            )
+            shutil.rmtree(backup_dir)
+
+        stats = measure(backup_and_encrypt, min(self.repeat, 3))
+        self.record(
+            "backup_encrypt",
+            stats,
+            db_bytes=size,
+            mb_per_s=_throughput(size, stats["median_ms"]),
+        )
+
+    def bench_stream(self):
+        data = random.Random(self.spec.seed).randbytes(self.stream_size)
+        key = bytes(32)
+        sealed = io.BytesIO()
+        with ChunkWriter(sealed, key) as writer:
+            writer.write(data)
+
+        def encrypt(workers):
+            with ChunkWriter(io.BytesIO(), key, workers=workers) as writer:
+                writer.write(data)
+
+        def decrypt(workers):
+            sealed.seek(0)
+            with ChunkReader(sealed, key, workers=workers) as reader:
+                while reader.read(1024 * 1024):
+                    pass
+
+        # workers=1 is the single-threaded baseline
+        for workers in self.stream_workers:
+            for name, fn in (("encrypt", encrypt), ("decrypt", decrypt)):
+                stats = measure(lambda: fn(workers), min(self.repeat, 3))
+                self.record(
+                    f"stream_{name}_w{workers}",
+                    stats,
+                    bytes=self.stream_size,
+                    workers=workers,
+                    gb_per_s=_throughput(self.stream_size, stats["median_ms"]) / 1024,
+                )
+
+    def bench_workspace_sync(self):
+        with VaultDB(str(self.db_path), kdf=self.spec.kdf) as db:
+            project = project_name(0)
+            environment = sorted(self.spec.environments)[0]
+            workspace = self.workdir / "workspace"
+            cold = measure(
+                lambda: sync_workspace(
+                    db, project, environment, BENCH_PASSWORD, workspace, force=True
+                ),
+                min(self.repeat, 3),
+            )
+            self.record("workspace_sync_cold", cold)
+            warm = measure(
+                lambda: sync_workspace(
+                    db, project, environment, BENCH_PASSWORD, workspace
+                ),
+                min(self.repeat, 3),
+            )
+            self.record("workspace_sync_warm", warm)
+            shutil.rmtree(workspace)
+
+    def bench_rekey(self):
+        copy = self.workdir / "rekey.db"
+        shutil.copy2(self.db_path, copy)
+        with VaultDB(str(copy), kdf=self.spec.kdf) as db:
+            rows = db.conn.execute("SELECT COUNT(*) FROM secrets").fetchone()[0]
+            stats = measure(
+                lambda: rekey_vault(db, BENCH_PASSWORD, BENCH_PASSWORD + "-new"), 1
+            )
+        copy.unlink()
+        self.record("rekey", stats, rows=rows)
+
+    def bench_cli(self):
+        config_dir = self.workdir / "cli"
+        config_dir.mkdir(exist_ok=True)
+        (config_dir / "config.json").write_text(
+            json.dumps(
+                {
+                    "vault_db_path": str(self.db_path),
+                    "backup_dir": str(config_dir / "backups"),
+                    "kdf": self.spec.kdf.encode(),
+                    "auto_sweep": False,
+                }
+            )
+        )
+        env = dict(os.environ, VAULT_CONFIG_DIR=str(config_dir), HOME=str(config_dir))
+
+        def vault(*args, stdin=""):
+            subprocess.run(
+                [sys.executable, "-m", "vault.cli", *args],
+                input=stdin.encode(),
+                env=env,
+                check=True,
+                capture_output=True,
+            )
+
+        repeat = min(self.repeat, 10)
+        self.record("cli_cold_start", measure(lambda: vault("--version"), repeat))
+        self.record(
+            "cli_add_get",
+            measure(
+                lambda i: (
+                    vault(
+                        "add",
+                        "bench-cli",
+                        "dev",
+                        f"KEY_{i}",
+                        stdin=f"{BENCH_PASSWORD}\nvalue\nvalue\n",
+                    ),
+                    vault("get", "bench-cli", "dev", f"KEY_{i}", stdin=BENCH_PASSWORD),
+                ),
+                repeat,
+                setup=lambda i: i,
+            ),
+        )
+        self.record(
+            "cli_list_tree",
+            measure(lambda: vault("--readonly", "list", "--tree"), repeat),
+        )
+
+    def bench_serve(self):
+        socket_path = self.workdir / "vault.sock"
+        db = VaultDB(str(self.db_path), kdf=self.spec.kdf, check_same_thread=False)
+        server = make_server(SecretService(db, BENCH_PASSWORD), socket_path=socket_path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        conn = UnixHTTPConnection(socket_path)
+        path = "/v1/secrets/bench-add/dev/KEY_000000"
+
+        def get(headers=None):
+            conn.request("GET", path, headers=headers or {})
+            response = conn.getresponse()
+            response.read()
+            return response
+
+        try:
+            etag = get().getheader("ETag")
+            self.record("serve_get_cached", measure(get, self.repeat))
+            self.record(
+                "serve_get_304",
+                measure(lambda: get({"If-None-Match": etag}), self.repeat),
+            )
+        finally:
+            conn.close()
+            server.shutdown()
+            server.server_close()
+            db.close()
+
+
+def _ms_since(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def _throughput(size: int, ms: float) -> float:
+    return size / (1024 * 1024) / (ms / 1000) if ms else 0.0
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).resolve().parent,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the vault benchmark suite")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--file-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per benchmark")
+    parser.add_argument(
+        "--kdf",
+        default=FAST_KDF.encode(),
+        help="KDF for generated and benchmarked secrets (reduced cost by default)",
+    )
+    parser.add_argument(
+        "--file-sizes",
+        default=",".join(str(s) for s in DEFAULT_FILE_SIZES),
+        help="Comma-separated file-secret sizes in bytes",
+    )
+    parser.add_argument(
+        "--stream-size",
+        type=int,
+        default=DEFAULT_STREAM_SIZE,
+        help="Bytes pushed through the chunked AES-GCM stream benchmarks",
+    )
+    parser.add_argument(
+        "--stream-workers",
+        default=None,
+        help="Comma-separated worker counts for the stream benchmarks "
+        "(default: 1 and one per CPU, at most 8)",
+    )
+    parser.add_argument("--output", "-o", help="Write JSON results to this file")
+    parser.add_argument(
+        "--workdir", help="Keep the generated vault here instead of a temp dir"
+    )
+    args = parser.parse_args(argv)
+
+    spec = VaultSpec(
+        rows=args.rows,
+        projects=args.projects,
+        file_ratio=args.file_ratio,
+        seed=args.seed,
+        kdf=KdfParams.decode(args.kdf),
+    )
+    file_sizes = [int(s) for s in args.file_sizes.split(",") if s]
+    stream_workers = (
+        [int(s) for s in args.stream_workers.split(",") if s]
+        if args.stream_workers
+        else None
+    )
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+        results = Suite(
+            workdir, spec, args.repeat, file_sizes, args.stream_size, stream_workers
+        ).run()
+    else:
+        with tempfile.TemporaryDirectory(prefix="vault-bench-") as tmp:
+            results = Suite(
+                Path(tmp),
+                spec,
+                args.repeat,
+                file_sizes,
+                args.stream_size,
+                stream_workers,
+            ).run()
+
+    report = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "rows": spec.rows,
+            "projects": spec.projects,
+            "file_ratio": spec.file_ratio,
+            "seed": spec.seed,
+            "kdf": spec.kdf.encode(),
+            "repeat": args.repeat,
+            "stream_size": args.stream_size,
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(payload + "\n")
+        print(f"Results written to {args.output}")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
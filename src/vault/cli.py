@@ -1,21 +1,71 @@
 import click
 
-from vault import __version__
+from vault import __version__, tracing
 from vault.commands.backup_commands import register_backup_commands
+from vault.commands.bench_commands import register_bench_commands
+from vault.commands.bundle_commands import register_bundle_commands
 from vault.commands.config_commands import register_config_commands
+from vault.commands.delete_commands import register_delete_commands
+from vault.commands.diff_commands import register_diff_commands
 from vault.commands.file_commands import register_file_commands
 from vault.commands.git_commands import register_git_commands
+from vault.commands.maintenance_commands import register_maintenance_commands
+from vault.commands.promote_commands import register_promote_commands
+from vault.commands.rekey_commands import register_rekey_commands
+from vault.commands.render_commands import register_render_commands
+from vault.commands.search_commands import register_search_commands
+from vault.commands.serve_commands import register_serve_commands
 from vault.commands.setup_commands import register_setup_commands
+from vault.commands.shard_commands import register_shard_commands
+from vault.commands.sync_commands import register_sync_commands
 from vault.commands.text_commands import register_text_commands
 from vault.commands.workspace_commands import register_workspace_commands
-from vault.config import is_initialized
+from vault.config import get_auto_sweep, get_registry_path, is_initialized
+from vault.storage.registry import sweep_expired
 
 
 @click.group(invoke_without_command=True)
 @click.version_option(__version__)
+@click.option(
+    "--readonly",
+    is_flag=True,
+    default=False,
+    envvar="VAULT_READONLY",
+    help="Open the vault DB read-only (no schema, chmod or migration writes)",
+)
+@click.option(
+    "--immutable",
+    is_flag=True,
+    default=False,
+    envvar="VAULT_IMMUTABLE",
+    help="Treat the vault DB as an unchanging snapshot (implies --readonly)",
+)
+@click.option(
+    "--trace",
+    is_flag=True,
+    default=False,
+    envvar="VAULT_TRACE",
+    help="Write per-phase JSON-lines timings (KDF, SQL, AES, I/O) to stderr",
+)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False),
+    default=None,
+    envvar="VAULT_TRACE_FILE",
+    help="Append trace lines to this file instead (implies --trace)",
+)
 @click.pass_context
-def cli(ctx):
+def cli(ctx, readonly, immutable, trace, trace_file):
     """Secure Vault CLI"""
+    if trace or trace_file:
+        tracing.enable(trace_file)
+        ctx.call_on_close(lambda: tracing.disable(command=ctx.invoked_subcommand))
+    ctx.meta["vault.readonly"] = readonly or immutable
+    ctx.meta["vault.immutable"] = immutable
+    if get_auto_sweep():
+        # Wipe plaintext files whose TTL has passed; a no-op index probe otherwise
+        for error in sweep_expired(get_registry_path()).errors.values():
+            click.echo(f"[WARN] {error}", err=True)
     # If no subcommand is provided
     if ctx.invoked_subcommand is None:
         if not is_initialized():
@@ -38,6 +88,18 @@ register_backup_commands(cli)
 register_git_commands(cli)
 register_config_commands(cli)
 register_workspace_commands(cli)
+register_search_commands(cli)
+register_rekey_commands(cli)
+register_bench_commands(cli)
+register_maintenance_commands(cli)
+register_shard_commands(cli)
+register_serve_commands(cli)
+register_bundle_commands(cli)
+register_sync_commands(cli)
+register_render_commands(cli)
+register_diff_commands(cli)
+register_promote_commands(cli)
+register_delete_commands(cli)
 
 
 if __name__ == "__main__":
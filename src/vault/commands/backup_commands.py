@@ -2,29 +2,51 @@ from pathlib import Path
 
 import click
 
-from vault.config import get_backup_dir, get_db_path, require_setup
+from vault.config import (
+    create_backups,
+    get_backup_dir,
+    get_crypto_workers,
+    open_db,
+    require_setup,
+)
 from vault.crypto.utils import prompt_password
-from vault.storage.backup import backup_db
+from vault.exceptions import VaultError
 from vault.storage.backup import decrypt_backup as decrypt_backup_fn
 from vault.storage.backup import encrypt_backup
+from vault.storage.restore import RESTORE_STRATEGIES, restore_backup
 
 
 def register_backup_commands(cli):
 
+    project_option = click.option(
+        "--project",
+        "projects",
+        multiple=True,
+        help="Only back up this project's shard (sharded vaults; repeatable)",
+    )
+
     @cli.command()
-    def backup():
+    @project_option
+    def backup(projects):
         """
         Backup the vault DB locally and print the path.
 
         Example:
             vault backup
+            vault backup --project myapp
         """
         require_setup()
-        path = backup_db(get_db_path(), backup_dir=get_backup_dir())
-        click.echo(f"Backup created at {path}")
+        try:
+            paths = create_backups(projects)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        for path in paths:
+            click.echo(f"Backup created at {path}")
 
     @cli.command("backup_encrypt")
-    def backup_encrypt_cmd():
+    @project_option
+    def backup_encrypt_cmd(projects):
         """
         Backup and encrypt DB with master password.
 
@@ -33,9 +55,21 @@ def register_backup_commands(cli):
         """
         require_setup()
         password = prompt_password()
-        path = backup_db(get_db_path(), backup_dir=get_backup_dir())
-        encrypted = encrypt_backup(path, password)
-        click.echo(f"Encrypted backup created at {encrypted}")
+        try:
+            # Refuse to write a backup nobody could decrypt with the real password
+            with open_db() as db:
+                db.unlock(password)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        try:
+            paths = create_backups(projects)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        for path in paths:
+            encrypted = encrypt_backup(path, password, get_crypto_workers())
+            click.echo(f"Encrypted backup created at {encrypted}")
 
     @cli.command("decrypt_backup")
     @click.argument("encrypted_file", type=click.Path(exists=True))
@@ -51,7 +85,9 @@ def register_backup_commands(cli):
         """
         require_setup()
         password = prompt_password()
-        decrypted_file = decrypt_backup_fn(encrypted_file, password)
+        decrypted_file = decrypt_backup_fn(
+            encrypted_file, password, get_crypto_workers()
+        )
 
         # Restore to original extension if possible
         orig_ext = Path(encrypted_file).stem.split(".")[-1] or ".db"
@@ -61,3 +97,38 @@ def register_backup_commands(cli):
         )
         decrypted_file.rename(decrypted_path)
         click.echo(f"Decrypted backup written to: {decrypted_path}")
+
+    @cli.command()
+    @click.argument("backup_path", type=click.Path(exists=True))
+    @click.option("--project", default=None, help="Only restore this project")
+    @click.option("--env", "environment", default=None, help="Only this environment")
+    @click.option("--key", default=None, help="Only this key")
+    @click.option(
+        "--strategy",
+        type=click.Choice(RESTORE_STRATEGIES),
+        default="newer",
+        show_default=True,
+        help="newer: restore missing and older rows; overwrite: replace existing "
+        "rows; missing: only restore rows that no longer exist",
+    )
+    def restore(backup_path, project, environment, key, strategy):
+        """
+        Merge rows from a backup (.db, .enc or sharded backup directory) into the vault.
+
+        Example:
+            vault restore backups/vault_backup_20251213_123456.enc --project myapp --env prod
+        """
+        require_setup()
+        try:
+            password = prompt_password()
+            db = open_db()
+            result = restore_backup(
+                db, backup_path, password, project, environment, key, strategy
+            )
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        click.echo(
+            f"Restored {result.restored} of {result.matched} matching secret(s) "
+            f"({result.unchanged} left as they are)."
+        )
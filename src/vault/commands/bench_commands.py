@@ -0,0 +1,53 @@
+import click
+
+from vault.config import set_config
+from vault.constants import KDF_TARGET_MS
+from vault.crypto.kdf import KDF_ALGORITHMS, calibrate, time_kdf
+from vault.exceptions import VaultError
+
+
+def register_bench_commands(cli):
+
+    @cli.group("bench")
+    def bench_group():
+        """Measure and tune vault performance on this host."""
+
+    @bench_group.command("kdf")
+    @click.option(
+        "--target-ms",
+        type=click.FloatRange(min=1),
+        default=KDF_TARGET_MS,
+        show_default=True,
+        help="Desired unlock latency per key derivation",
+    )
+    @click.option(
+        "--algorithm",
+        type=click.Choice(KDF_ALGORITHMS),
+        default="pbkdf2-sha256",
+        show_default=True,
+    )
+    @click.option(
+        "--save",
+        is_flag=True,
+        default=False,
+        help="Use the calibrated parameters for new secrets on this host",
+    )
+    def bench_kdf(target_ms, algorithm, save):
+        """
+        Calibrate KDF parameters for a target unlock latency.
+
+        Existing secrets keep their recorded parameters and are re-encrypted
+        under the saved ones the next time they are decrypted.
+
+        Example:
+            vault bench kdf --target-ms 500 --algorithm scrypt --save
+        """
+        try:
+            params = calibrate(target_ms, algorithm)
+            measured = time_kdf(params, rounds=3) * 1000
+            click.echo(f"{params.encode()} ({measured:.0f} ms per derivation)")
+            if save:
+                set_config("kdf", params.encode())
+                click.echo("Saved as the KDF for new secrets (config key `kdf`).")
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
@@ -0,0 +1,86 @@
+import click
+
+from vault.config import get_crypto_workers, open_db, require_setup
+from vault.crypto.utils import prompt_password
+from vault.exceptions import VaultError
+from vault.storage.bundle import CONFLICT_POLICIES, export_bundle, import_bundle
+
+
+def register_bundle_commands(cli):
+
+    @cli.group("bundle")
+    def bundle_group():
+        """Move a project's secrets between vaults in one encrypted file."""
+
+    @bundle_group.command("export")
+    @click.argument("project")
+    @click.argument("environment", required=False)
+    @click.option(
+        "-o",
+        "--output",
+        type=click.Path(dir_okay=False, allow_dash=True),
+        default=None,
+        help="Bundle file to write, or - for stdout (default: PROJECT[-ENV].vaultbundle)",
+    )
+    def bundle_export(project, environment, output):
+        """
+        Export a project (or one environment) to a bundle file.
+
+        Example:
+            vault bundle export myapp prod -o myapp-prod.vaultbundle
+        """
+        require_setup()
+        if output is None:
+            scope = f"{project}-{environment}" if environment else project
+            output = f"{scope}.vaultbundle"
+        try:
+            password = prompt_password()
+            db = open_db()
+            count = export_bundle(
+                db,
+                output,
+                password,
+                project,
+                environment,
+                workers=get_crypto_workers(),
+            )
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}", err=True)
+            return
+        if count == 0:
+            click.echo(f"[WARN] No secrets found for {project}", err=True)
+        if output != "-":
+            click.echo(f"Exported {count} secret(s) to {output}")
+
+    @bundle_group.command("import")
+    @click.argument(
+        "bundle_file", type=click.Path(exists=True, dir_okay=False, allow_dash=True)
+    )
+    @click.option(
+        "--on-conflict",
+        type=click.Choice(CONFLICT_POLICIES),
+        default="skip",
+        show_default=True,
+        help="Existing secrets: keep them, overwrite them, or keep the newer one",
+    )
+    def bundle_import(bundle_file, on_conflict):
+        """
+        Import a bundle in a single transaction (same master password).
+
+        Example:
+            vault bundle import myapp-prod.vaultbundle --on-conflict newer
+        """
+        require_setup()
+        try:
+            password = prompt_password()
+            db = open_db()
+            result = import_bundle(
+                db, bundle_file, password, on_conflict, get_crypto_workers()
+            )
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        click.echo(
+            f"Imported {len(result.added)} new, {len(result.updated)} updated, "
+            f"{len(result.skipped)} skipped."
+        )
@@ -0,0 +1,102 @@
+import click
+
+from vault.config import open_db, require_setup
+from vault.exceptions import VaultError
+from vault.storage.maintenance import reclaim_space
+
+
+def _target(project, environment, key, pattern, project_opt, env_opt):
+    """Resolve the arguments of `vault rm` to (project, environment, key, glob)."""
+    if project_opt or env_opt:
+        if project or environment or key or pattern:
+            raise click.UsageError("Use either PROJECT ENV KEY or --project/--env")
+        if not project_opt:
+            raise click.UsageError("--env needs --project")
+        return project_opt, env_opt, None, None
+    if not (project and environment):
+        raise click.UsageError(
+            "Expected PROJECT ENV KEY, PROJECT ENV --glob, or --project"
+        )
+    if bool(key) == bool(pattern):
+        raise click.UsageError("Give either KEY or --glob")
+    return project, environment, key, pattern
+
+
+def register_delete_commands(cli):
+
+    @cli.command("rm")
+    @click.argument("project", required=False)
+    @click.argument("environment", required=False)
+    @click.argument("key", required=False)
+    @click.option(
+        "--glob", "pattern", default=None, help="Delete keys matching this glob"
+    )
+    @click.option(
+        "--project", "project_opt", default=None, help="Delete a whole project"
+    )
+    @click.option(
+        "--env", "env_opt", default=None, help="With --project: one environment"
+    )
+    @click.option(
+        "--dry-run", is_flag=True, default=False, help="Only list what would be deleted"
+    )
+    @click.option(
+        "--yes", "-y", is_flag=True, default=False, help="Do not ask for confirmation"
+    )
+    def rm(project, environment, key, pattern, project_opt, env_opt, dry_run, yes):
+        """
+        Delete secrets, leaving tombstones so `vault sync` propagates the delete.
+
+        Bulk deletes run in a single transaction. Freed pages are then handed
+        back to the filesystem in small steps, without rewriting the DB.
+
+        Example:
+            vault rm myapp dev OLD_KEY
+            vault rm myapp dev --glob 'LEGACY_*'
+            vault rm --project oldapp --env qa
+        """
+        project, environment, key, pattern = _target(
+            project, environment, key, pattern, project_opt, env_opt
+        )
+        require_setup()
+        try:
+            db = open_db()
+            if key is not None:
+                if dry_run:
+                    found = db.get_secret(project, environment, key) is not None
+                    click.echo(
+                        f"Would delete {project}/{environment}/{key}"
+                        if found
+                        else "Nothing to delete."
+                    )
+                    return
+                if not db.delete_secret(project, environment, key):
+                    click.echo(f"No secret found for {project}/{environment}/{key}")
+                    return
+                click.echo(f"Deleted {project}/{environment}/{key}")
+            else:
+                matches = list(
+                    db.search_secrets(
+                        pattern or "*", "glob", ("key",), project, environment
+                    )
+                )
+                if not matches:
+                    click.echo("Nothing to delete.")
+                    return
+                if dry_run:
+                    for info in matches:
+                        click.echo(f"{info.project}/{info.environment}/{info.key}")
+                    click.echo(f"Would delete {len(matches)} secret(s).")
+                    return
+                if not yes and not click.confirm(
+                    f"Delete {len(matches)} secret(s)?", default=False
+                ):
+                    return
+                deleted = db.delete_secrets(project, environment, pattern)
+                click.echo(f"Deleted {len(deleted)} secret(s).")
+            reclaimed = reclaim_space(db)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        if reclaimed:
+            click.echo(f"Reclaimed {reclaimed} bytes.")
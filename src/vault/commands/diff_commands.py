@@ -0,0 +1,102 @@
+import json
+from dataclasses import asdict
+
+import click
+
+from vault.config import open_db, require_setup
+from vault.crypto.utils import prompt_password
+from vault.exceptions import VaultError
+from vault.storage.diff import backfill_fingerprints, diff_environments
+
+
+def _scopes(args) -> tuple[tuple[str, str], tuple[str, str]]:
+    if len(args) == 3:
+        project, env_a, env_b = args
+        return (project, env_a), (project, env_b)
+    if len(args) == 2 and all(arg.count("/") == 1 for arg in args):
+        a, b = (tuple(arg.split("/")) for arg in args)
+        if all(a) and all(b):
+            return a, b
+    raise click.UsageError(
+        "Expected PROJECT ENV_A ENV_B or PROJECT_A/ENV_A PROJECT_B/ENV_B"
+    )
+
+
+def register_diff_commands(cli):
+
+    @cli.command("diff")
+    @click.argument("scopes", nargs=-1, required=True)
+    @click.option(
+        "--backfill",
+        is_flag=True,
+        default=False,
+        help="First fingerprint older secrets that have none (needs the password)",
+    )
+    @click.option(
+        "--format",
+        "fmt",
+        type=click.Choice(["text", "json"]),
+        default="text",
+        show_default=True,
+        help="Output format",
+    )
+    @click.option(
+        "--exit-code",
+        is_flag=True,
+        default=False,
+        help="Exit with status 1 if the environments differ",
+    )
+    @click.pass_context
+    def diff(ctx, scopes, backfill, fmt, exit_code):
+        """
+        Compare two environments by keyed fingerprint, without decrypting.
+
+        Reports keys missing from the second environment, extra keys in it,
+        and keys whose values are equal or different. No password is needed
+        unless --backfill is given.
+
+        Example:
+            vault diff myapp staging prod
+            vault diff myapp/prod otherapp/prod --format json
+        """
+        a, b = _scopes(scopes)
+        require_setup()
+        try:
+            db = open_db()
+            if backfill:
+                password = prompt_password()
+                filled = backfill_fingerprints(db, password, [a, b])
+                if filled:
+                    click.echo(f"Fingerprinted {filled} older secret(s).", err=True)
+            result = diff_environments(db, a, b)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+
+        if fmt == "json":
+            click.echo(
+                json.dumps({"a": "/".join(a), "b": "/".join(b)} | asdict(result))
+            )
+        else:
+            click.echo(f"--- {'/'.join(a)}")
+            click.echo(f"+++ {'/'.join(b)}")
+            for marker, keys in (
+                ("-", result.missing),
+                ("+", result.extra),
+                ("~", result.different),
+                ("?", result.unknown),
+            ):
+                for key in keys:
+                    click.echo(f"{marker} {key}")
+            click.echo(
+                f"{len(result.equal)} equal, {len(result.different)} different, "
+                f"{len(result.missing)} missing, {len(result.extra)} extra"
+            )
+            if result.unknown:
+                click.echo(
+                    f"{len(result.unknown)} secret(s) have no fingerprint yet; "
+                    "rerun with --backfill to compare them.",
+                    err=True,
+                )
+        if exit_code and not result.in_sync:
+            ctx.exit(1)
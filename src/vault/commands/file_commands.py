@@ -1,10 +1,14 @@
+import os
+import shlex
+import subprocess
+import sys
 from pathlib import Path
 
 import click
 
-from vault.config import get_db_path, require_setup
+from vault.config import open_db, require_setup, track_materialized
 from vault.crypto.utils import prompt_password
-from vault.storage.db import VaultDB
+from vault.exceptions import VaultError
 
 
 def register_file_commands(cli):
@@ -22,9 +26,13 @@ def register_file_commands(cli):
         """
         require_setup()
         password = prompt_password(confirm=True)
-        db = VaultDB(get_db_path())
+        db = open_db()
         key = Path(file).name
-        db.add_file_secret(project, environment, key, file, password)
+        try:
+            db.add_file_secret(project, environment, key, file, password)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
         click.echo(f"File secret {key} added.")
 
     @cli.command("get_file")
@@ -38,22 +46,85 @@ def register_file_commands(cli):
         default=False,
         help="Copy decrypted file into configured workspace directory",
     )
+    @click.option(
+        "--stdout",
+        "to_stdout",
+        is_flag=True,
+        default=False,
+        help="Stream the decrypted bytes to stdout instead of writing a file",
+    )
+    @click.option(
+        "--exec",
+        "exec_cmd",
+        default=None,
+        help="Run CMD with `{}` replaced by an in-memory /proc/self/fd path (Linux)",
+    )
     def get_file(
         project: str,
         environment: str,
         file_name: str,
         output_dir: str,
         to_workspace: bool,
+        to_stdout: bool,
+        exec_cmd: str,
     ):
         """
         Decrypt a file secret and write it to a temporary file.
 
         Use the original filename (including extension) as the key. Example:
             vault get_file myapp dev generalkey.jks
+
+        --stdout and --exec never write the plaintext to disk:
+            vault get_file myapp prod key.jks --stdout | keytool ...
+            vault get_file myapp prod key.jks --exec "keytool -list -keystore {}"
         """
         require_setup()
+        if (to_stdout or exec_cmd is not None) and (to_workspace or output_dir):
+            raise click.UsageError(
+                "--stdout/--exec cannot be combined with --output-dir or --to-workspace"
+            )
+        if exec_cmd is not None:
+            try:
+                command = shlex.split(exec_cmd)
+            except ValueError as e:
+                raise click.UsageError(f"Invalid --exec command: {e}")
+            if not command:
+                # The file's path alone would run the decrypted secret itself
+                raise click.UsageError("--exec needs a command")
         password = prompt_password()
-        db = VaultDB(get_db_path())
+        db = open_db()
+        if to_stdout:
+            try:
+                db.write_file_secret_to(
+                    project,
+                    environment,
+                    file_name,
+                    password,
+                    sys.stdout.buffer,
+                )
+            except VaultError as e:
+                raise click.ClickException(str(e))
+            return
+        if exec_cmd is not None:
+            try:
+                fd = db.open_file_secret_memfd(
+                    project, environment, file_name, password
+                )
+            except VaultError as e:
+                raise click.ClickException(str(e))
+            try:
+                fd_path = f"/proc/self/fd/{fd}"
+                args = [arg.replace("{}", fd_path) for arg in command]
+                if "{}" not in exec_cmd:
+                    args.append(fd_path)
+                code = subprocess.run(args, pass_fds=(fd,)).returncode
+            except OSError as e:
+                click.echo(f"[ERROR] Cannot run {args[0]}: {e.strerror}")
+                # What a shell returns for a command it cannot run
+                code = 127
+            finally:
+                os.close(fd)
+            click.get_current_context().exit(code)
         # file_name is the key used when storing the file (basename with extension)
         # If user requests to copy to workspace, ensure workspace is configured
         workspace_dir = None
@@ -88,6 +159,7 @@ def register_file_commands(cli):
             output_dir if not to_workspace else workspace_dir,
         )
 
+        origin = f"{project}/{environment}/{file_name}"
         if to_workspace and workspace_dir:
             # Move temp to final name in workspace, overwrite if confirmed
             dest = Path(workspace_dir) / Path(file_name).name
@@ -102,6 +174,8 @@ def register_file_commands(cli):
                 else:
                     dest.unlink()
             Path(temp_path).replace(dest)
+            track_materialized([(dest, origin)], workspace=True)
             click.echo(f"Decrypted file copied to workspace: {dest}")
         else:
+            track_materialized([(temp_path, origin)])
             click.echo(f"Decrypted file written to {temp_path}")
@@ -3,15 +3,22 @@ from pathlib import Path
 
 import click
 
+from vault import tracing
 from vault.config import (
-    get_backup_dir,
-    get_db_path,
+    create_backups,
+    get_crypto_workers,
     get_git_repo_path,
+    open_db,
     require_setup,
     set_config,
 )
 from vault.crypto.utils import prompt_password
-from vault.storage.backup import backup_db, encrypt_backup
+from vault.storage.backup import encrypt_backup
+
+
+def _git(repo_path: Path, *args: str):
+    with tracing.span("git", command=args[0]):
+        subprocess.run(["git", *args], cwd=str(repo_path), check=True)
 
 
 def register_git_commands(cli):
@@ -28,6 +35,8 @@ def register_git_commands(cli):
         require_setup()
         try:
             password = prompt_password()
+            with open_db() as db:
+                db.unlock(password)
             repo = get_git_repo_path()
             if not repo:
                 if click.confirm(
@@ -44,9 +53,11 @@ def register_git_commands(cli):
                         "No git repo configured; run `vault config set git_repo_path <path>` to configure it."
                     )
 
-            # Create a backup in backup_dir and encrypt
-            backup_path = backup_db(get_db_path(), backup_dir=get_backup_dir())
-            encrypted_file = encrypt_backup(backup_path, password)
+            # Create a backup in backup_dir and encrypt (one file per shard)
+            encrypted_files = [
+                encrypt_backup(path, password, get_crypto_workers())
+                for path in create_backups()
+            ]
 
             # Copy encrypted file into repo and git add/commit/push
             if repo:
@@ -57,17 +68,19 @@ def register_git_commands(cli):
                 raise click.ClickException(
                     f"Configured git repo path not found: {repo}"
                 )
-            # move the encrypted file into repo
-            dest = repo_path / encrypted_file.name
-            encrypted_file.replace(dest)
+            # move the encrypted files into repo
+            dests = []
+            for encrypted_file in encrypted_files:
+                dest = repo_path / encrypted_file.name
+                encrypted_file.replace(dest)
+                dests.append(dest)
 
-            subprocess.run(["git", "add", str(dest)], cwd=str(repo_path), check=True)
-            subprocess.run(
-                ["git", "commit", "-m", message], cwd=str(repo_path), check=True
-            )
-            subprocess.run(["git", "push"], cwd=str(repo_path), check=True)
+            _git(repo_path, "add", *(str(dest) for dest in dests))
+            _git(repo_path, "commit", "-m", message)
+            _git(repo_path, "push")
 
-            click.echo(f"Pushed encrypted backup to remote repo: {dest}")
+            for dest in dests:
+                click.echo(f"Pushed encrypted backup to remote repo: {dest}")
         except subprocess.CalledProcessError as e:
             click.echo(f"[ERROR] Git push failed: {e}")
         except Exception as e:
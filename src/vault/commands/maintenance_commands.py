@@ -0,0 +1,114 @@
+import json
+from dataclasses import asdict
+
+import click
+
+from vault.config import open_db, require_setup
+from vault.exceptions import VaultError
+from vault.storage.maintenance import collect_stats, optimize
+
+
+def _format_bytes(size: int | None) -> str:
+    if size is None:
+        return "?"
+    value = float(size)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024 or unit == "GiB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def register_maintenance_commands(cli):
+
+    @cli.command()
+    @click.option(
+        "--format",
+        "output_format",
+        type=click.Choice(["text", "json"]),
+        default="text",
+        show_default=True,
+    )
+    def stats(output_format):
+        """
+        Show vault size breakdown and DB health (nothing is decrypted).
+
+        Example:
+            vault --readonly stats
+        """
+        require_setup()
+        try:
+            db = open_db()
+            result = collect_stats(db)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+
+        if output_format == "json":
+            click.echo(json.dumps(asdict(result) | {"free_bytes": result.free_bytes}))
+            return
+
+        click.echo(f"Secrets: {result.rows} ({result.files} files)")
+        click.echo(
+            f"DB file: {_format_bytes(result.db_bytes)}, "
+            f"{result.page_count} pages of {result.page_size} B, "
+            f"{result.freelist_count} free ({_format_bytes(result.free_bytes)})"
+        )
+        click.echo(f"WAL: {_format_bytes(result.wal_bytes)}")
+        if result.scopes:
+            click.echo("Rows per project/environment:")
+            for scope in result.scopes:
+                click.echo(
+                    f"  {scope.project}/{scope.environment}: {scope.rows} rows, "
+                    f"{scope.files} files, {_format_bytes(scope.stored_bytes)} stored"
+                )
+        if result.histogram:
+            click.echo("Stored blob sizes:")
+            for bound, count in result.histogram:
+                click.echo(f"  <= {_format_bytes(bound):>10}: {count}")
+        click.echo("Tables and indexes:")
+        for obj in result.objects:
+            kind = "index" if obj.is_index else "table"
+            line = f"  {obj.name} ({kind}): {_format_bytes(obj.bytes)}"
+            if obj.pages is not None:
+                line += f" in {obj.pages} pages"
+            if obj.stat:
+                line += f", stat1 {obj.stat}"
+            click.echo(line)
+
+    @cli.command("optimize")
+    @click.option(
+        "--vacuum",
+        is_flag=True,
+        default=False,
+        help="Also rebuild the DB file to return free pages to the filesystem",
+    )
+    def optimize_cmd(vacuum):
+        """
+        Checkpoint the WAL, refresh query planner statistics and reclaim free
+        pages (incrementally, or with a full VACUUM).
+
+        Example:
+            vault optimize --vacuum
+        """
+        require_setup()
+        try:
+            db = open_db()
+            result = optimize(db, vacuum=vacuum)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        for step, seconds in result.timings.items():
+            click.echo(f"{step}: {seconds * 1000:.1f} ms")
+        if result.converted:
+            click.echo(f"Switched {result.converted} DB file(s) to incremental vacuum.")
+        if result.unconverted:
+            click.echo(
+                f"{result.unconverted} DB file(s) predate incremental vacuum; run "
+                "`vault optimize --vacuum` once so deletes can shrink them."
+            )
+        click.echo(
+            f"Size {_format_bytes(result.bytes_before)} -> "
+            f"{_format_bytes(result.bytes_after)} "
+            f"(reclaimed {_format_bytes(max(result.reclaimed, 0))}) in "
+            f"{sum(result.timings.values()) * 1000:.1f} ms"
+        )
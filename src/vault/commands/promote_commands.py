@@ -0,0 +1,65 @@
+import click
+
+from vault.config import open_db, require_setup
+from vault.exceptions import VaultError
+from vault.storage.bundle import CONFLICT_POLICIES
+from vault.storage.promote import promote_secrets
+
+
+def register_promote_commands(cli):
+
+    @cli.command("promote")
+    @click.argument("project")
+    @click.argument("source")
+    @click.argument("target")
+    @click.option(
+        "--keys",
+        "patterns",
+        multiple=True,
+        help="Only promote keys matching this glob (repeatable)",
+    )
+    @click.option(
+        "--on-conflict",
+        type=click.Choice(CONFLICT_POLICIES),
+        default="skip",
+        show_default=True,
+        help="Keys already in TARGET: keep them, overwrite them, or keep the newer one",
+    )
+    @click.option(
+        "--dry-run",
+        is_flag=True,
+        default=False,
+        help="Only show what would be promoted",
+    )
+    def promote(project, source, target, patterns, on_conflict, dry_run):
+        """
+        Copy secrets from one environment of a project to another.
+
+        The encrypted rows are copied in a single transaction, so nothing is
+        decrypted and a promotion is applied entirely or not at all.
+
+        Example:
+            vault promote myapp dev staging --keys 'API_*' --dry-run
+            vault promote myapp staging prod --on-conflict overwrite
+        """
+        require_setup()
+        try:
+            db = open_db()
+            result = promote_secrets(
+                db, project, source, target, patterns, on_conflict, dry_run
+            )
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        for marker, keys in (
+            ("+", result.added),
+            ("~", result.updated),
+            ("=", result.skipped),
+        ):
+            for key in keys:
+                click.echo(f"{marker} {key}")
+        prefix = "Would promote" if dry_run else "Promoted"
+        click.echo(
+            f"{prefix} {len(result.added)} new, {len(result.updated)} updated, "
+            f"{len(result.skipped)} skipped: {project}/{source} -> {project}/{target}"
+        )
@@ -0,0 +1,70 @@
+import click
+
+from vault.config import open_db, require_setup
+from vault.crypto.utils import prompt_password
+from vault.exceptions import VaultError
+from vault.storage.rekey import abort_rekey, rekey_in_progress, rekey_vault
+
+
+def register_rekey_commands(cli):
+
+    @cli.command()
+    @click.option(
+        "--workers",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Re-encryption processes (default: one per CPU)",
+    )
+    @click.option(
+        "--batch-size",
+        type=click.IntRange(min=1),
+        default=256,
+        show_default=True,
+        help="Secrets committed per transaction",
+    )
+    @click.option(
+        "--abort",
+        "abort",
+        is_flag=True,
+        default=False,
+        help="Discard an interrupted rekey and keep the old password",
+    )
+    def rekey(workers, batch_size, abort):
+        """
+        Change the master password by re-encrypting every secret.
+
+        Work is checkpointed in batches; rerun the command after an interruption
+        to resume. The old password keeps working until the final cutover.
+
+        Example:
+            vault rekey --workers 8
+        """
+        require_setup()
+        try:
+            db = open_db()
+            if abort:
+                abort_rekey(db)
+                click.echo("Aborted rekey; the vault still uses the old password.")
+                return
+            if rekey_in_progress(db):
+                click.echo("Resuming interrupted rekey.")
+            old_password = prompt_password(prompt="Current master password: ")
+            new_password = prompt_password(confirm=True, prompt="New master password: ")
+
+            def report(p):
+                click.echo(
+                    f"Re-encrypted {p.done}/{p.total} secrets ({p.rate:.1f}/s)",
+                    err=True,
+                )
+
+            count = rekey_vault(
+                db,
+                old_password,
+                new_password,
+                workers=workers,
+                batch_size=batch_size,
+                progress=report,
+            )
+            click.echo(f"Rekeyed {count} secrets; the new master password is active.")
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import click
+
+from vault.config import open_db, require_setup
+from vault.crypto.utils import prompt_password
+from vault.exceptions import VaultError
+from vault.storage.render import STDOUT, render_templates
+
+# Template suffixes dropped from output names when rendering into a directory
+TEMPLATE_SUFFIXES = (".tmpl", ".tpl", ".template")
+
+
+def _output_name(template: str) -> str:
+    name = Path(template).name
+    for suffix in TEMPLATE_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def register_render_commands(cli):
+
+    @cli.command("render")
+    @click.argument(
+        "templates",
+        nargs=-1,
+        required=True,
+        type=click.Path(exists=True, dir_okay=False),
+    )
+    @click.option(
+        "-o",
+        "--output",
+        default=None,
+        help="Output file ('-' for stdout, the default) or, for several "
+        "templates, output directory",
+    )
+    @click.option(
+        "--workers",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Parallel decryption threads",
+    )
+    def render(templates, output, workers):
+        """
+        Render templates, replacing {{ vault:PROJECT/ENV/KEY }} with secrets.
+
+        All templates are read first, and every distinct reference is fetched
+        and decrypted in one pass with a single password prompt. Output
+        files are written atomically with 0600 permissions. Nothing is
+        written if any reference is missing.
+
+        Example:
+            vault render application.yml.tmpl -o application.yml
+            vault render k8s/*.tmpl -o build/
+        """
+        require_setup()
+        if len(templates) == 1:
+            jobs = [(templates[0], output or STDOUT)]
+        elif output is None or output == STDOUT:
+            raise click.UsageError("Rendering several templates needs -o DIRECTORY")
+        elif Path(output).exists() and not Path(output).is_dir():
+            raise click.UsageError(f"{output} is not a directory")
+        else:
+            jobs = [(t, Path(output) / _output_name(t)) for t in templates]
+            names = [dest for _, dest in jobs]
+            if len(set(names)) != len(names):
+                raise click.UsageError("Several templates render to the same file")
+        try:
+            password = prompt_password()
+            with open_db() as db:
+                result = render_templates(db, password, jobs, workers=workers)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        for text in result.output:
+            click.echo(text, nl=False)
+        for dest in result.written:
+            click.echo(f"Rendered {dest}", err=True)
+        if result.written:
+            click.echo(
+                f"Rendered {len(result.written)} file(s) "
+                f"with {result.secrets} secret(s).",
+                err=True,
+            )
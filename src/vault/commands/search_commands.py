@@ -0,0 +1,54 @@
+import click
+
+from vault.config import open_db, require_setup
+from vault.exceptions import VaultError
+from vault.storage.db import SEARCH_FIELDS, SEARCH_MODES
+
+
+def register_search_commands(cli):
+
+    @cli.command()
+    @click.argument("pattern")
+    @click.option(
+        "--mode",
+        type=click.Choice(SEARCH_MODES),
+        default="glob",
+        show_default=True,
+        help="How PATTERN is matched",
+    )
+    @click.option(
+        "--field",
+        "fields",
+        multiple=True,
+        type=click.Choice(SEARCH_FIELDS),
+        help="Metadata column to match (repeatable; default: all)",
+    )
+    @click.option("--project", default=None, help="Only search this project")
+    @click.option("--env", "environment", default=None, help="Only search this env")
+    def search(pattern, mode, fields, project, environment):
+        """
+        Search key names and metadata across all projects (nothing is decrypted).
+
+        Example:
+            vault search 'STRIPE_*'
+            vault search --mode prefix --field key STRIPE
+        """
+        require_setup()
+        try:
+            db = open_db()
+            matches = db.search_secrets(
+                pattern,
+                mode=mode,
+                fields=fields or SEARCH_FIELDS,
+                project=project,
+                environment=environment,
+            )
+            count = 0
+            for info in matches:
+                kind = "File" if info.is_file else "Text"
+                click.echo(f"- {info.project}/{info.environment}/{info.key} ({kind})")
+                count += 1
+            if not count:
+                click.echo("No secrets found.")
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
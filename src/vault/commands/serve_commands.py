@@ -0,0 +1,99 @@
+import os
+import secrets
+
+import click
+
+from vault.config import (
+    get_serve_cache_ttl,
+    get_serve_socket_path,
+    get_serve_token_path,
+    open_db,
+    require_setup,
+)
+from vault.crypto.utils import prompt_password
+from vault.exceptions import VaultError
+from vault.server import SecretService, make_server
+
+
+def _write_token(path) -> str:
+    token = secrets.token_urlsafe(32)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+
+def register_serve_commands(cli):
+
+    @cli.command()
+    @click.option(
+        "--socket",
+        "socket_path",
+        type=click.Path(dir_okay=False),
+        default=None,
+        help="Unix socket to listen on (default: vault.sock in the config dir)",
+    )
+    @click.option(
+        "--port",
+        type=click.IntRange(min=0, max=65535),
+        default=None,
+        help="Listen on 127.0.0.1:PORT instead (clients need the bearer token)",
+    )
+    @click.option(
+        "--cache-ttl",
+        type=click.FloatRange(min=0),
+        default=None,
+        help="Seconds to cache decrypted values (default: serve_cache_ttl or 60)",
+    )
+    def serve(socket_path, port, cache_ttl):
+        """
+        Serve secrets to local processes over a Unix socket or loopback HTTP.
+
+        Prompts for the master password once; lookups are then answered from
+        one open DB and a TTL cache, with ETags for cheap polling.
+
+        Example:
+            vault --readonly serve --socket /run/myapp/vault.sock
+        """
+        require_setup()
+        if socket_path and port is not None:
+            click.echo("[ERROR] Use either --socket or --port, not both.")
+            return
+        try:
+            password = prompt_password()
+            db = open_db(check_same_thread=False)
+            service = SecretService(
+                db,
+                password,
+                cache_ttl=get_serve_cache_ttl() if cache_ttl is None else cache_ttl,
+            )
+            if port is not None:
+                token_path = get_serve_token_path()
+                server = make_server(service, port=port, token=_write_token(token_path))
+                host, bound = server.server_address[:2]
+                click.echo(f"Serving on http://{host}:{bound} (token in {token_path})")
+            else:
+                socket_path = socket_path or get_serve_socket_path()
+                server = make_server(service, socket_path=socket_path)
+                click.echo(f"Serving on unix:{socket_path}")
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        except OSError as e:
+            # Binding failed: port in use, no permission, ...
+            click.echo(f"[ERROR] Cannot listen: {e.strerror or e}")
+            return
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if port is None:
+                try:
+                    os.unlink(socket_path)
+                except OSError:
+                    pass
+            db.close()
+            click.echo("Server stopped.")
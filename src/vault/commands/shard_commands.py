@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import click
+
+from vault.config import (
+    get_db_path,
+    get_layout,
+    open_db,
+    require_setup,
+    set_config,
+)
+from vault.exceptions import VaultError
+from vault.storage.shards import ShardedVaultDB, is_sharded, split_vault
+
+
+def register_shard_commands(cli):
+
+    @cli.group("shard")
+    def shard_group():
+        """Per-project DB files (sharded layout)."""
+
+    @shard_group.command("split")
+    @click.option(
+        "--catalog",
+        type=click.Path(dir_okay=False),
+        default=None,
+        help="Catalog DB to create (default: catalog.db next to the vault DB)",
+    )
+    def shard_split(catalog):
+        """
+        Convert the vault to one DB file per project.
+
+        Ciphertext is copied as-is, so no password is needed. The old vault.db
+        is left in place; remove it once the sharded vault checks out.
+
+        Example:
+            vault shard split
+        """
+        require_setup()
+        if get_layout() == "sharded" or is_sharded(get_db_path()):
+            click.echo("[ERROR] Vault is already sharded.")
+            return
+        source = Path(get_db_path())
+        catalog_path = Path(catalog) if catalog else source.parent / "catalog.db"
+        try:
+            with open_db() as db:
+                # Bring the source schema up to date before copying rows
+                projects = list(db.list_projects())
+            with split_vault(str(source), str(catalog_path)) as sharded:
+                shards = list(sharded.shards())
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        set_config("vault_db_path", str(catalog_path))
+        set_config("layout", "sharded")
+        click.echo(
+            f"Split {len(projects)} project(s) into {len(shards)} shard(s) "
+            f"under {catalog_path.parent}"
+        )
+        click.echo(f"The previous vault is still at {source}.")
+
+    @shard_group.command("list")
+    def shard_list():
+        """
+        List projects and their shard files.
+
+        Example:
+            vault shard list
+        """
+        require_setup()
+        try:
+            with open_db() as db:
+                if not isinstance(db, ShardedVaultDB):
+                    click.echo("Vault is not sharded (run `vault shard split`).")
+                    return
+                for project, path in db.shards():
+                    size = path.stat().st_size if path.exists() else 0
+                    click.echo(f"- {project}: {path.name} ({size} B)")
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
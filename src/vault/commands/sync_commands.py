@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import click
+
+from vault.config import get_crypto_workers, get_lock_timeout, open_db, require_setup
+from vault.crypto.utils import prompt_password
+from vault.exceptions import VaultError
+from vault.storage.bundle import MAGIC, import_bundle
+from vault.storage.sync import SYNC_STRATEGIES, open_vault, sync_vaults
+
+
+def _is_bundle(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def register_sync_commands(cli):
+
+    @cli.command("sync")
+    @click.argument("other", type=click.Path(exists=True, dir_okay=False))
+    @click.option(
+        "--strategy",
+        type=click.Choice(SYNC_STRATEGIES),
+        default="newer",
+        show_default=True,
+        help="Keys changed in both vaults: keep the last write, or only report them",
+    )
+    def sync_cmd(other, strategy):
+        """
+        Sync this vault with another vault DB (or pull from a bundle).
+
+        Only environments whose digests differ are compared, and only the
+        changed encrypted rows are copied, in both directions. Both vaults must
+        use the same master password. A bundle is read-only: its secrets are
+        imported when newer than the local copies.
+
+        Example:
+            vault sync /mnt/share/vault.db
+            vault sync myapp.vaultbundle
+        """
+        require_setup()
+        try:
+            password = prompt_password()
+            with open_db() as db:
+                if _is_bundle(other):
+                    result = import_bundle(
+                        db, other, password, "newer", get_crypto_workers()
+                    )
+                    click.echo(
+                        f"Pulled {len(result.added) + len(result.updated)} secret(s) "
+                        f"from bundle {Path(other).name}; "
+                        f"{len(result.skipped)} already up to date."
+                    )
+                    return
+                with open_vault(other, lock_timeout=get_lock_timeout()) as peer:
+                    result = sync_vaults(db, peer, password, strategy)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        if result.in_sync:
+            click.echo("Already in sync.")
+            return
+        for name in result.pulled:
+            click.echo(f"<- {name}")
+        for name in result.pushed:
+            click.echo(f"-> {name}")
+        click.echo(
+            f"Pulled {len(result.pulled)}, pushed {len(result.pushed)} "
+            f"({result.scanned} environment(s) compared)."
+        )
+        if result.conflicts:
+            verb = "resolved by last write" if strategy == "newer" else "left as is"
+            click.echo(f"{len(result.conflicts)} conflict(s) {verb}:", err=True)
+            for name in result.conflicts:
+                click.echo(f"  {name}", err=True)
@@ -1,9 +1,10 @@
+import json
+
 import click
 
-from vault.config import get_db_path, require_setup
+from vault.config import open_db, require_setup
 from vault.crypto.utils import prompt_password
 from vault.exceptions import VaultError
-from vault.storage.db import VaultDB
 
 
 def register_text_commands(cli):
@@ -26,37 +27,8 @@ def register_text_commands(cli):
             value = click.prompt(
                 "Secret value", hide_input=True, confirmation_prompt=True
             )
-            db = VaultDB(get_db_path())
-
-            # Encrypt value
-            existing = db.get_secret(project, environment, key)
-            salt = existing.salt if existing else None
-            if not salt:
-                from vault.crypto.kdf import generate_salt
-
-                salt = generate_salt()
-            from vault.crypto.aes import encrypt
-            from vault.crypto.kdf import derive_key
-
-            key_bytes = derive_key(password, salt)
-            from datetime import datetime, timezone
-
-            iv, ciphertext = encrypt(key_bytes, value.encode("utf-8"))
-
-            from vault.storage.models import SecretRecord
-
-            record = SecretRecord(
-                project=project,
-                environment=environment,
-                key=key,
-                value=ciphertext,
-                iv=iv,
-                salt=salt,
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
-                is_file=False,
-            )
-            db.add_secret(record)
+            db = open_db()
+            db.add_text_secret(project, environment, key, value, password)
             click.echo(f"Text secret {key} added to {project}/{environment}.")
         except VaultError as e:
             click.echo(f"[ERROR] {e}")
@@ -81,16 +53,12 @@ def register_text_commands(cli):
         require_setup()
         try:
             password = prompt_password()
-            db = VaultDB(get_db_path())
+            db = open_db()
             record = db.get_secret(project, environment, key)
             if not record or record.is_file:
                 click.echo(f"No text secret found for {project}/{environment}/{key}")
                 return
-            from vault.crypto.aes import decrypt
-            from vault.crypto.kdf import derive_key
-
-            key_bytes = derive_key(password, record.salt)
-            plaintext = decrypt(key_bytes, record.iv, record.value)
+            plaintext = db.decrypt_secret(record, password)
             if show:
                 click.echo(f"{key} = {plaintext.decode('utf-8')}")
             else:
@@ -98,30 +66,110 @@ def register_text_commands(cli):
         except VaultError as e:
             click.echo(f"[ERROR] {e}")
 
-    @cli.command()
-    @click.argument("project")
-    @click.argument("environment")
-    def list(project, environment):
+    @cli.command("list")
+    @click.argument("project", required=False)
+    @click.argument("environment", required=False)
+    @click.option(
+        "--tree", is_flag=True, default=False, help="Show the nested hierarchy"
+    )
+    @click.option(
+        "--limit", type=click.IntRange(min=1), default=None, help="Max entries"
+    )
+    @click.option("--after", default=None, help="Resume after this name (cursor)")
+    @click.option(
+        "--format",
+        "fmt",
+        type=click.Choice(["text", "ndjson"]),
+        default="text",
+        show_default=True,
+        help="Output format",
+    )
+    def list_cmd(project, environment, tree, limit, after, fmt):
         """
-        List all keys stored for a given project and environment.
+        List projects, environments of a project, or keys of an environment.
+
+        Nothing is decrypted; sizes and timestamps come from metadata. Results
+        are streamed in name order and can be paged with --limit/--after.
 
         Example:
-            vault list myapp dev
+            vault list
+            vault list myapp
+            vault list myapp dev --format ndjson
+            vault list --tree
         """
         require_setup()
         try:
-            db = VaultDB(get_db_path())
-            cursor = db.conn.execute(
-                "SELECT key, is_file FROM secrets WHERE project=? AND environment=?",
-                (project, environment),
-            )
-            rows = cursor.fetchall()
-            if not rows:
-                click.echo("No secrets found.")
-                return
-            click.echo(f"Secrets for {project}/{environment}:")
-            for key, is_file in rows:
-                kind = "File" if is_file else "Text"
-                click.echo(f"- {key} ({kind})")
+            db = open_db()
+            if environment is not None:
+                level = "key"
+                items = db.list_entries(project, environment, after, limit)
+            elif project is not None:
+                level = "environment"
+                items = db.list_environments(project, after, limit)
+            else:
+                level = "project"
+                items = db.list_projects(after, limit)
+
+            count, last = 0, None
+            for item in items:
+                count += 1
+                if level == "key":
+                    last = item.key
+                    if count == 1 and fmt == "text" and not tree:
+                        click.echo(f"Secrets for {project}/{environment}:")
+                    _emit_entry(item, fmt, depth=0)
+                elif level == "environment":
+                    last = item
+                    _emit_name(fmt, item, project=project, environment=item)
+                    if tree:
+                        _walk_environment(db, project, item, fmt, depth=1)
+                else:
+                    last = item
+                    _emit_name(fmt, item, project=item)
+                    if tree:
+                        for env in db.list_environments(item):
+                            _emit_name(fmt, env, depth=1, project=item, environment=env)
+                            _walk_environment(db, item, env, fmt, depth=2)
+
+            if not count and after is None:
+                click.echo("No secrets found.", err=fmt == "ndjson")
+            elif limit is not None and count == limit:
+                click.echo(f"More results: --after {last}", err=True)
         except VaultError as e:
             click.echo(f"[ERROR] {e}")
+
+
+def _walk_environment(db, project, environment, fmt, depth):
+    for info in db.list_entries(project, environment):
+        _emit_entry(info, fmt, depth)
+
+
+def _emit_name(fmt, name, depth=0, **fields):
+    if fmt == "ndjson":
+        click.echo(json.dumps(fields))
+    else:
+        click.echo(f"{'  ' * depth}{name}/")
+
+
+def _emit_entry(info, fmt, depth):
+    kind = "File" if info.is_file else "Text"
+    updated = info.updated_at.isoformat()
+    if fmt == "ndjson":
+        click.echo(
+            json.dumps(
+                {
+                    "project": info.project,
+                    "environment": info.environment,
+                    "key": info.key,
+                    "kind": kind.lower(),
+                    "size": info.size,
+                    "mime": info.mime,
+                    "fingerprint": info.fingerprint,
+                    "updated_at": updated,
+                }
+            )
+        )
+    else:
+        click.echo(
+            f"{'  ' * depth}- {info.key} ({kind}, {info.size} B, updated {updated})"
+        )
@@ -1,13 +1,33 @@
 import os
 import platform
 import subprocess
+import time
 from pathlib import Path
 
 import click
 
-from vault.config import get_db_path, get_workspace_dir, require_setup, set_config
+from vault.config import (
+    get_registry_path,
+    get_workspace_dir,
+    open_db,
+    require_setup,
+    set_config,
+    track_materialized,
+)
 from vault.crypto.utils import prompt_password
-from vault.storage.db import VaultDB
+from vault.exceptions import VaultError
+from vault.storage.registry import MaterializedRegistry
+from vault.storage.watch import (
+    DEFAULT_DEBOUNCE,
+    DEFAULT_POLL_INTERVAL,
+    WorkspaceWatcher,
+)
+from vault.storage.workspace import (
+    CONFLICT_EDITED,
+    CONFLICT_SHARED_NAME,
+    record_materialized,
+    sync_workspace,
+)
 
 
 def register_workspace_commands(cli):
@@ -76,7 +96,7 @@ def register_workspace_commands(cli):
         # Ensure workspace directory exists
         Path(workspace_dir).mkdir(parents=True, exist_ok=True)
         prompt = prompt_password()
-        db = VaultDB(get_db_path())
+        db = open_db()
         temp = db.get_file_secret(
             project, environment, file_name, prompt, workspace_dir
         )
@@ -89,4 +109,178 @@ def register_workspace_commands(cli):
             else:
                 dest.unlink()
         Path(temp).replace(dest)
+        # Lets `vault watch` write later edits back
+        record_materialized(
+            workspace_dir, db.get_secret(project, environment, file_name), dest
+        )
+        track_materialized(
+            [(dest, f"{project}/{environment}/{file_name}")], workspace=True
+        )
         click.echo(f"Copied {file_name} to workspace: {dest}")
+
+    @workspace_group.command("sync")
+    @click.argument("project")
+    @click.argument("environment")
+    @click.option(
+        "--workers",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Parallel decryption threads",
+    )
+    @click.option(
+        "--force",
+        is_flag=True,
+        default=False,
+        help="Rewrite every file, including ones edited in the workspace",
+    )
+    def sync(project: str, environment: str, workers: int, force: bool):
+        """Materialize all file secrets of an environment into the workspace.
+
+        Unchanged files are skipped using the workspace manifest. Example:
+            vault workspace sync myapp dev
+        """
+        workspace_dir = get_workspace_dir()
+        if not workspace_dir:
+            raise click.ClickException(
+                "Workspace not configured; use `vault setup` or "
+                "`vault config set workspace_dir <path>` to configure it."
+            )
+        password = prompt_password()
+        try:
+            db = open_db()
+            result = sync_workspace(
+                db,
+                project,
+                environment,
+                password,
+                workspace_dir,
+                workers=workers,
+                force=force,
+            )
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+            return
+        track_materialized(
+            [(path, name) for name, path in result.paths.items()], workspace=True
+        )
+        for name in result.conflicts:
+            reason = result.reasons[name]
+            if reason == CONFLICT_SHARED_NAME:
+                click.echo(
+                    f"Skipped {name}: another secret of {project}/{environment} "
+                    "has the same file name (rename one of them)"
+                )
+            elif reason == CONFLICT_EDITED:
+                click.echo(
+                    f"Skipped {name}: edited in the workspace since it was synced "
+                    "(use --force to overwrite)"
+                )
+            else:
+                click.echo(
+                    f"Skipped {name}: its file in the workspace was not synced "
+                    "from this secret (use --force to overwrite)"
+                )
+        click.echo(
+            f"Synced {len(result.written)} file(s), "
+            f"{len(result.unchanged)} unchanged, into {workspace_dir}"
+        )
+
+    @workspace_group.command("clean")
+    @click.option(
+        "--all",
+        "everything",
+        is_flag=True,
+        default=False,
+        help="Wipe every tracked plaintext file, not only expired ones",
+    )
+    @click.option(
+        "--workers",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Parallel wipe threads",
+    )
+    def clean(everything: bool, workers: int):
+        """Securely wipe decrypted files the CLI has written.
+
+        Covers temp files from `get_file` and workspace copies. Example:
+            vault workspace clean --all
+        """
+        with MaterializedRegistry(get_registry_path()) as registry:
+            result = registry.sweep(everything=everything, workers=workers)
+        for error in result.errors.values():
+            click.echo(f"[ERROR] {error}")
+        click.echo(f"Wiped {len(result.wiped)} file(s).")
+
+    @cli.command("watch")
+    @click.argument("project", required=False)
+    @click.argument("environment", required=False)
+    @click.option(
+        "--debounce",
+        type=click.FloatRange(min=0),
+        default=DEFAULT_DEBOUNCE,
+        show_default=True,
+        help="Seconds a file must stay unchanged before it is saved",
+    )
+    @click.option(
+        "--interval",
+        type=click.FloatRange(min=0.05),
+        default=DEFAULT_POLL_INTERVAL,
+        show_default=True,
+        help="Seconds between scans when polling",
+    )
+    @click.option(
+        "--poll",
+        is_flag=True,
+        default=False,
+        help="Poll file sizes/mtimes even where inotify is available",
+    )
+    def watch(project, environment, debounce, interval, poll):
+        """
+        Save edits to workspace files back into the vault as they happen.
+
+        Watches the files `workspace sync`/`workspace import` wrote (optionally
+        only PROJECT [ENV]'s) until interrupted. Example:
+            vault watch myapp dev
+        """
+        require_setup()
+        workspace_dir = get_workspace_dir()
+        if not workspace_dir:
+            raise click.ClickException(
+                "Workspace not configured; use `vault setup` or "
+                "`vault config set workspace_dir <path>` to configure it."
+            )
+        Path(workspace_dir).mkdir(parents=True, exist_ok=True)
+        password = prompt_password()
+
+        def report(batch):
+            stamp = time.strftime("%H:%M:%S")
+            for name in batch.written:
+                click.echo(f"[{stamp}] Saved {name}")
+            for name in batch.conflicts:
+                click.echo(
+                    f"[{stamp}] Skipped {name}: changed in the vault since it was "
+                    "synced, or its file is claimed by another secret "
+                    "(run `vault workspace sync` to refresh it)"
+                )
+
+        try:
+            db = open_db()
+            with WorkspaceWatcher(
+                db,
+                password,
+                workspace_dir,
+                project,
+                environment,
+                debounce=debounce,
+                poll_interval=interval,
+                use_inotify=not poll,
+            ) as watcher:
+                click.echo(
+                    f"Watching {len(watcher.tracked)} file(s) in {workspace_dir} "
+                    f"({watcher.mode}); Ctrl-C to stop."
+                )
+                watcher.run(on_batch=report)
+        except VaultError as e:
+            click.echo(f"[ERROR] {e}")
+        except KeyboardInterrupt:
+            click.echo("Stopped watching.")
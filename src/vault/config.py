@@ -4,6 +4,8 @@ from pathlib import Path
 
 import click
 
+from vault import tracing
+
 
 def get_config_dir() -> Path:
     env_dir = os.environ.get("VAULT_CONFIG_DIR")
@@ -25,6 +27,7 @@ def is_initialized() -> bool:
     return path.exists() and path.is_file()
 
 
+@tracing.traced("config.load")
 def load_config():
     path = get_config_path()
     if path.exists():
@@ -48,6 +51,34 @@ def get_db_path():
     return config.get("vault_db_path", str(get_default_db_path()))
 
 
+def open_db(**kwargs):
+    """
+    Open the configured vault DB honouring the global --readonly/--immutable flags.
+
+    :param kwargs: Extra `VaultDB` arguments (e.g. ``check_same_thread``)
+    """
+    from vault.crypto.kdf import KdfParams
+    from vault.storage.db import VaultDB
+    from vault.storage.shards import ShardedVaultDB
+
+    ctx = click.get_current_context(silent=True)
+    meta = ctx.meta if ctx else {}
+    db_class = ShardedVaultDB if get_layout() == "sharded" else VaultDB
+    return db_class(
+        get_db_path(),
+        readonly=meta.get("vault.readonly", False),
+        immutable=meta.get("vault.immutable", False),
+        kdf=KdfParams.decode(get_kdf()),
+        lock_timeout=get_lock_timeout(),
+        **kwargs,
+    )
+
+
+def get_layout() -> str:
+    """``single`` (one vault.db) or ``sharded`` (one DB per project, see `vault shard`)."""
+    return load_config().get("layout", "single")
+
+
 def get_backup_dir() -> str:
     config = load_config()
     return config.get("backup_dir", str(get_config_dir() / "backups"))
@@ -58,6 +89,90 @@ def get_workspace_dir() -> str | None:
     return config.get("workspace_dir", None)
 
 
+def get_kdf() -> str | None:
+    """Encoded KDF parameters for new secrets on this host (see `vault bench kdf`)."""
+    config = load_config()
+    return config.get("kdf", None)
+
+
+def get_registry_path() -> Path:
+    return get_config_dir() / "materialized.db"
+
+
+def _get_seconds(key: str, default: float | None) -> float | None:
+    value = load_config().get(key, default)
+    if value in (None, "", "none", "never"):
+        return None
+    return float(value)
+
+
+def get_lock_timeout() -> float | None:
+    """Seconds a write waits for other writers before failing (default 30)."""
+    return _get_seconds("lock_timeout", 30.0)
+
+
+def get_temp_ttl() -> float | None:
+    """Seconds before decrypted temp files from `get_file` expire (default 1h)."""
+    return _get_seconds("temp_ttl", 3600)
+
+
+def get_workspace_ttl() -> float | None:
+    """Seconds before workspace copies expire (default: never)."""
+    return _get_seconds("workspace_ttl", None)
+
+
+def get_serve_cache_ttl() -> float:
+    """Seconds `vault serve` keeps decrypted values cached (default 60, 0 disables)."""
+    return float(load_config().get("serve_cache_ttl", 60))
+
+
+def get_serve_socket_path() -> Path:
+    return Path(load_config().get("serve_socket", str(get_config_dir() / "vault.sock")))
+
+
+def get_serve_token_path() -> Path:
+    return get_config_dir() / "serve.token"
+
+
+def get_crypto_workers() -> int:
+    """Threads for chunked backup and bundle encryption (default: one per CPU, at most 8)."""
+    from vault.crypto.stream import default_workers
+
+    value = load_config().get("crypto_workers")
+    return int(value) if value else default_workers()
+
+
+def get_auto_sweep() -> bool:
+    value = load_config().get("auto_sweep", False)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def track_materialized(items, workspace: bool = False):
+    """Record decrypted files (``(path, origin)`` pairs) for later wiping."""
+    from vault.storage.registry import MaterializedRegistry
+
+    ttl = get_workspace_ttl() if workspace else get_temp_ttl()
+    with MaterializedRegistry(get_registry_path()) as registry:
+        registry.register_many(items, ttl)
+
+
+def create_backups(projects=()) -> list[Path]:
+    """
+    Back up the configured vault into `backup_dir`.
+
+    A single-file vault is copied to one file; a sharded vault gets one file
+    per shard (only the given ``projects``' shards if any are named).
+    """
+    from vault.storage.backup import backup_db, backup_vault
+
+    if get_layout() != "sharded" and not projects:
+        return [backup_db(get_db_path(), backup_dir=get_backup_dir())]
+    with open_db() as db:
+        return backup_vault(db, get_backup_dir(), projects=projects)
+
+
 def get_git_repo_path() -> str | None:
     config = load_config()
     return config.get("git_repo_path", None)
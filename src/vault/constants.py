@@ -3,8 +3,14 @@
 # Crypto
 AES_KEY_LENGTH = 32  # 256 bits
 AES_GCM_IV_LENGTH = 12  # Recommended for GCM
+AES_GCM_TAG_LENGTH = 16  # Appended to every ciphertext
+KDF_ALGORITHM = "pbkdf2-sha256"
 KDF_ITERATIONS = 200_000
 KDF_SALT_LENGTH = 16
+SCRYPT_N = 2**14
+SCRYPT_R = 8
+SCRYPT_P = 1
+KDF_TARGET_MS = 250  # default unlock latency for `vault bench kdf`
 
 # Password
 MIN_PASSWORD_LENGTH = 8
@@ -2,6 +2,7 @@ import os
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+from vault import tracing
 from vault.constants import AES_GCM_IV_LENGTH, AES_KEY_LENGTH
 from vault.exceptions import CryptoError
 
@@ -17,7 +18,9 @@ def encrypt(key: bytes, plaintext: bytes) -> tuple[bytes, bytes]:
 
     iv = os.urandom(AES_GCM_IV_LENGTH)
     aesgcm = AESGCM(key)
-    ciphertext = aesgcm.encrypt(iv, plaintext, None)
+    tracing.count("aes.bytes_encrypted", len(plaintext))
+    with tracing.span("aes.encrypt", bytes=len(plaintext)):
+        ciphertext = aesgcm.encrypt(iv, plaintext, None)
 
     return iv, ciphertext
 
@@ -35,8 +38,10 @@ def decrypt(key: bytes, iv: bytes, ciphertext: bytes) -> bytes:
         raise CryptoError("Invalid IV length")
 
     aesgcm = AESGCM(key)
+    tracing.count("aes.bytes_decrypted", len(ciphertext))
     try:
-        return aesgcm.decrypt(iv, ciphertext, None)
+        with tracing.span("aes.decrypt", bytes=len(ciphertext)):
+            return aesgcm.decrypt(iv, ciphertext, None)
     except Exception as exc:
         # Avoid leaking internal errors; present a redacted message.
         raise CryptoError("Decryption failed") from exc
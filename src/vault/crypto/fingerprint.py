@@ -0,0 +1,26 @@
+"""Keyed content fingerprints.
+
+A fingerprint is HMAC-SHA256 over a secret's plaintext, keyed by a subkey of
+the vault key. Equal plaintexts in the same vault get equal fingerprints, so
+change detection and dedup can compare metadata instead of decrypting, while
+the fingerprint alone is useless for guessing low-entropy values.
+"""
+
+import hashlib
+import hmac
+
+FINGERPRINT_CONTEXT = b"vault-fingerprint-v1"
+
+
+def derive_subkey(vault_key: bytes, context: bytes) -> bytes:
+    """
+    Derive an independent purpose-specific key from the vault key.
+    """
+    return hmac.new(vault_key, context, hashlib.sha256).digest()
+
+
+def fingerprint(fingerprint_key: bytes, data: bytes) -> str:
+    """
+    Return the hex HMAC-SHA256 fingerprint of ``data``.
+    """
+    return hmac.new(fingerprint_key, data, hashlib.sha256).hexdigest()
@@ -1,20 +1,93 @@
 import os
-from hashlib import pbkdf2_hmac
+import time
+from dataclasses import dataclass
+from hashlib import pbkdf2_hmac, scrypt
 
+from vault import tracing
 from vault.constants import (
     AES_KEY_LENGTH,
+    KDF_ALGORITHM,
     KDF_ITERATIONS,
     KDF_SALT_LENGTH,
     MIN_PASSWORD_LENGTH,
+    SCRYPT_N,
+    SCRYPT_P,
+    SCRYPT_R,
 )
-from vault.exceptions import InvalidPasswordError
+from vault.exceptions import CryptoError, InvalidPasswordError
 
 """KDF helpers for deriving AES keys from passphrases.
 
-Currently uses PBKDF2-HMAC-SHA256 with a per-secret salt. Consider migrating
-to Argon2 for improved resistance to GPU attacks in the future.
+Supports PBKDF2-HMAC-SHA256 and scrypt with a per-secret salt. The parameters
+used for each secret are stored alongside it (see `KdfParams.encode`), so the
+cost can be retuned without breaking existing secrets. Consider adding Argon2
+for improved resistance to GPU attacks in the future.
 """
 
+KDF_ALGORITHMS = ("pbkdf2-sha256", "scrypt")
+
+
+@dataclass(frozen=True)
+class KdfParams:
+    """Algorithm and cost parameters of a key derivation."""
+
+    algorithm: str = KDF_ALGORITHM
+    iterations: int | None = KDF_ITERATIONS  # pbkdf2 only
+    n: int | None = None  # scrypt only
+    r: int | None = None
+    p: int | None = None
+
+    @classmethod
+    def pbkdf2(cls, iterations: int = KDF_ITERATIONS) -> "KdfParams":
+        return cls("pbkdf2-sha256", iterations=iterations)
+
+    @classmethod
+    def scrypt(cls, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P):
+        return cls("scrypt", iterations=None, n=n, r=r, p=p)
+
+    def encode(self) -> str:
+        """Compact form stored per record, e.g. ``scrypt$n=16384,r=8,p=1``."""
+        if self.algorithm == "scrypt":
+            return f"scrypt$n={self.n},r={self.r},p={self.p}"
+        return f"{self.algorithm}$i={self.iterations}"
+
+    @classmethod
+    def decode(cls, value: str | None) -> "KdfParams":
+        """Parse ``encode()`` output; ``None`` means the legacy default."""
+        if not value:
+            return DEFAULT_KDF
+        try:
+            algorithm, _, raw = value.partition("$")
+            fields = dict(item.split("=", 1) for item in raw.split(","))
+            if algorithm == "scrypt":
+                params = cls.scrypt(
+                    int(fields["n"]), int(fields["r"]), int(fields["p"])
+                )
+            elif algorithm == "pbkdf2-sha256":
+                params = cls.pbkdf2(int(fields["i"]))
+            else:
+                raise ValueError(f"unknown algorithm {algorithm!r}")
+        except (KeyError, ValueError) as exc:
+            raise CryptoError(f"Invalid KDF parameters: {value}") from exc
+        params.validate()
+        return params
+
+    def validate(self):
+        if self.algorithm == "scrypt":
+            if not self.n or self.n < 2 or self.n & (self.n - 1):
+                raise CryptoError("scrypt n must be a power of two")
+            if not self.r or not self.p or self.r < 1 or self.p < 1:
+                raise CryptoError("scrypt r and p must be positive")
+        elif self.algorithm == "pbkdf2-sha256":
+            if not self.iterations or self.iterations < 1:
+                raise CryptoError("PBKDF2 iterations must be positive")
+        else:
+            raise CryptoError(f"Unsupported KDF algorithm: {self.algorithm}")
+
+
+# Parameters of every secret written before KDF parameters were recorded
+DEFAULT_KDF = KdfParams.pbkdf2(KDF_ITERATIONS)
+
 
 def generate_salt() -> bytes:
     """
@@ -23,18 +96,68 @@ def generate_salt() -> bytes:
     return os.urandom(KDF_SALT_LENGTH)
 
 
-def derive_key(password: str, salt: bytes) -> bytes:
+def derive_key(password: str, salt: bytes, params: KdfParams | None = None) -> bytes:
     """
-    Derive a symmetric encryption key from a password using PBKDF2.
+    Derive a symmetric encryption key from a password using PBKDF2 or scrypt.
     """
 
     if not password or len(password) < MIN_PASSWORD_LENGTH:
         raise InvalidPasswordError("Password too short")
 
-    return pbkdf2_hmac(
-        hash_name="sha256",
-        password=password.encode("utf-8"),
-        salt=salt,
-        iterations=KDF_ITERATIONS,
-        dklen=AES_KEY_LENGTH,
-    )
+    params = params or DEFAULT_KDF
+    tracing.count("kdf.calls")
+    with tracing.span("kdf", algorithm=params.algorithm):
+        if params.algorithm == "scrypt":
+            # OpenSSL needs 128 * r * (n + p + 2) bytes; leave some headroom
+            maxmem = 128 * params.r * (params.n + params.p + 2) + 1024 * 1024
+            return scrypt(
+                password.encode("utf-8"),
+                salt=salt,
+                n=params.n,
+                r=params.r,
+                p=params.p,
+                maxmem=maxmem,
+                dklen=AES_KEY_LENGTH,
+            )
+
+        return pbkdf2_hmac(
+            hash_name="sha256",
+            password=password.encode("utf-8"),
+            salt=salt,
+            iterations=params.iterations,
+            dklen=AES_KEY_LENGTH,
+        )
+
+
+def time_kdf(params: KdfParams, rounds: int = 1) -> float:
+    """
+    Return the best-of-``rounds`` wall time in seconds of one derivation.
+    """
+    salt = generate_salt()
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        derive_key("calibration-password", salt, params)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate(target_ms: float, algorithm: str = KDF_ALGORITHM) -> KdfParams:
+    """
+    Pick KDF parameters whose derivation takes about ``target_ms`` on this host.
+
+    PBKDF2 cost is linear in iterations, so one probe is extrapolated. scrypt n
+    must be a power of two, so n is doubled until the target is reached.
+    """
+    target = target_ms / 1000
+    if algorithm == "scrypt":
+        params = KdfParams.scrypt(n=2**10)
+        while time_kdf(params, rounds=2) < target and params.n < 2**22:
+            params = KdfParams.scrypt(n=params.n * 2)
+        return params
+    if algorithm != "pbkdf2-sha256":
+        raise CryptoError(f"Unsupported KDF algorithm: {algorithm}")
+    probe = KdfParams.pbkdf2(50_000)
+    per_iteration = time_kdf(probe, rounds=3) / probe.iterations
+    iterations = int(target / per_iteration) // 1000 * 1000
+    return KdfParams.pbkdf2(max(iterations, 1000))
@@ -0,0 +1,292 @@
+"""Chunked AES-GCM for streams too large to encrypt in one piece.
+
+The plaintext is cut into fixed-size chunks, each sealed separately as
+``[u32 length][12-byte IV][ciphertext + tag]``. Every chunk authenticates
+the stream header, its own index and whether it is the last one, so chunks
+cannot be reordered, dropped, spliced in from another stream or truncated
+away without decryption failing.
+
+Chunks are independent, so with ``workers > 1`` both ends pipeline them
+through a bounded thread pool (AES-GCM releases the GIL): the writer seals
+up to ``2 * workers`` chunks ahead of the file, the reader opens up to
+``2 * workers`` chunks ahead of its caller, and chunks are written and
+returned strictly in order.
+"""
+
+import os
+import struct
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from vault import tracing
+from vault.constants import AES_GCM_IV_LENGTH, AES_GCM_TAG_LENGTH, AES_KEY_LENGTH
+from vault.exceptions import CryptoError
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB of plaintext per chunk
+
+_LENGTH = struct.Struct(">I")
+_INDEX = struct.Struct(">Q")
+
+
+def _aad(header: bytes, index: int, final: bool) -> bytes:
+    return header + _INDEX.pack(index) + (b"\x01" if final else b"\x00")
+
+
+def default_workers() -> int:
+    """Crypto threads when none are configured: one per CPU, at most 8."""
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+def _pool(workers: int) -> ThreadPoolExecutor | None:
+    if workers < 1:
+        raise CryptoError("Crypto worker count must be at least 1")
+    if workers == 1:
+        return None
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vault-aes")
+
+
+class ChunkWriter:
+    """Encrypt everything written to it onto ``fileobj`` in chunks."""
+
+    def __init__(
+        self,
+        fileobj,
+        key: bytes,
+        header: bytes = b"",
+        chunk_size: int = CHUNK_SIZE,
+        workers: int = 1,
+    ):
+        """
+        :param fileobj: Binary file object to write sealed chunks to
+        :param key: 32-byte AES key
+        :param header: Bytes bound into every chunk (e.g. the stream's header)
+        :param workers: Threads sealing chunks concurrently (``1``: inline)
+        """
+        if len(key) != AES_KEY_LENGTH:
+            raise CryptoError("Invalid AES key length")
+        self.fileobj = fileobj
+        self.header = header
+        self.chunk_size = chunk_size
+        self._aesgcm = AESGCM(key)
+        self._buffer = bytearray()
+        self._index = 0
+        self._closed = False
+        self._pool = _pool(workers)
+        self._depth = 2 * workers
+        self._pending: deque[tuple[bytes, Future]] = deque()
+
+    def _encrypt(self, iv: bytes, data: bytes, aad: bytes) -> bytes:
+        with tracing.span("aes.encrypt", bytes=len(data)):
+            return self._aesgcm.encrypt(iv, data, aad)
+
+    def _emit(self, iv: bytes, ciphertext: bytes):
+        self.fileobj.write(_LENGTH.pack(len(ciphertext)) + iv)
+        self.fileobj.write(ciphertext)
+
+    def _drain(self, keep: int):
+        while len(self._pending) > keep:
+            iv, future = self._pending.popleft()
+            self._emit(iv, future.result())
+
+    def _seal(self, data: bytes, final: bool):
+        # Nonce and index are fixed here, in stream order, whichever thread
+        # ends up doing the encryption
+        iv = os.urandom(AES_GCM_IV_LENGTH)
+        aad = _aad(self.header, self._index, final)
+        self._index += 1
+        tracing.count("aes.bytes_encrypted", len(data))
+        if self._pool is None:
+            self._emit(iv, self._encrypt(iv, data, aad))
+            return
+        self._pending.append((iv, self._pool.submit(self._encrypt, iv, data, aad)))
+        self._drain(self._depth)
+
+    def write(self, data: bytes):
+        if self._pool is not None and not isinstance(data, bytes):
+            # Chunks are sealed after write() returns; don't share a mutable buffer
+            data = bytes(data)
+        view = memoryview(data)
+        if self._buffer:
+            take = min(len(view), self.chunk_size - len(self._buffer))
+            self._buffer += view[:take]
+            view = view[take:]
+            if len(self._buffer) < self.chunk_size:
+                return
+            self._seal(bytes(self._buffer), final=False)
+            self._buffer.clear()
+        # Full chunks are sealed straight from the caller's data; the final
+        # chunk is whatever remains at close (possibly empty)
+        while len(view) >= self.chunk_size:
+            self._seal(view[: self.chunk_size], final=False)
+            view = view[self.chunk_size :]
+        self._buffer += view
+
+    def close(self):
+        """Seal the final (possibly empty) chunk and flush pending ones."""
+        if not self._closed:
+            self._closed = True
+            try:
+                self._seal(bytes(self._buffer), final=True)
+                self._buffer.clear()
+                self._drain(0)
+            finally:
+                self._shutdown()
+
+    def _shutdown(self):
+        if self._pool is not None:
+            self._pending.clear()
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._closed = True
+            self._shutdown()
+
+
+class ChunkReader:
+    """Decrypt a `ChunkWriter` stream; a file-like ``read(n)`` over the plaintext."""
+
+    def __init__(
+        self,
+        fileobj,
+        key: bytes,
+        header: bytes = b"",
+        chunk_size: int = CHUNK_SIZE,
+        workers: int = 1,
+    ):
+        """
+        :param workers: Threads opening chunks ahead of the caller (``1``:
+            inline); call `close` (or use ``with``) to stop them
+        """
+        if len(key) != AES_KEY_LENGTH:
+            raise CryptoError("Invalid AES key length")
+        self.fileobj = fileobj
+        self.header = header
+        self.max_sealed = chunk_size + AES_GCM_TAG_LENGTH
+        self._aesgcm = AESGCM(key)
+        self._chunk = b""
+        self._pos = 0  # read offset into the current chunk
+        self._index = 0
+        self._final = False
+        self._pool = _pool(workers)
+        self._depth = 2 * workers
+        self._pending: deque[Future] = deque()
+        self._read_index = 0  # index of the next chunk read from the file
+        self._eof = False
+
+    def _read_frame(self) -> tuple[bytes, bytes] | None:
+        """The next ``(iv, ciphertext)`` from the file; ``None`` at a clean EOF."""
+        prefix = self.fileobj.read(_LENGTH.size)
+        if not prefix:
+            return None
+        if len(prefix) != _LENGTH.size:
+            raise CryptoError("Encrypted stream is truncated")
+        (length,) = _LENGTH.unpack(prefix)
+        if length > self.max_sealed or length < AES_GCM_TAG_LENGTH:
+            raise CryptoError("Encrypted stream is corrupt")
+        iv = self.fileobj.read(AES_GCM_IV_LENGTH)
+        ciphertext = self.fileobj.read(length)
+        if len(iv) != AES_GCM_IV_LENGTH or len(ciphertext) != length:
+            raise CryptoError("Encrypted stream is truncated")
+        return iv, ciphertext
+
+    def _open(self, iv: bytes, ciphertext: bytes, index: int) -> tuple[bytes, bool]:
+        length = len(ciphertext)
+        # Only the last chunk can be short; a full-size one may be either
+        for final in (True,) if length < self.max_sealed else (False, True):
+            try:
+                with tracing.span("aes.decrypt", bytes=length):
+                    data = self._aesgcm.decrypt(
+                        iv, ciphertext, _aad(self.header, index, final)
+                    )
+            except Exception:
+                continue
+            tracing.count("aes.bytes_decrypted", length)
+            return data, final
+        raise CryptoError("Decryption failed")
+
+    def _read_ahead(self):
+        while len(self._pending) < self._depth and not self._eof:
+            frame = self._read_frame()
+            if frame is None:
+                self._eof = True
+                break
+            self._pending.append(
+                self._pool.submit(self._open, *frame, self._read_index)
+            )
+            self._read_index += 1
+            if len(frame[1]) < self.max_sealed:
+                # A short chunk can only be the last one
+                self._eof = True
+
+    def _next_chunk(self) -> bool:
+        if self._final:
+            return False
+        if self._pool is None:
+            frame = self._read_frame()
+            if frame is None:
+                raise CryptoError("Encrypted stream is truncated")
+            data, final = self._open(*frame, self._index)
+        else:
+            self._read_ahead()
+            if not self._pending:
+                raise CryptoError("Encrypted stream is truncated")
+            data, final = self._pending.popleft().result()
+        # Nothing after the final chunk is authenticated
+        if final and (self._pending or self.fileobj.read(1)):
+            raise CryptoError("Unexpected data after the final chunk")
+        self._chunk, self._pos = data, 0
+        self._index += 1
+        self._final = final
+        if final:
+            self.close()
+        return True
+
+    def close(self):
+        """Stop the read-ahead threads (the stream is not closed)."""
+        if self._pool is not None:
+            self._pending.clear()
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def read(self, size: int = -1) -> bytes:
+        """Return up to ``size`` plaintext bytes (all remaining if negative)."""
+        pieces = []
+        wanted = size
+        while wanted != 0:
+            if self._pos == len(self._chunk) and not self._next_chunk():
+                break
+            end = len(self._chunk) if wanted < 0 else self._pos + wanted
+            piece = self._chunk[self._pos : end]
+            self._pos += len(piece)
+            if wanted > 0:
+                wanted -= len(piece)
+            pieces.append(piece)
+        return pieces[0] if len(pieces) == 1 else b"".join(pieces)
+
+    def read_exact(self, size: int) -> bytes:
+        data = self.read(size)
+        if len(data) != size:
+            raise CryptoError("Encrypted stream ended early")
+        return data
+
+    def at_end(self) -> bool:
+        """True once the final chunk has been read and consumed."""
+        while self._pos == len(self._chunk):
+            if not self._next_chunk():
+                return True
+        return False
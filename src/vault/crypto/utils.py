@@ -4,16 +4,17 @@ from vault.constants import MIN_PASSWORD_LENGTH
 from vault.exceptions import InvalidPasswordError
 
 
-def prompt_password(confirm: bool = False) -> str:
+def prompt_password(confirm: bool = False, prompt: str = "Master password: ") -> str:
     """Prompt the user for a password securely.
     Args:
         confirm (bool): If True, prompt for password confirmation.
+        prompt (str): Prompt text shown to the user.
     Returns:
         str: The entered password.
     Raises:
         InvalidPasswordError: If passwords do not match or are too short.
     """
-    password = getpass.getpass("Master password: ")
+    password = getpass.getpass(prompt)
 
     if confirm:
         confirm_pw = getpass.getpass("Confirm password: ")
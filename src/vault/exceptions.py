@@ -15,3 +15,7 @@ class InvalidPasswordError(VaultError):
 
 class StorageError(VaultError):
     """Database or file storage errors."""
+
+
+class LockTimeoutError(StorageError):
+    """The vault DB stayed locked by other writers for longer than allowed."""
@@ -0,0 +1,396 @@
+# vault/server.py
+"""Local secret service behind `vault serve`.
+
+Long-running app processes on a host can fetch secrets over a Unix socket
+(default, ``0600``) or loopback HTTP instead of spawning the CLI for every
+lookup. The server holds one open `VaultDB` and the master password it was
+unlocked with, and keeps decrypted values in a TTL cache, so a warm lookup
+is a dict probe rather than a process start, DB open and KDF run.
+
+Every response to a secret read carries an ``ETag`` derived from the
+secrets' ``updated_at``; clients that send it back in ``If-None-Match`` get
+``304 Not Modified`` without anything being decrypted or sent. Connections
+are kept alive (HTTP/1.1).
+
+Endpoints (JSON):
+
+- ``GET /v1/health``: status and cache counters
+- ``GET /v1/projects``: project names
+- ``GET /v1/secrets/<project>/<env>``: metadata for an environment's secrets
+- ``GET /v1/secrets/<project>/<env>/<key>``: one decrypted secret
+- ``POST /v1/batch`` with ``{"secrets": [{"project", "environment", "key"}]}``:
+  several secrets in one round trip
+
+Text secrets are returned as ``value``, file secrets as base64 ``value_b64``.
+Over TCP every request needs ``Authorization: Bearer <token>``.
+"""
+
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote
+
+from vault.exceptions import StorageError, VaultError
+from vault.logging import setup_logger
+from vault.storage.db import decrypt_record
+
+logger = setup_logger("vault-serve")
+
+DEFAULT_CACHE_TTL = 60.0
+# Expired cache entries are dropped once the cache grows past this many
+CACHE_PRUNE_SIZE = 4096
+MAX_BATCH = 1000
+MAX_BODY = 1024 * 1024
+
+
+def etag_for(*versions) -> str:
+    """Strong ETag over ``(project, environment, key, updated_at)`` tuples."""
+    digest = hashlib.sha256()
+    for version in versions:
+        digest.update("\0".join(str(part) for part in version).encode("utf-8"))
+        digest.update(b"\n")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+@dataclass
+class _Entry:
+    expires: float
+    updated_at: str
+    payload: dict
+
+
+@dataclass
+class ServiceStats:
+    requests: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    not_modified: int = 0
+
+
+class SecretService:
+    """Decrypted-secret lookups over one shared `VaultDB`, with a TTL cache."""
+
+    def __init__(self, db, master_password: str, cache_ttl: float | None = None):
+        """
+        :param db: VaultDB opened with ``check_same_thread=False``
+        :param master_password: Checked against the vault's verifier up front
+        :param cache_ttl: Seconds a decrypted value is served without going to
+            the DB (``0`` disables caching)
+        """
+        db.unlock(master_password)
+        self.db = db
+        self.master_password = master_password
+        self.cache_ttl = DEFAULT_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.stats = ServiceStats()
+        self._cache: dict[tuple[str, str, str], _Entry] = {}
+        self._cache_lock = threading.Lock()
+        # sqlite3 connections must not be used by two threads at once
+        self._db_lock = threading.Lock()
+
+    def _cached(self, ident) -> _Entry | None:
+        with self._cache_lock:
+            entry = self._cache.get(ident)
+            if entry is None:
+                return None
+            if entry.expires <= time.monotonic():
+                del self._cache[ident]
+                return None
+            return entry
+
+    def _store(self, ident, entry: _Entry):
+        with self._cache_lock:
+            if len(self._cache) >= CACHE_PRUNE_SIZE:
+                now = time.monotonic()
+                for stale in [k for k, e in self._cache.items() if e.expires <= now]:
+                    del self._cache[stale]
+            self._cache[ident] = entry
+
+    def lookup(self, project: str, environment: str, key: str, etags=()):
+        """
+        Fetch one secret.
+
+        :param etags: ETags the client already holds; if the secret's current
+            ETag is among them nothing is decrypted
+        :return: ``(etag, payload)``; payload is ``None`` when not modified,
+            and ``(None, None)`` means the secret does not exist
+        """
+        ident = (project, environment, key)
+        entry = self._cached(ident)
+        if entry is not None:
+            self.stats.cache_hits += 1
+            etag = etag_for((*ident, entry.updated_at))
+            return etag, None if etag in etags else entry.payload
+        self.stats.cache_misses += 1
+        with self._db_lock:
+            record = self.db.get_secret(project, environment, key)
+        if record is None:
+            return None, None
+        updated_at = record.updated_at.isoformat()
+        etag = etag_for((*ident, updated_at))
+        if etag in etags:
+            return etag, None
+        # The KDF runs outside the DB lock so slow misses don't serialise
+        plaintext = decrypt_record(record, self.master_password)
+        payload = {
+            "project": project,
+            "environment": environment,
+            "key": key,
+            "updated_at": updated_at,
+        }
+        if record.is_file:
+            payload["filename"] = record.filename
+            payload["value_b64"] = base64.b64encode(plaintext).decode("ascii")
+        else:
+            payload["value"] = plaintext.decode("utf-8")
+        if self.cache_ttl > 0:
+            self._store(
+                ident, _Entry(time.monotonic() + self.cache_ttl, updated_at, payload)
+            )
+        return etag, payload
+
+    def batch(self, idents, etags=()):
+        """
+        Fetch several secrets; the ETag covers all of them.
+
+        :return: ``(etag, payload)`` as for `lookup`; missing secrets are
+            listed under ``missing`` in the payload
+        """
+        found, missing, versions = [], [], []
+        for project, environment, key in idents:
+            _, payload = self.lookup(project, environment, key)
+            if payload is None:
+                missing.append(
+                    {"project": project, "environment": environment, "key": key}
+                )
+                continue
+            found.append(payload)
+            versions.append((project, environment, key, payload["updated_at"]))
+        etag = etag_for(*versions)
+        if etag in etags:
+            return etag, None
+        return etag, {"secrets": found, "missing": missing}
+
+    def projects(self) -> list[str]:
+        with self._db_lock:
+            return list(self.db.list_projects())
+
+    def entries(self, project: str, environment: str, etags=()):
+        """:return: ``(etag, payload)`` as for `lookup`, metadata only"""
+        with self._db_lock:
+            infos = list(self.db.list_entries(project, environment))
+        entries = [
+            {
+                "key": info.key,
+                "kind": info.kind or ("file" if info.is_file else "text"),
+                "filename": info.filename,
+                "size": info.size,
+                "updated_at": info.updated_at.isoformat(),
+            }
+            for info in infos
+        ]
+        etag = etag_for(
+            *((project, environment, e["key"], e["updated_at"]) for e in entries)
+        )
+        if etag in etags:
+            return etag, None
+        return etag, {
+            "project": project,
+            "environment": environment,
+            "entries": entries,
+        }
+
+    def invalidate(self):
+        """Drop every cached value."""
+        with self._cache_lock:
+            self._cache.clear()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server_version = "vault-serve"
+
+    def log_message(self, format, *args):
+        # Request lines can contain project/key names; keep them at debug level
+        logger.debug(format % args)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return "unix"
+
+    def _send(self, status: int, payload=None, etag: str | None = None):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _error(self, status: int, message: str):
+        self._send(status, {"error": message})
+
+    def _reply(self, etag, payload):
+        if payload is None:
+            self.server.service.stats.not_modified += 1
+            self._send(304, etag=etag)
+        else:
+            self._send(200, payload, etag)
+
+    def _client_etags(self) -> set[str]:
+        header = self.headers.get("If-None-Match", "")
+        return {tag.strip() for tag in header.split(",") if tag.strip()}
+
+    def _authorized(self) -> bool:
+        token = self.server.token
+        if token is None:
+            return True
+        offered = self.headers.get("Authorization", "")
+        return hmac.compare_digest(offered.encode(), f"Bearer {token}".encode())
+
+    def _dispatch(self, method: str):
+        service = self.server.service
+        service.stats.requests += 1
+        if not self._authorized():
+            return self._error(401, "Missing or invalid token")
+        parts = [unquote(part) for part in self.path.split("?")[0].split("/") if part]
+        if parts[:1] != ["v1"]:
+            return self._error(404, "Not found")
+        route = parts[1:]
+        try:
+            if method == "GET" and route == ["health"]:
+                return self._send(200, {"status": "ok", **service.stats.__dict__})
+            if method == "GET" and route == ["projects"]:
+                return self._send(200, {"projects": service.projects()})
+            if method == "GET" and len(route) == 3 and route[0] == "secrets":
+                return self._reply(
+                    *service.entries(route[1], route[2], self._client_etags())
+                )
+            if method == "GET" and len(route) == 4 and route[0] == "secrets":
+                etag, payload = service.lookup(*route[1:], self._client_etags())
+                if etag is None:
+                    return self._error(404, "No such secret")
+                return self._reply(etag, payload)
+            if method == "POST" and route == ["batch"]:
+                idents = self._batch_request()
+                if idents is None:
+                    return
+                return self._reply(*service.batch(idents, self._client_etags()))
+        except VaultError as e:
+            logger.error(f"Request failed: {e}")
+            return self._error(500, str(e))
+        self._error(404, "Not found")
+
+    def _batch_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY:
+            self._error(413, "Request body too large")
+            return None
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            idents = [
+                (item["project"], item["environment"], item["key"])
+                for item in body["secrets"]
+            ]
+        except (ValueError, KeyError, TypeError):
+            self._error(
+                400, 'Expected {"secrets": [{"project", "environment", "key"}]}'
+            )
+            return None
+        if len(idents) > MAX_BATCH:
+            self._error(413, f"At most {MAX_BATCH} secrets per batch")
+            return None
+        return idents
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _listening(path: Path) -> bool:
+    """Whether a server accepts connections on the Unix socket ``path``."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            # Refused (or gone): left behind by a server that exited
+            return False
+    return True
+
+
+def make_server(
+    service: SecretService,
+    socket_path: str | Path | None = None,
+    port: int | None = None,
+    token: str | None = None,
+):
+    """
+    Bind the service to a Unix socket, or to ``127.0.0.1:port``.
+
+    :param socket_path: Unix socket to create (mode ``0600``); a stale socket
+        left by a previous server is replaced, a live one is refused
+    :param port: Loopback TCP port (``0`` picks a free one); requires ``token``
+    :param token: Bearer token clients must send (TCP only)
+    :return: A ``socketserver`` server; call ``serve_forever()`` on it
+    """
+    if socket_path is not None:
+        path = Path(socket_path)
+        if path.exists() or path.is_symlink():
+            if not stat.S_ISSOCK(path.lstat().st_mode):
+                raise StorageError(f"{path} exists and is not a socket")
+            if _listening(path):
+                raise StorageError(f"Another server is already listening on {path}")
+            path.unlink()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Create the socket with owner-only permissions from the start
+        old_umask = os.umask(0o177)
+        try:
+            server = _UnixHTTPServer(str(path), _Handler)
+        finally:
+            os.umask(old_umask)
+        server.token = None
+    else:
+        if not token:
+            raise StorageError("A token is required when serving over TCP")
+        server = ThreadingHTTPServer(("127.0.0.1", port or 0), _Handler)
+        server.daemon_threads = True
+        server.token = token
+    server.service = service
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """`http.client` connection to a `vault serve` Unix socket."""
+
+    def __init__(self, socket_path: str | Path, timeout: float | None = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = str(socket_path)
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
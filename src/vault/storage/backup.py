@@ -2,20 +2,40 @@
 
 Provides simple helpers to copy the DB to a timestamped backup file and to
 encrypt/decrypt backups using a master password.
+
+Encrypted backups are ``b"VAULTENC" | u32 header length | JSON header``
+followed by a chunked AES-GCM stream (`vault.crypto.stream`), so they are
+encrypted and decrypted piecewise on several threads. Backups written
+before that format (salt, IV and one AES-GCM blob) can still be decrypted.
 """
 
-import shutil
+import base64
+import contextlib
+import json
+import os
+import sqlite3
+import struct
 from datetime import datetime, timezone
 from pathlib import Path
 
+from vault import tracing
 from vault.constants import AES_GCM_IV_LENGTH, KDF_SALT_LENGTH
-from vault.crypto.aes import decrypt, encrypt
-from vault.crypto.kdf import derive_key, generate_salt
+from vault.crypto.aes import decrypt
+from vault.crypto.kdf import DEFAULT_KDF, KdfParams, derive_key, generate_salt
+from vault.crypto.stream import CHUNK_SIZE, ChunkReader, ChunkWriter, default_workers
+from vault.exceptions import CryptoError, StorageError
 from vault.logging import setup_logger
+from vault.storage.shards import SHARD_DIR, ShardedVaultDB
 
 logger = setup_logger("vault-backup")
 
+ENC_MAGIC = b"VAULTENC"
+ENC_VERSION = 1
+
+_LENGTH = struct.Struct(">I")
+
 
+@tracing.traced("backup.copy")
 def backup_db(db_path: str, backup_dir: str = "vault-backups") -> Path:
     """
     Backup the vault DB to a timestamped file in backup_dir.
@@ -34,56 +54,196 @@ def backup_db(db_path: str, backup_dir: str = "vault-backups") -> Path:
     timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     backup_file = backup_folder / f"vault_backup_{timestamp}.db"
 
-    shutil.copy2(src, backup_file)
+    # A plain file copy would miss transactions still in the WAL
+    source = sqlite3.connect(f"{src.resolve().as_uri()}?mode=ro", uri=True)
+    target = sqlite3.connect(backup_file)
+    try:
+        source.backup(target)
+    except sqlite3.Error as e:
+        raise StorageError(f"Failed to back up {db_path}: {e}")
+    finally:
+        target.close()
+        source.close()
     logger.info(f"Vault DB backed up to {backup_file}")
     return backup_file
 
 
-def encrypt_backup(backup_path: str | Path, master_password: str) -> Path:
+@tracing.traced("backup.copy")
+def backup_vault(db, backup_dir: str, projects=None) -> list[Path]:
+    """
+    Back up a vault with the SQLite online backup API.
+
+    Each file is copied from a consistent snapshot while writers continue.
+    For a sharded vault every shard is copied separately into one timestamped
+    directory, so ``projects`` can limit the backup to the shards that changed.
+
+    :param db: VaultDB or ShardedVaultDB
+    :param backup_dir: Directory to store backups
+    :param projects: Only back up these projects' shards (sharded vaults only)
+    :return: Paths of the backup files
+    """
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    if not isinstance(db, ShardedVaultDB):
+        if projects:
+            raise StorageError("Per-project backups need a sharded vault")
+        targets = [(db, Path(backup_dir) / f"vault_backup_{timestamp}.db")]
+    else:
+        shards = dict(db.shards())
+        missing = set(projects or ()) - set(shards)
+        if missing:
+            raise StorageError(f"No such project(s): {', '.join(sorted(missing))}")
+        folder = Path(backup_dir) / f"vault_backup_{timestamp}"
+        # The catalog is only needed for full backups
+        targets = [] if projects else [(db, folder / db.db_path.name)]
+        targets += [
+            (db.shard(project), folder / SHARD_DIR / path.name)
+            for project, path in shards.items()
+            if not projects or project in projects
+        ]
+
+    written = []
+    for source, dest in targets:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        target = sqlite3.connect(dest)
+        try:
+            source.conn.backup(target)
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to back up {source.db_path}: {e}")
+        finally:
+            target.close()
+        written.append(dest)
+    logger.info(f"Vault backed up to {written[0].parent} ({len(written)} files)")
+    return written
+
+
+def _read_stream_header(f) -> tuple[dict, bytes]:
+    """Parse the header after `ENC_MAGIC`; returns it with the raw prefix."""
+    raw_length = f.read(_LENGTH.size)
+    if len(raw_length) != _LENGTH.size:
+        raise CryptoError("Encrypted backup is truncated")
+    (length,) = _LENGTH.unpack(raw_length)
+    raw = f.read(length)
+    try:
+        header = json.loads(raw)
+    except ValueError:
+        raise CryptoError("Encrypted backup header is corrupt")
+    if header.get("version") != ENC_VERSION:
+        raise StorageError(f"Unsupported backup format {header.get('version')}")
+    return header, ENC_MAGIC + raw_length + raw
+
+
+@contextlib.contextmanager
+def _plaintext_chunks(path: Path, master_password: str, workers: int | None):
+    """Yield an iterator over the decrypted pieces of an encrypted backup."""
+    with open(path, "rb") as f:
+        if f.read(len(ENC_MAGIC)) != ENC_MAGIC:
+            # Legacy backups: salt + iv + one AES-GCM blob
+            data = path.read_bytes()
+            salt = data[:KDF_SALT_LENGTH]
+            iv = data[KDF_SALT_LENGTH : KDF_SALT_LENGTH + AES_GCM_IV_LENGTH]
+            ciphertext = data[KDF_SALT_LENGTH + AES_GCM_IV_LENGTH :]
+            key_bytes = derive_key(master_password, salt)
+            yield iter([decrypt(key_bytes, iv, ciphertext)])
+            return
+        header, prefix = _read_stream_header(f)
+        try:
+            key_bytes = derive_key(
+                master_password,
+                base64.b64decode(header["salt"]),
+                KdfParams.decode(header["kdf"]),
+            )
+            chunk_size = int(header["chunk_size"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise CryptoError(f"Encrypted backup header is corrupt: {e}")
+        with ChunkReader(
+            f, key_bytes, prefix, chunk_size, workers or default_workers()
+        ) as reader:
+            yield iter(lambda: reader.read(chunk_size), b"")
+
+
+@tracing.traced("backup.encrypt")
+def encrypt_backup(
+    backup_path: str | Path,
+    master_password: str,
+    workers: int | None = None,
+    kdf: KdfParams | None = None,
+) -> Path:
     """
-    Encrypt backup DB file using master password. Optionally remove the unencrypted file.
+    Encrypt a backup DB file with the master password, streaming it in chunks.
 
     :param backup_path: Path to DB backup
     :param master_password: Master password for encryption
-    :param remove_plain: Remove the unencrypted backup after encrypting
+    :param workers: Threads encrypting chunks (default: `default_workers`)
+    :param kdf: KDF for the backup key (default PBKDF2)
     :return: Path to encrypted file
     """
     path = Path(backup_path)
-    data = path.read_bytes()
-
+    kdf = kdf or DEFAULT_KDF
     salt = generate_salt()
-    key_bytes = derive_key(master_password, salt)
-    iv, ciphertext = encrypt(key_bytes, data)
+    header = json.dumps(
+        {
+            "version": ENC_VERSION,
+            "kdf": kdf.encode(),
+            "salt": base64.b64encode(salt).decode("ascii"),
+            "chunk_size": CHUNK_SIZE,
+        }
+    ).encode("utf-8")
+    prefix = ENC_MAGIC + _LENGTH.pack(len(header)) + header
+    key_bytes = derive_key(master_password, salt, kdf)
 
     encrypted_file = path.with_suffix(".enc")
-    # Save salt + iv + ciphertext
-    with open(encrypted_file, "wb") as f:
-        f.write(salt + iv + ciphertext)
-
+    temp = encrypted_file.with_name(f".{encrypted_file.name}.part")
+    try:
+        with open(path, "rb") as src, open(temp, "wb") as out:
+            out.write(prefix)
+            with ChunkWriter(
+                out, key_bytes, prefix, CHUNK_SIZE, workers or default_workers()
+            ) as writer:
+                for piece in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    writer.write(piece)
+        os.replace(temp, encrypted_file)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
     return encrypted_file
 
 
-def decrypt_backup(encrypted_file: str, master_password: str) -> Path:
+@tracing.traced("backup.decrypt")
+def decrypt_backup(
+    encrypted_file: str, master_password: str, workers: int | None = None
+) -> Path:
     """
     Decrypt encrypted DB backup.
 
     :param encrypted_file: Path to .enc file
     :param master_password: Master password
+    :param workers: Threads decrypting chunks (default: `default_workers`)
     :return: Path to decrypted DB file
     """
     path = Path(encrypted_file)
-    data = path.read_bytes()
-
-    salt_len = KDF_SALT_LENGTH
-    iv_len = AES_GCM_IV_LENGTH
+    decrypted_file = path.with_suffix(".db")
+    temp = decrypted_file.with_name(f".{decrypted_file.name}.part")
+    try:
+        with (
+            _plaintext_chunks(path, master_password, workers) as chunks,
+            open(temp, "wb") as out,
+        ):
+            for piece in chunks:
+                out.write(piece)
+        os.replace(temp, decrypted_file)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    return decrypted_file
 
-    salt = data[:salt_len]
-    iv = data[salt_len : salt_len + iv_len]
-    ciphertext = data[salt_len + iv_len :]
 
-    key_bytes = derive_key(master_password, salt)
-    plaintext = decrypt(key_bytes, iv, ciphertext)
+def decrypt_backup_bytes(
+    encrypted_file: str | Path, master_password: str, workers: int | None = None
+) -> bytes:
+    """
+    Decrypt an encrypted DB backup in memory.
 
-    decrypted_file = path.with_suffix(".db")
-    decrypted_file.write_bytes(plaintext)
-    return decrypted_file
+    :return: The backup's SQLite database image
+    """
+    with _plaintext_chunks(Path(encrypted_file), master_password, workers) as chunks:
+        return b"".join(chunks)
@@ -0,0 +1,297 @@
+"""Bundle files for moving a project's secrets between vaults.
+
+A bundle is one streamed archive::
+
+    b"VAULTBDL" | u32 header length | JSON header | chunked AES-GCM stream
+
+The header is plaintext (format version, KDF parameters and salt, scope) and
+is authenticated by every chunk. The stream key is derived once per bundle
+from the master password, so exporting or importing any number of secrets
+costs a single KDF run. Inside the stream every secret is one record,
+``u32 metadata length | JSON metadata | stored ciphertext``, and a zero
+length ends the stream.
+
+Secrets travel as their stored ciphertext and are never decrypted, so the
+importing vault must use the same master password; this is checked against
+its verifier before anything is written. Keyed fingerprints are only kept
+when both vaults share a vault key and are otherwise cleared.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from vault import tracing
+from vault.crypto.kdf import KdfParams, derive_key, generate_salt
+from vault.crypto.stream import CHUNK_SIZE, ChunkReader, ChunkWriter
+from vault.exceptions import CryptoError, InvalidPasswordError, StorageError
+from vault.storage.db import SECRET_COLUMNS, _row_to_record
+from vault.storage.models import SecretRecord
+
+MAGIC = b"VAULTBDL"
+FORMAT_VERSION = 1
+CONFLICT_POLICIES = ("skip", "overwrite", "newer")
+
+_LENGTH = struct.Struct(">I")
+
+
+@dataclass
+class ImportResult:
+    added: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+
+def _vault_id(db) -> str:
+    """Identifies the vault key (salt), so fingerprints are only reused where valid."""
+    return hashlib.sha256(db.get_meta("vault_salt") or b"").hexdigest()[:16]
+
+
+def _utc(value: datetime) -> datetime:
+    # Rows written before timestamps were timezone-aware are UTC as well
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _b64(data: bytes | None) -> str | None:
+    return None if data is None else base64.b64encode(data).decode("ascii")
+
+
+def _record_meta(record: SecretRecord) -> dict:
+    return {
+        "project": record.project,
+        "environment": record.environment,
+        "key": record.key,
+        "iv": _b64(record.iv),
+        "salt": _b64(record.salt),
+        "created_at": record.created_at.isoformat(),
+        "updated_at": record.updated_at.isoformat(),
+        "is_file": record.is_file,
+        "filename": record.filename,
+        "size": record.size,
+        "fingerprint": record.fingerprint,
+        "kind": record.kind,
+        "mime": record.mime,
+        "kdf": record.kdf,
+        "value_length": len(record.value),
+    }
+
+
+def _meta_record(meta: dict, value: bytes) -> SecretRecord:
+    return SecretRecord(
+        project=meta["project"],
+        environment=meta["environment"],
+        key=meta["key"],
+        value=value,
+        iv=base64.b64decode(meta["iv"]),
+        salt=base64.b64decode(meta["salt"]),
+        created_at=datetime.fromisoformat(meta["created_at"]),
+        updated_at=datetime.fromisoformat(meta["updated_at"]),
+        is_file=bool(meta["is_file"]),
+        filename=meta.get("filename"),
+        size=meta.get("size"),
+        fingerprint=meta.get("fingerprint"),
+        kind=meta.get("kind"),
+        mime=meta.get("mime"),
+        kdf=meta.get("kdf"),
+    )
+
+
+def _open_output(out_path: str):
+    if out_path == "-":
+        return sys.stdout.buffer, None
+    dest = Path(out_path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(prefix=".vault_", suffix=".part", dir=dest.parent)
+    return os.fdopen(fd, "wb"), name
+
+
+@tracing.traced("bundle.export")
+def export_bundle(
+    db,
+    out_path: str,
+    master_password: str,
+    project: str,
+    environment: str | None = None,
+    kdf: KdfParams | None = None,
+    workers: int = 1,
+) -> int:
+    """
+    Write a project's (or one environment's) secrets to a bundle file.
+
+    :param db: VaultDB
+    :param out_path: Bundle file to create (written atomically), or ``-`` for stdout
+    :param master_password: Checked against the vault, and keys the bundle
+    :param kdf: KDF for the bundle key (default: the vault's ``kdf``)
+    :param workers: Threads sealing chunks (see `ChunkWriter`)
+    :return: Number of secrets written
+    """
+    db.unlock(master_password)
+    kdf = kdf or db.kdf
+    salt = generate_salt()
+    header = json.dumps(
+        {
+            "version": FORMAT_VERSION,
+            "kdf": kdf.encode(),
+            "salt": _b64(salt),
+            "chunk_size": CHUNK_SIZE,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "project": project,
+            "environment": environment,
+            "vault_id": _vault_id(db),
+        }
+    ).encode("utf-8")
+    prefix = MAGIC + _LENGTH.pack(len(header)) + header
+    key = derive_key(master_password, salt, kdf)
+
+    source = db.shard(project)
+    sql = f"SELECT {SECRET_COLUMNS} FROM secrets WHERE project = ?"
+    params = [project]
+    if environment is not None:
+        sql += " AND environment = ?"
+        params.append(environment)
+    sql += " ORDER BY environment, key"
+
+    out, temp_name = _open_output(out_path)
+    count = 0
+    try:
+        out.write(prefix)
+        with ChunkWriter(out, key, prefix, CHUNK_SIZE, workers) as writer:
+            if source is not None:
+                with source.snapshot():
+                    for row in source.conn.execute(sql, params):
+                        record = _row_to_record(row)
+                        meta = json.dumps(_record_meta(record)).encode("utf-8")
+                        writer.write(_LENGTH.pack(len(meta)) + meta + record.value)
+                        count += 1
+            writer.write(_LENGTH.pack(0))
+        out.flush()
+        if temp_name is not None:
+            os.fsync(out.fileno())
+            out.close()
+            os.chmod(temp_name, 0o600)
+            os.replace(temp_name, out_path)
+    except Exception as e:
+        if temp_name is not None:
+            out.close()
+            Path(temp_name).unlink(missing_ok=True)
+        if isinstance(e, (StorageError, CryptoError)):
+            raise
+        raise StorageError(f"Failed to export bundle: {e}")
+    return count
+
+
+def read_header(fileobj) -> tuple[dict, bytes]:
+    """
+    Read and parse a bundle header.
+
+    :return: ``(header, raw prefix)``; the prefix is what the chunks authenticate
+    """
+    magic = fileobj.read(len(MAGIC))
+    if magic != MAGIC:
+        raise StorageError("Not a vault bundle")
+    raw_length = fileobj.read(_LENGTH.size)
+    if len(raw_length) != _LENGTH.size:
+        raise StorageError("Bundle header is truncated")
+    (length,) = _LENGTH.unpack(raw_length)
+    raw = fileobj.read(length)
+    try:
+        header = json.loads(raw)
+    except ValueError:
+        raise StorageError("Bundle header is corrupt")
+    if header.get("version") != FORMAT_VERSION:
+        raise StorageError(f"Unsupported bundle version {header.get('version')}")
+    return header, magic + raw_length + raw
+
+
+def _records(reader: ChunkReader):
+    while True:
+        (length,) = _LENGTH.unpack(reader.read_exact(_LENGTH.size))
+        if length == 0:
+            break
+        meta = json.loads(reader.read_exact(length))
+        yield _meta_record(meta, reader.read_exact(meta["value_length"]))
+    if not reader.at_end():
+        raise CryptoError("Unexpected data after the last bundle record")
+
+
+@tracing.traced("bundle.import")
+def import_bundle(
+    db,
+    in_path: str,
+    master_password: str,
+    on_conflict: str = "skip",
+    workers: int = 1,
+) -> ImportResult:
+    """
+    Import a bundle into the vault in a single write transaction.
+
+    :param db: Writable VaultDB
+    :param in_path: Bundle file, or ``-`` for stdin
+    :param master_password: Must open both the bundle and this vault
+    :param on_conflict: For secrets that already exist: ``skip`` them,
+        ``overwrite`` them, or keep whichever is ``newer`` by ``updated_at``
+    :param workers: Threads opening chunks ahead of the import (see `ChunkReader`)
+    :return: Keys (``env/key``) added, updated and skipped
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise StorageError(f"Unknown conflict policy {on_conflict!r}")
+    db._require_writable()
+    db.unlock(master_password)
+    try:
+        source = sys.stdin.buffer if in_path == "-" else open(in_path, "rb")
+    except OSError as e:
+        raise StorageError(f"Cannot read bundle {in_path}: {e.strerror}")
+    reader = None
+    try:
+        header, prefix = read_header(source)
+        project = header["project"]
+        key = derive_key(
+            master_password,
+            base64.b64decode(header["salt"]),
+            KdfParams.decode(header["kdf"]),
+        )
+        reader = ChunkReader(source, key, prefix, header["chunk_size"], workers)
+        try:
+            # Decrypt the first chunk up front: failing here means a wrong password
+            reader.at_end()
+        except CryptoError:
+            raise InvalidPasswordError("Bundle cannot be opened with this password")
+        keep_fingerprints = header.get("vault_id") == _vault_id(db)
+        target = db.shard(project, create=True)
+        result = ImportResult()
+        with target.write_transaction():
+            for record in _records(reader):
+                if record.project != project:
+                    raise StorageError("Bundle record outside the bundle's project")
+                name = f"{record.environment}/{record.key}"
+                existing = target.get_secret(
+                    record.project, record.environment, record.key
+                )
+                if existing is not None and (
+                    on_conflict == "skip"
+                    or (
+                        on_conflict == "newer"
+                        and _utc(existing.updated_at) >= _utc(record.updated_at)
+                    )
+                ):
+                    result.skipped.append(name)
+                    continue
+                if not keep_fingerprints:
+                    record.fingerprint = None
+                target.add_secret(record)
+                (result.updated if existing else result.added).append(name)
+    except (KeyError, TypeError, ValueError) as e:
+        raise StorageError(f"Bundle is corrupt: {e}")
+    finally:
+        if reader is not None:
+            reader.close()
+        if source is not sys.stdin.buffer:
+            source.close()
+    return result
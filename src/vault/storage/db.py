@@ -5,26 +5,246 @@ This module handles DB schema creation, WAL mode for concurrency, and
 add/get/cleanup operations for secrets and file blobs.
 """
 
+import contextlib
+import hmac
+import mimetypes
 import os
+import random
+import re
 import sqlite3
+import sys
 import tempfile
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
+from typing import BinaryIO
 
+from vault import tracing
+from vault.constants import AES_GCM_TAG_LENGTH
 from vault.crypto.aes import decrypt, encrypt
-from vault.crypto.kdf import derive_key, generate_salt
-from vault.exceptions import StorageError
-from vault.storage.models import SecretRecord
+from vault.crypto.fingerprint import FINGERPRINT_CONTEXT, derive_subkey, fingerprint
+from vault.crypto.kdf import DEFAULT_KDF, KdfParams, derive_key, generate_salt
+from vault.exceptions import (
+    CryptoError,
+    InvalidPasswordError,
+    LockTimeoutError,
+    StorageError,
+)
+from vault.storage.models import SecretInfo, SecretRecord
+from vault.storage.registry import wipe_file
+
+# Subkey context of the password verifier stored in `vault_meta`
+VERIFIER_CONTEXT = b"vault-verifier-v1"
+
+# Write-lock handling. SQLite's own busy handler sleeps on a fixed schedule, so
+# waiting writers wake up in lockstep; it is kept short once the DB is open and
+# SQLITE_BUSY is retried here with jittered exponential backoff instead.
+BUSY_TIMEOUT_MS = 50
+LOCK_TIMEOUT = 30.0  # default total wait for the write lock, in seconds
+BACKOFF_BASE = 0.005
+BACKOFF_MAX = 0.25
+
+# Metadata columns `search_secrets` may match against (never the ciphertext)
+SEARCH_FIELDS = ("project", "environment", "key", "filename")
+SEARCH_MODES = ("glob", "prefix", "regex")
+
+# Every column of `secrets`, in `_row_to_record` order
+SECRET_COLUMNS = (
+    "project, environment, key, value, iv, salt, created_at, updated_at, "
+    "is_file, filename, size, fingerprint, kind, mime, kdf"
+)
+
+# Columns selected for SecretInfo rows; rows written before the `size` column
+# existed fall back to the blob length (AES-GCM ciphertext is plaintext + tag).
+_INFO_COLUMNS = (
+    "project, environment, key, is_file, filename, updated_at, "
+    f"COALESCE(size, length(value) - {AES_GCM_TAG_LENGTH}), fingerprint, kind, mime"
+)
+
+
+@lru_cache(maxsize=32)
+def _compile_regex(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, value) -> bool:
+    # SQLite calls REGEXP(pattern, value) for `value REGEXP pattern`
+    return value is not None and _compile_regex(pattern).search(value) is not None
+
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    """
+    Smallest string greater than every string starting with ``prefix``, or
+    ``None`` if there is none (empty, or only U+10FFFF characters).
+    """
+    # The last code point has no successor; bump the character before it
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return None
+    successor = ord(stem[-1]) + 1
+    if 0xD800 <= successor <= 0xDFFF:
+        # Surrogates cannot be stored as UTF-8 text
+        successor = 0xE000
+    return stem[:-1] + chr(successor)
+
+
+@dataclass
+class LockStats:
+    """Write-lock contention seen by one connection."""
+
+    transactions: int = 0
+    waits: int = 0  # operations that hit SQLITE_BUSY at least once
+    retries: int = 0
+    wait_seconds: float = 0.0
+    max_wait: float = 0.0
+    timeouts: int = 0
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    message = str(error)
+    return "database is locked" in message or "database table is locked" in message
+
+
+def _search_filter(pattern, mode, fields, project, environment) -> tuple[str, list]:
+    """Build the WHERE clause and parameters of a metadata search."""
+    if mode not in SEARCH_MODES:
+        raise StorageError(f"Unknown search mode: {mode}")
+    unknown = set(fields) - set(SEARCH_FIELDS)
+    if not fields or unknown:
+        raise StorageError(f"Unknown search fields: {sorted(unknown)}")
+    clauses, params = [], []
+    for field in fields:
+        if mode == "glob":
+            clauses.append(f"{field} GLOB ?")
+            params.append(pattern)
+        elif mode == "prefix":
+            upper = _prefix_upper_bound(pattern)
+            if upper is None:
+                clauses.append(f"{field} >= ?")
+                params.append(pattern)
+            else:
+                clauses.append(f"({field} >= ? AND {field} < ?)")
+                params.extend([pattern, upper])
+        else:
+            clauses.append(f"{field} REGEXP ?")
+            params.append(pattern)
+    where = ["(" + " OR ".join(clauses) + ")"]
+    if project is not None:
+        where.append("project = ?")
+        params.append(project)
+    if environment is not None:
+        where.append("environment = ?")
+        params.append(environment)
+    return " AND ".join(where), params
+
+
+def _row_to_info(row) -> SecretInfo:
+    return SecretInfo(
+        project=row[0],
+        environment=row[1],
+        key=row[2],
+        is_file=bool(row[3]),
+        filename=row[4],
+        updated_at=datetime.fromisoformat(row[5]),
+        size=row[6],
+        fingerprint=row[7],
+        kind=row[8],
+        mime=row[9],
+    )
+
+
+def decrypt_record(record: SecretRecord, master_password: str) -> bytes:
+    """
+    Decrypt a record with its recorded KDF parameters.
+
+    Pure function with no DB access, so it is safe to call from worker threads.
+    """
+    key_bytes = derive_key(master_password, record.salt, KdfParams.decode(record.kdf))
+    return decrypt(key_bytes, record.iv, record.value)
+
+
+def _row_to_record(row) -> SecretRecord:
+    return SecretRecord(
+        project=row[0],
+        environment=row[1],
+        key=row[2],
+        value=row[3],
+        iv=row[4],
+        salt=row[5],
+        created_at=datetime.fromisoformat(row[6]),
+        updated_at=datetime.fromisoformat(row[7]),
+        is_file=bool(row[8]),
+        filename=row[9],
+        size=row[10],
+        fingerprint=row[11],
+        kind=row[12],
+        mime=row[13],
+        kdf=row[14],
+    )
 
 
 class VaultDB:
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        readonly: bool = False,
+        immutable: bool = False,
+        kdf: KdfParams | None = None,
+        upgrade_kdf: bool = True,
+        lock_timeout: float | None = LOCK_TIMEOUT,
+        check_same_thread: bool = True,
+    ):
+        """
+        Open (and if needed create) the vault DB.
+
+        :param db_path: Path to vault.db
+        :param readonly: Open with ``mode=ro``; no schema, chmod or migration work
+            is attempted so concurrent readers never take write locks.
+        :param immutable: Additionally pass ``immutable=1`` so SQLite skips all
+            locking and change detection. Only safe for snapshot files that no
+            process is writing to (implies ``readonly``).
+        :param kdf: KDF parameters for newly written secrets (default PBKDF2)
+        :param upgrade_kdf: Re-encrypt secrets under ``kdf`` when they are
+            decrypted with other parameters (skipped on read-only opens)
+        :param lock_timeout: Seconds a write waits for other writers before
+            raising `LockTimeoutError` (``None``: wait indefinitely)
+        :param check_same_thread: As for `sqlite3.connect`; pass ``False`` to use
+            the connection from other threads (callers must serialise access)
+        """
         self.db_path = Path(db_path)
+        self.immutable = immutable
+        self.readonly = readonly or immutable
+        self._vault_key: tuple[str, bytes] | None = None
+        self._unlocked: str | None = None
+        self.kdf = kdf or DEFAULT_KDF
+        self.kdf.validate()
+        self.upgrade_kdf = upgrade_kdf
+        self.lock_timeout = lock_timeout
+        self.check_same_thread = check_same_thread
+        self.lock_stats = LockStats()
+        self._tx_depth = 0
+        with tracing.span("db.open", readonly=self.readonly):
+            self._open()
+        if tracing.enabled():
+            self.conn = tracing.TracedConnection(self.conn)
+
+    def _open(self):
+        if self.readonly:
+            self.conn = self._connect_readonly()
+            return
         # Ensure parent directory exists
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         # Set a reasonable timeout and enable WAL for better concurrency
-        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn = sqlite3.connect(
+            self.db_path, timeout=30, check_same_thread=self.check_same_thread
+        )
         try:
+            # Only takes effect on a new, empty file (so before WAL is set) or
+            # on the next VACUUM, which converts existing DBs (vault optimize)
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
             self.conn.execute("PRAGMA journal_mode=WAL;")
             self.conn.execute("PRAGMA foreign_keys = ON;")
         except Exception:
@@ -41,12 +261,136 @@ class VaultDB:
         try:
             from vault.storage.migrations import apply_migrations
 
-            apply_migrations(self.conn)
+            with tracing.span("db.migrate"):
+                apply_migrations(self.conn)
         except Exception:
             # Migration failures shouldn't silently prevent the DB from being usable,
             # but they should be reported; for now this is a best-effort, and tests
             # can handle errors otherwise.
             pass
+        # From here on every write goes through `write_transaction`, which
+        # retries SQLITE_BUSY itself.
+        self.conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+
+    def _connect_readonly(self) -> sqlite3.Connection:
+        if not self.db_path.is_file():
+            raise StorageError(f"DB not found at {self.db_path}")
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        try:
+            conn = sqlite3.connect(
+                uri,
+                uri=True,
+                timeout=30,
+                check_same_thread=self.check_same_thread,
+            )
+            # Belt and braces: refuse writes at the connection level too
+            conn.execute("PRAGMA query_only = ON;")
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to open DB read-only: {e}")
+        return conn
+
+    def _require_writable(self):
+        if self.readonly:
+            raise StorageError("Vault DB is opened read-only")
+
+    def retry_busy(self, operation):
+        """
+        Call ``operation()``, retrying on SQLITE_BUSY with jittered backoff.
+
+        :raises LockTimeoutError: if the lock is still held after ``lock_timeout``
+        """
+        attempt = 0
+        started = None
+        while True:
+            try:
+                result = operation()
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e):
+                    raise
+                now = time.monotonic()
+                if started is None:
+                    started = now
+                    self.lock_stats.waits += 1
+                    tracing.count("sql.lock_waits")
+                waited = now - started
+                if self.lock_timeout is not None and waited >= self.lock_timeout:
+                    self._record_wait(waited, attempt)
+                    self.lock_stats.timeouts += 1
+                    raise LockTimeoutError(
+                        f"Vault DB is locked by another writer (waited {waited:.1f}s)"
+                    )
+                # Full jitter keeps competing writers from retrying in lockstep
+                time.sleep(
+                    random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+                )
+                attempt += 1
+                continue
+            if started is not None:
+                self._record_wait(time.monotonic() - started, attempt)
+            return result
+
+    def _record_wait(self, waited: float, retries: int):
+        stats = self.lock_stats
+        stats.retries += retries
+        stats.wait_seconds += waited
+        stats.max_wait = max(stats.max_wait, waited)
+        tracing.count("sql.lock_retries", retries)
+
+    @contextlib.contextmanager
+    def write_transaction(self):
+        """
+        Run a block inside ``BEGIN IMMEDIATE`` and commit it at the end.
+
+        The write lock is taken before the block runs, so anything it reads is
+        still current when its writes land (no lost updates between processes).
+        Nested calls join the outer transaction; an exception rolls it back.
+        """
+        self._require_writable()
+        if self._tx_depth:
+            self._tx_depth += 1
+            try:
+                yield self.conn
+            finally:
+                self._tx_depth -= 1
+            return
+        self.retry_busy(lambda: self.conn.execute("BEGIN IMMEDIATE"))
+        self.lock_stats.transactions += 1
+        self._tx_depth = 1
+        try:
+            yield self.conn
+            self.retry_busy(self.conn.commit)
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            self._tx_depth = 0
+
+    @contextlib.contextmanager
+    def snapshot(self):
+        """
+        Run several reads against one consistent snapshot of the DB.
+
+        Opens a deferred transaction, which in WAL mode pins the snapshot at
+        the first read without blocking writers; it is released at the end.
+        """
+        if self.conn.in_transaction:
+            yield self.conn
+            return
+        self.conn.execute("BEGIN DEFERRED")
+        try:
+            yield self.conn
+        finally:
+            self.conn.rollback()
+
+    def databases(self) -> list["VaultDB"]:
+        """The SQLite databases backing this vault (one unless sharded)."""
+        return [self]
+
+    def shard(self, project: str, create: bool = False) -> "VaultDB | None":
+        """The DB holding ``project``'s secrets (this one unless sharded)."""
+        return self
 
     def close(self):
         try:
@@ -87,44 +431,135 @@ class VaultDB:
             raise StorageError(f"Failed to create table: {e}")
 
     def add_secret(self, record: SecretRecord):
+        self._require_writable()
+        kind = record.kind or ("file" if record.is_file else "text")
         try:
             # Preserve created_at on update using ON CONFLICT DO UPDATE pattern
-            self.conn.execute(
-                """
-                INSERT INTO secrets
-                (project, environment, key, value, iv, salt, created_at, updated_at, is_file)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(project, environment, key)
-                DO UPDATE SET
-                    value=excluded.value,
-                    iv=excluded.iv,
-                    salt=excluded.salt,
-                    updated_at=excluded.updated_at,
-                    is_file=excluded.is_file
-                """,
-                (
-                    record.project,
-                    record.environment,
-                    record.key,
-                    record.value,
-                    record.iv,
-                    record.salt,
-                    record.created_at.isoformat(),
-                    record.updated_at.isoformat(),
-                    int(record.is_file),
-                ),
-            )
-            self.conn.commit()
+            with self.write_transaction():
+                self.conn.execute(
+                    """
+                    INSERT INTO secrets
+                    (project, environment, key, value, iv, salt, created_at, updated_at,
+                     is_file, filename, size, fingerprint, kind, mime, kdf)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(project, environment, key)
+                    DO UPDATE SET
+                        value=excluded.value,
+                        iv=excluded.iv,
+                        salt=excluded.salt,
+                        updated_at=excluded.updated_at,
+                        is_file=excluded.is_file,
+                        filename=excluded.filename,
+                        size=excluded.size,
+                        fingerprint=excluded.fingerprint,
+                        kind=excluded.kind,
+                        mime=excluded.mime,
+                        kdf=excluded.kdf
+                    """,
+                    (
+                        record.project,
+                        record.environment,
+                        record.key,
+                        record.value,
+                        record.iv,
+                        record.salt,
+                        record.created_at.isoformat(),
+                        record.updated_at.isoformat(),
+                        int(record.is_file),
+                        record.filename,
+                        record.size,
+                        record.fingerprint,
+                        kind,
+                        record.mime,
+                        record.kdf,
+                    ),
+                )
+                # A key written again after a delete is live again
+                self.conn.execute(
+                    "DELETE FROM tombstones WHERE project=? AND environment=? AND key=?",
+                    (record.project, record.environment, record.key),
+                )
+        except StorageError:
+            raise
         except Exception as e:
             raise StorageError(f"Failed to add secret: {e}")
 
+    def delete_secret(self, project: str, environment: str, key: str) -> bool:
+        """
+        Delete a secret and leave a tombstone so `vault sync` propagates it.
+
+        :return: Whether the secret existed
+        """
+        self._require_writable()
+        try:
+            with self.write_transaction() as conn:
+                deleted = conn.execute(
+                    "DELETE FROM secrets WHERE project=? AND environment=? AND key=?",
+                    (project, environment, key),
+                ).rowcount
+                if deleted:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO tombstones VALUES (?, ?, ?, ?)",
+                        (
+                            project,
+                            environment,
+                            key,
+                            datetime.now(timezone.utc).isoformat(),
+                        ),
+                    )
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(f"Failed to delete secret: {e}")
+        return bool(deleted)
+
+    def delete_secrets(
+        self,
+        project: str,
+        environment: str | None = None,
+        pattern: str | None = None,
+    ) -> list[SecretInfo]:
+        """
+        Delete a project's secrets in one transaction, leaving tombstones.
+
+        :param environment: Only delete from this environment
+        :param pattern: Only delete keys matching this glob
+        :return: Metadata of the deleted secrets
+        """
+        self._require_writable()
+        where, params = _search_filter(
+            "*" if pattern is None else pattern, "glob", ("key",), project, environment
+        )
+        try:
+            with self.write_transaction() as conn:
+                deleted = [
+                    _row_to_info(row)
+                    for row in conn.execute(
+                        f"SELECT {_INFO_COLUMNS} FROM secrets WHERE {where} "
+                        "ORDER BY project, environment, key",
+                        params,
+                    )
+                ]
+                conn.execute(
+                    "INSERT OR REPLACE INTO tombstones "
+                    f"SELECT project, environment, key, ? FROM secrets WHERE {where}",
+                    [datetime.now(timezone.utc).isoformat(), *params],
+                )
+                conn.execute(f"DELETE FROM secrets WHERE {where}", params)
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(f"Failed to delete secrets: {e}")
+        return deleted
+
     def get_secret(
         self, project: str, environment: str, key: str
     ) -> SecretRecord | None:
         try:
             cursor = self.conn.execute(
                 """
-                SELECT project, environment, key, value, iv, salt, created_at, updated_at, is_file
+                SELECT project, environment, key, value, iv, salt, created_at, updated_at,
+                       is_file, filename, size, fingerprint, kind, mime, kdf
                 FROM secrets
                 WHERE project=? AND environment=? AND key=?
                 """,
@@ -133,20 +568,351 @@ class VaultDB:
             row = cursor.fetchone()
             if not row:
                 return None
-            return SecretRecord(
-                project=row[0],
-                environment=row[1],
-                key=row[2],
-                value=row[3],
-                iv=row[4],
-                salt=row[5],
-                created_at=datetime.fromisoformat(row[6]),
-                updated_at=datetime.fromisoformat(row[7]),
-                is_file=bool(row[8]),
-            )
+            return _row_to_record(row)
         except Exception as e:
             raise StorageError(f"Failed to retrieve secret: {e}")
 
+    def get_secrets(
+        self, project: str, environment: str, keys
+    ) -> dict[str, SecretRecord]:
+        """
+        Fetch several secrets of one project/environment in a single query.
+
+        :return: Records by key; keys that do not exist are left out
+        """
+        keys = sorted(set(keys))
+        records = {}
+        try:
+            # Stay well under SQLite's default host-parameter limit
+            for i in range(0, len(keys), 500):
+                part = keys[i : i + 500]
+                cursor = self.conn.execute(
+                    f"""
+                    SELECT {SECRET_COLUMNS}
+                    FROM secrets
+                    WHERE project=? AND environment=?
+                      AND key IN ({", ".join("?" * len(part))})
+                    """,
+                    (project, environment, *part),
+                )
+                for row in cursor:
+                    records[row[2]] = _row_to_record(row)
+        except Exception as e:
+            raise StorageError(f"Failed to retrieve secrets: {e}")
+        return records
+
+    def get_meta(self, name: str) -> bytes | None:
+        """Return a vault-wide parameter from `vault_meta`, if set."""
+        try:
+            row = self.conn.execute(
+                "SELECT value FROM vault_meta WHERE name=?", (name,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # Read-only open of a DB that predates the vault_meta migration
+            return None
+        return row[0] if row else None
+
+    def set_meta(self, name: str, value: bytes, replace: bool = True) -> bytes:
+        """
+        Store a vault-wide parameter and return the value now in effect.
+
+        With ``replace=False`` an existing value wins, which makes concurrent
+        first-time initialisation race-free.
+        """
+        self._require_writable()
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        try:
+            with self.write_transaction():
+                self.conn.execute(
+                    f"{verb} INTO vault_meta (name, value) VALUES (?, ?)",
+                    (name, value),
+                )
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(f"Failed to store vault metadata: {e}")
+        return self.get_meta(name)
+
+    def unlock(self, master_password: str):
+        """
+        Check the master password once, up front, against the vault's verifier.
+
+        Costs a single KDF run (cached for the connection), so bulk operations
+        fail fast instead of after N per-secret derivations, and writes under a
+        mistyped password are refused. Vaults created before verifiers existed
+        are checked by decrypting their smallest secret and then get one.
+
+        :raises InvalidPasswordError: if the password does not open this vault
+        """
+        if self._unlocked == master_password:
+            return
+        verifier = self.get_meta("verifier")
+        if verifier is None:
+            self._check_against_sample(master_password)
+            if not self.readonly:
+                ours = derive_subkey(
+                    self._derive_vault_key(master_password), VERIFIER_CONTEXT
+                )
+                # Another process may have initialised the vault concurrently
+                verifier = self.set_meta("verifier", ours, replace=False)
+        if verifier is not None:
+            check = derive_subkey(
+                self._derive_vault_key(master_password), VERIFIER_CONTEXT
+            )
+            if not hmac.compare_digest(check, verifier):
+                raise InvalidPasswordError("Incorrect master password")
+        self._unlocked = master_password
+
+    def _check_against_sample(self, master_password: str):
+        row = self.conn.execute(
+            """
+            SELECT value, iv, salt, kdf FROM secrets
+            ORDER BY COALESCE(size, length(value)) LIMIT 1
+            """
+        ).fetchone()
+        if row is None:
+            return
+        value, iv, salt, kdf = row
+        try:
+            decrypt(derive_key(master_password, salt, KdfParams.decode(kdf)), iv, value)
+        except CryptoError:
+            raise InvalidPasswordError("Incorrect master password")
+
+    def vault_key(self, master_password: str) -> bytes:
+        """
+        Return the vault-wide key for a verified master password.
+
+        This costs one KDF run against the per-vault salt and is cached for the
+        lifetime of the connection, so bulk operations pay it only once.
+        """
+        self.unlock(master_password)
+        return self._derive_vault_key(master_password)
+
+    def _derive_vault_key(self, master_password: str) -> bytes:
+        if self._vault_key and self._vault_key[0] == master_password:
+            return self._vault_key[1]
+        salt = self.get_meta("vault_salt")
+        if salt is None:
+            self.set_meta("vault_kdf", self.kdf.encode().encode(), replace=False)
+            salt = self.set_meta("vault_salt", generate_salt(), replace=False)
+        params = self.get_meta("vault_kdf")
+        key_bytes = derive_key(
+            master_password, salt, KdfParams.decode(params.decode() if params else None)
+        )
+        self._vault_key = (master_password, key_bytes)
+        return key_bytes
+
+    def fingerprint(self, master_password: str, data: bytes) -> str:
+        """Keyed fingerprint of ``data``, comparable across this vault's rows."""
+        fp_key = derive_subkey(self.vault_key(master_password), FINGERPRINT_CONTEXT)
+        return fingerprint(fp_key, data)
+
+    def decrypt_secret(self, record: SecretRecord, master_password: str) -> bytes:
+        """
+        Decrypt a stored secret with the KDF parameters recorded for it.
+
+        If those differ from this connection's ``kdf`` the secret is lazily
+        re-encrypted under the current parameters (best effort).
+        """
+        plaintext = decrypt_record(record, master_password)
+        if (
+            self.upgrade_kdf
+            and not self.readonly
+            and KdfParams.decode(record.kdf) != self.kdf
+        ):
+            try:
+                self._reencrypt_record(record, plaintext, master_password)
+            except Exception:
+                # Upgrading is an optimisation; the secret was read either way
+                pass
+        return plaintext
+
+    def _reencrypt_record(
+        self, record: SecretRecord, plaintext: bytes, master_password: str
+    ):
+        salt = generate_salt()
+        iv, ciphertext = encrypt(derive_key(master_password, salt, self.kdf), plaintext)
+        # Only replace the exact version we decrypted; updated_at is kept since
+        # the secret's content did not change.
+        with self.write_transaction():
+            self.conn.execute(
+                """
+                UPDATE secrets SET value=?, iv=?, salt=?, kdf=?
+                WHERE project=? AND environment=? AND key=? AND updated_at=?
+                """,
+                (
+                    ciphertext,
+                    iv,
+                    salt,
+                    self.kdf.encode(),
+                    record.project,
+                    record.environment,
+                    record.key,
+                    record.updated_at.isoformat(),
+                ),
+            )
+
+    def add_text_secret(
+        self,
+        project: str,
+        environment: str,
+        key: str,
+        value: str,
+        master_password: str,
+    ):
+        """
+        Encrypt a text secret and store it in the vault DB.
+
+        :param project: Project name
+        :param environment: Environment name (dev/prod)
+        :param key: Secret key name
+        :param value: Plaintext secret value
+        :param master_password: Master password for key derivation
+        """
+        self._require_writable()
+        self.unlock(master_password)
+        data = value.encode("utf-8")
+        # Reuse the existing salt on update; the IV is always fresh
+        existing = self.get_secret(project, environment, key)
+        salt = existing.salt if existing else generate_salt()
+        key_bytes = derive_key(master_password, salt, self.kdf)
+        iv, ciphertext = encrypt(key_bytes, data)
+
+        now = datetime.now(timezone.utc)
+        record = SecretRecord(
+            project=project,
+            environment=environment,
+            key=key,
+            value=ciphertext,
+            iv=iv,
+            salt=salt,
+            created_at=now,
+            updated_at=now,
+            is_file=False,
+            size=len(data),
+            fingerprint=self.fingerprint(master_password, data),
+            kind="text",
+            kdf=self.kdf.encode(),
+        )
+        self.add_secret(record)
+
+    def list_projects(
+        self, after: str | None = None, limit: int | None = None
+    ) -> Iterator[str]:
+        """
+        Yield project names in order, starting after ``after``.
+
+        Each name costs one primary-key index seek, so enumerating projects does
+        not scan their secrets and runs in constant memory.
+        """
+        return self._walk_distinct("project", (), after, limit)
+
+    def list_environments(
+        self, project: str, after: str | None = None, limit: int | None = None
+    ) -> Iterator[str]:
+        """Yield the environment names of ``project`` in order (index seeks)."""
+        return self._walk_distinct("environment", (("project", project),), after, limit)
+
+    def list_entries(
+        self,
+        project: str,
+        environment: str,
+        after: str | None = None,
+        limit: int | None = None,
+    ) -> Iterator[SecretInfo]:
+        """
+        Yield metadata for the secrets of ``project``/``environment`` ordered by key.
+
+        Uses keyset pagination: pass the last key seen as ``after`` to continue.
+        """
+        where, params = ["project = ?", "environment = ?"], [project, environment]
+        if after is not None:
+            where.append("key > ?")
+            params.append(after)
+        sql = f"""
+            SELECT {_INFO_COLUMNS}
+            FROM secrets
+            WHERE {" AND ".join(where)}
+            ORDER BY key
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        try:
+            cursor = self.conn.execute(sql, params)
+        except Exception as e:
+            raise StorageError(f"Failed to list secrets: {e}")
+        return (_row_to_info(row) for row in cursor)
+
+    def _walk_distinct(self, column, scope, after, limit) -> Iterator[str]:
+        # Emulates a loose index scan: `SELECT DISTINCT` would visit every index
+        # entry, while repeated MIN(col) > ? seeks touch one entry per value.
+        scoped = [f"{name} = ?" for name, _ in scope]
+        first_sql = f"SELECT MIN({column}) FROM secrets"
+        if scoped:
+            first_sql += " WHERE " + " AND ".join(scoped)
+        next_sql = f"SELECT MIN({column}) FROM secrets WHERE " + " AND ".join(
+            scoped + [f"{column} > ?"]
+        )
+        params = [value for _, value in scope]
+        current = after
+        count = 0
+        while limit is None or count < limit:
+            try:
+                if current is None:
+                    row = self.conn.execute(first_sql, params).fetchone()
+                else:
+                    row = self.conn.execute(next_sql, params + [current]).fetchone()
+            except Exception as e:
+                raise StorageError(f"Failed to list {column}s: {e}")
+            if row is None or row[0] is None:
+                return
+            current = row[0]
+            count += 1
+            yield current
+
+    def search_secrets(
+        self,
+        pattern: str,
+        mode: str = "glob",
+        fields: tuple[str, ...] = SEARCH_FIELDS,
+        project: str | None = None,
+        environment: str | None = None,
+    ) -> Iterator[SecretInfo]:
+        """
+        Find secrets whose metadata matches ``pattern`` without decrypting anything.
+
+        Glob and prefix matches are answered from the column indexes; regex
+        matches scan metadata only.
+
+        :param pattern: Glob (``STRIPE_*``), literal prefix or Python regex
+        :param mode: One of ``glob``, ``prefix`` or ``regex``
+        :param fields: Metadata columns to match (any of them may match)
+        :param project: Optionally restrict to one project
+        :param environment: Optionally restrict to one environment
+        """
+        where, params = _search_filter(pattern, mode, fields, project, environment)
+
+        try:
+            if mode == "regex":
+                _compile_regex(pattern)
+                self.conn.create_function("REGEXP", 2, _regexp, deterministic=True)
+            cursor = self.conn.execute(
+                f"""
+                SELECT {_INFO_COLUMNS}
+                FROM secrets
+                WHERE {where}
+                ORDER BY project, environment, key
+                """,
+                params,
+            )
+        except re.error as e:
+            raise StorageError(f"Invalid regex {pattern!r}: {e}")
+        except Exception as e:
+            raise StorageError(f"Failed to search secrets: {e}")
+
+        return (_row_to_info(row) for row in cursor)
+
     def add_file_secret(
         self,
         project: str,
@@ -164,15 +930,18 @@ class VaultDB:
         :param filepath: Path to the file to encrypt
         :param master_password: Master password for key derivation
         """
+        self._require_writable()
         path = Path(filepath)
         if not path.exists() or not path.is_file():
             raise StorageError(f"File {filepath} does not exist")
 
+        self.unlock(master_password)
         data = path.read_bytes()
         salt = generate_salt()
-        key_bytes = derive_key(master_password, salt)
+        key_bytes = derive_key(master_password, salt, self.kdf)
         iv, ciphertext = encrypt(key_bytes, data)
 
+        now = datetime.now(timezone.utc)
         record = SecretRecord(
             project=project,
             environment=environment,
@@ -180,12 +949,92 @@ class VaultDB:
             value=ciphertext,
             iv=iv,
             salt=salt,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
+            created_at=now,
+            updated_at=now,
             is_file=True,
+            filename=path.name,
+            size=len(data),
+            fingerprint=self.fingerprint(master_password, data),
+            kind="file",
+            mime=mimetypes.guess_type(path.name)[0],
+            kdf=self.kdf.encode(),
         )
         self.add_secret(record)
 
+    def decrypt_file_secret(
+        self, project: str, environment: str, key: str, master_password: str
+    ) -> bytes:
+        """
+        Decrypt a file secret into memory without touching the disk.
+
+        :return: The plaintext file contents
+        """
+        record = self.get_secret(project, environment, key)
+        if not record or not record.is_file:
+            raise StorageError(
+                f"No file secret found for {project}/{environment}/{key}"
+            )
+        return self.decrypt_secret(record, master_password)
+
+    def write_file_secret_to(
+        self,
+        project: str,
+        environment: str,
+        key: str,
+        master_password: str,
+        out: int | BinaryIO,
+    ) -> int:
+        """
+        Stream a decrypted file secret into a pipe, socket or open file.
+
+        Nothing is written to disk unless ``out`` itself is a disk file.
+
+        :param out: A file descriptor or a binary file object (e.g. stdout)
+        :return: Number of bytes written
+        """
+        plaintext = self.decrypt_file_secret(project, environment, key, master_password)
+        try:
+            if isinstance(out, int):
+                view = memoryview(plaintext)
+                while view:
+                    view = view[os.write(out, view) :]
+            else:
+                out.write(plaintext)
+                out.flush()
+        except OSError as e:
+            raise StorageError(f"Failed to write decrypted file: {e}")
+        return len(plaintext)
+
+    def open_file_secret_memfd(
+        self, project: str, environment: str, key: str, master_password: str
+    ) -> int:
+        """
+        Decrypt a file secret into an anonymous in-memory file (Linux only).
+
+        The returned descriptor is positioned at the start and sealed against
+        further modification; a child process that inherits it can open the
+        contents via ``/proc/self/fd/<fd>``. The caller must close it.
+        """
+        if not hasattr(os, "memfd_create"):
+            raise StorageError("In-memory files (memfd) are not supported here")
+        import fcntl  # POSIX only; memfd implies Linux
+
+        fd = os.memfd_create(
+            f"vault_{Path(key).name}", os.MFD_CLOEXEC | os.MFD_ALLOW_SEALING
+        )
+        try:
+            self.write_file_secret_to(project, environment, key, master_password, fd)
+            os.lseek(fd, 0, os.SEEK_SET)
+            fcntl.fcntl(
+                fd,
+                fcntl.F_ADD_SEALS,
+                fcntl.F_SEAL_SHRINK | fcntl.F_SEAL_GROW | fcntl.F_SEAL_WRITE,
+            )
+        except Exception:
+            os.close(fd)
+            raise
+        return fd
+
     def get_file_secret(
         self,
         project: str,
@@ -204,18 +1053,11 @@ class VaultDB:
         :param output_dir: Optional directory for temp file
         :return: Path to the decrypted temporary file
         """
-        record = self.get_secret(project, environment, key)
-        if not record or not record.is_file:
-            raise StorageError(
-                f"No file secret found for {project}/{environment}/{key}"
-            )
-
-        key_bytes = derive_key(master_password, record.salt)
-        plaintext = decrypt(key_bytes, record.iv, record.value)
+        plaintext = self.decrypt_file_secret(project, environment, key, master_password)
 
         temp_dir = Path(output_dir) if output_dir else Path(tempfile.gettempdir())
         # Use key (which is the original filename) to restore name and extension
-        orig_name = record.key
+        orig_name = key
         safe_name = Path(orig_name).name
         suffix = Path(safe_name).suffix or ".tmp"
         prefix = f"vault_{Path(safe_name).stem}_"
@@ -256,25 +1098,4 @@ class VaultDB:
         Securely delete a temporary file after use.
         Note: Secure deletion cannot be guaranteed on all filesystems (SSD, snapshots).
         """
-        path = Path(filepath)
-        if path.exists():
-            try:
-                # Overwrite in chunks and then delete
-                chunk_size = 1024 * 1024  # 1 MB
-                size = path.stat().st_size
-                with open(path, "r+b") as f:
-                    f.seek(0)
-                    remaining = size
-                    zero_chunk = b"\x00" * min(chunk_size, remaining)
-                    while remaining > 0:
-                        write_size = min(chunk_size, remaining)
-                        f.write(zero_chunk[:write_size])
-                        remaining -= write_size
-                    f.flush()
-                try:
-                    path.unlink()
-                except Exception:
-                    # If delete fails, leave a warning to the caller
-                    raise
-            except Exception as e:
-                raise StorageError(f"Failed to cleanup temp file {filepath}: {e}")
+        wipe_file(filepath)
@@ -0,0 +1,168 @@
+"""Comparing environments by keyed fingerprint.
+
+Every secret's row carries a keyed HMAC fingerprint of its plaintext (see
+`VaultDB.fingerprint`), so two environments of one vault can be compared
+without decrypting anything. When both live in the same DB this is a single
+join over the ``(project, environment, key, fingerprint)`` covering index
+(migration ``0007_add_fingerprint_index``), which never touches the
+ciphertext pages. Environments in different shards are compared by merging
+two scans of that index.
+
+Rows written before fingerprints existed (or imported from a vault with a
+different vault key) have none, and compare as ``unknown`` until
+`backfill_fingerprints` has decrypted them once.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from vault import tracing
+from vault.exceptions import StorageError
+from vault.storage.db import SECRET_COLUMNS, _row_to_record, decrypt_record
+
+
+@dataclass
+class DiffResult:
+    equal: list[str] = field(default_factory=list)
+    different: list[str] = field(default_factory=list)
+    missing: list[str] = field(default_factory=list)  # in A, not in B
+    extra: list[str] = field(default_factory=list)  # in B, not in A
+    unknown: list[str] = field(default_factory=list)  # no fingerprint on a side
+
+    @property
+    def in_sync(self) -> bool:
+        return not (self.different or self.missing or self.extra or self.unknown)
+
+
+_JOIN = """
+    SELECT a.key, a.fingerprint, b.fingerprint, b.key IS NOT NULL
+    FROM secrets a LEFT JOIN secrets b
+      ON b.project = :pb AND b.environment = :eb AND b.key = a.key
+    WHERE a.project = :pa AND a.environment = :ea
+    UNION ALL
+    SELECT b.key, NULL, b.fingerprint, 2
+    FROM secrets b
+    WHERE b.project = :pb AND b.environment = :eb AND NOT EXISTS (
+        SELECT 1 FROM secrets a
+        WHERE a.project = :pa AND a.environment = :ea AND a.key = b.key
+    )
+    ORDER BY 1
+"""
+
+
+def _joined(db, a, b) -> list[tuple]:
+    params = {"pa": a[0], "ea": a[1], "pb": b[0], "eb": b[1]}
+    try:
+        return db.conn.execute(_JOIN, params).fetchall()
+    except Exception as e:
+        raise StorageError(f"Failed to compare environments: {e}")
+
+
+def _fingerprints(db, project: str, environment: str) -> dict[str, str | None]:
+    if db is None:
+        return {}
+    try:
+        cursor = db.conn.execute(
+            "SELECT key, fingerprint FROM secrets WHERE project = ? AND environment = ?",
+            (project, environment),
+        )
+        return dict(cursor.fetchall())
+    except Exception as e:
+        raise StorageError(f"Failed to read fingerprints: {e}")
+
+
+def _merged(db, a, b) -> list[tuple]:
+    left = _fingerprints(db.shard(a[0]), *a)
+    right = _fingerprints(db.shard(b[0]), *b)
+    rows = []
+    for key in sorted(left.keys() | right.keys()):
+        if key not in right:
+            rows.append((key, left[key], None, 0))
+        elif key not in left:
+            rows.append((key, None, right[key], 2))
+        else:
+            rows.append((key, left[key], right[key], 1))
+    return rows
+
+
+@tracing.traced("diff")
+def diff_environments(db, a: tuple[str, str], b: tuple[str, str]) -> DiffResult:
+    """
+    Compare the secrets of two ``(project, environment)`` scopes.
+
+    Nothing is decrypted and no password is needed, so this works on a
+    read-only vault.
+
+    :return: Keys equal or different in both, only in A (``missing``) or only
+        in B (``extra``), and ``unknown`` where a fingerprint is absent
+    """
+    first, second = db.shard(a[0]), db.shard(b[0])
+    if first is not None and first is second:
+        rows = _joined(first, a, b)
+    else:
+        rows = _merged(db, a, b)
+    result = DiffResult()
+    for key, left, right, state in rows:
+        if state == 0:
+            result.missing.append(key)
+        elif state == 2:
+            result.extra.append(key)
+        elif left is None or right is None:
+            result.unknown.append(key)
+        elif left == right:
+            result.equal.append(key)
+        else:
+            result.different.append(key)
+    return result
+
+
+def backfill_fingerprints(
+    db, master_password: str, scopes, workers: int | None = None
+) -> int:
+    """
+    Decrypt rows of the given ``(project, environment)`` scopes that have no
+    fingerprint yet and store one. A one-off cost per row.
+
+    :param workers: Decryption threads (default: ``min(32, cpu_count + 4)``)
+    :return: Number of rows updated
+    """
+    db._require_writable()
+    db.unlock(master_password)
+    updated = 0
+    for project, environment in scopes:
+        target = db.shard(project)
+        if target is None:
+            continue
+        rows = target.conn.execute(
+            f"""
+            SELECT {SECRET_COLUMNS} FROM secrets
+            WHERE project = ? AND environment = ? AND fingerprint IS NULL
+            """,
+            (project, environment),
+        ).fetchall()
+        if not rows:
+            continue
+        records = [_row_to_record(row) for row in rows]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            plaintexts = list(
+                pool.map(lambda r: decrypt_record(r, master_password), records)
+            )
+        with target.write_transaction() as conn:
+            for record, plaintext in zip(records, plaintexts):
+                # Skip rows rewritten meanwhile; they got a fingerprint then
+                cursor = conn.execute(
+                    """
+                    UPDATE secrets SET fingerprint = ?
+                    WHERE project = ? AND environment = ? AND key = ?
+                      AND updated_at = ? AND fingerprint IS NULL
+                    """,
+                    (
+                        db.fingerprint(master_password, plaintext),
+                        record.project,
+                        record.environment,
+                        record.key,
+                        record.updated_at.isoformat(),
+                    ),
+                )
+                updated += cursor.rowcount
+    return updated
@@ -0,0 +1,294 @@
+"""Vault DB statistics and maintenance.
+
+`collect_stats` reports where the space goes (rows per project/environment,
+ciphertext size histogram, pages, freelist, WAL and per-index sizes) from
+metadata and SQLite pragmas only; nothing is decrypted and nothing is
+written, so it works on read-only opens. `optimize` checkpoints and
+truncates the WAL, refreshes planner statistics and can VACUUM.
+`reclaim_space` hands free pages back to the filesystem with
+`PRAGMA incremental_vacuum` in short, bounded write transactions.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from vault.exceptions import StorageError
+
+# Planner statistics sample at most this many rows per index
+ANALYSIS_LIMIT = 1000
+
+# Free pages released per incremental_vacuum transaction; other writers get
+# the lock between steps
+RECLAIM_STEP_PAGES = 256
+
+
+@dataclass
+class ScopeStats:
+    project: str
+    environment: str
+    rows: int
+    files: int
+    plaintext_bytes: int
+    stored_bytes: int
+
+
+@dataclass
+class ObjectStats:
+    name: str
+    table: str
+    is_index: bool
+    pages: int | None = None
+    bytes: int | None = None
+    stat: str | None = None  # sqlite_stat1 summary, once ANALYZE has run
+
+
+@dataclass
+class VaultStats:
+    rows: int = 0
+    files: int = 0
+    page_size: int = 0
+    page_count: int = 0
+    freelist_count: int = 0
+    db_bytes: int = 0
+    wal_bytes: int = 0
+    scopes: list[ScopeStats] = field(default_factory=list)
+    # (upper bound in bytes, row count): ciphertext sizes in power-of-two buckets
+    histogram: list[tuple[int, int]] = field(default_factory=list)
+    objects: list[ObjectStats] = field(default_factory=list)
+
+    @property
+    def free_bytes(self) -> int:
+        return self.freelist_count * self.page_size
+
+
+@dataclass
+class OptimizeResult:
+    bytes_before: int
+    bytes_after: int
+    timings: dict[str, float] = field(default_factory=dict)  # step -> seconds
+    converted: int = 0  # files switched to auto_vacuum=INCREMENTAL by VACUUM
+    unconverted: int = 0  # files still waiting for that one-off VACUUM
+
+    @property
+    def reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+
+def _pragma(conn, name: str) -> int:
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def _file_sizes(db_path: Path) -> tuple[int, int]:
+    def size(path):
+        try:
+            return os.stat(path).st_size
+        except FileNotFoundError:
+            return 0
+
+    return size(db_path), size(f"{db_path}-wal")
+
+
+def _histogram(conn) -> list[tuple[int, int]]:
+    buckets: dict[int, int] = {}
+    # length() of a blob is read from the record header, not the overflow pages
+    for (length,) in conn.execute("SELECT length(value) FROM secrets"):
+        bound = 1 << max(length - 1, 0).bit_length()
+        buckets[bound] = buckets.get(bound, 0) + 1
+    return sorted(buckets.items())
+
+
+def _objects(conn) -> list[ObjectStats]:
+    objects = {
+        name: ObjectStats(name, table, kind == "index")
+        for kind, name, table in conn.execute(
+            """
+            SELECT type, name, tbl_name FROM sqlite_master
+            WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_%'
+            ORDER BY tbl_name, type DESC, name
+            """
+        )
+    }
+    try:
+        for name, pages, size in conn.execute(
+            "SELECT name, COUNT(*), SUM(pgsize) FROM dbstat GROUP BY name"
+        ):
+            if name in objects:
+                objects[name].pages, objects[name].bytes = pages, size
+    except Exception:
+        # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB; sizes stay unknown
+        pass
+    try:
+        for name, stat in conn.execute("SELECT idx, stat FROM sqlite_stat1"):
+            if name in objects:
+                objects[name].stat = stat
+    except Exception:
+        # No sqlite_stat1 until ANALYZE has run
+        pass
+    return list(objects.values())
+
+
+def collect_stats(db) -> VaultStats:
+    """
+    Gather size and layout statistics without decrypting anything.
+
+    For a sharded vault the figures are summed over the catalog and all
+    shards, and tables/indexes are listed per file.
+
+    :param db: VaultDB (read-only opens are fine)
+    """
+    stats = VaultStats()
+    databases = db.databases()
+    histogram: dict[int, int] = {}
+    try:
+        for database in databases:
+            _collect_one(database, stats, histogram, len(databases) > 1)
+    except Exception as e:
+        raise StorageError(f"Failed to collect vault stats: {e}")
+    stats.histogram = sorted(histogram.items())
+    stats.scopes.sort(key=lambda scope: (scope.project, scope.environment))
+    return stats
+
+
+def _collect_one(db, stats: VaultStats, histogram: dict, qualify: bool):
+    conn = db.conn
+    with db.snapshot():
+        stats.page_size = stats.page_size or _pragma(conn, "page_size")
+        stats.page_count += _pragma(conn, "page_count")
+        stats.freelist_count += _pragma(conn, "freelist_count")
+        db_bytes, wal_bytes = _file_sizes(db.db_path)
+        stats.db_bytes += db_bytes
+        stats.wal_bytes += wal_bytes
+        for row in conn.execute(
+            """
+            SELECT project, environment, COUNT(*), SUM(is_file),
+                   SUM(COALESCE(size, 0)), SUM(length(value))
+            FROM secrets
+            GROUP BY project, environment
+            ORDER BY project, environment
+            """
+        ):
+            scope = ScopeStats(*row)
+            stats.scopes.append(scope)
+            stats.rows += scope.rows
+            stats.files += scope.files
+        for bound, count in _histogram(conn):
+            histogram[bound] = histogram.get(bound, 0) + count
+        for obj in _objects(conn):
+            if qualify:
+                obj.name = f"{db.db_path.name}:{obj.name}"
+            stats.objects.append(obj)
+
+
+def optimize(db, vacuum: bool = False) -> OptimizeResult:
+    """
+    Checkpoint and truncate the WAL, refresh planner statistics and return
+    free pages to the filesystem: incrementally (see `reclaim_space`), or by
+    rebuilding the file with VACUUM.
+
+    Every file of a sharded vault is optimized in turn; step timings are
+    summed over them.
+
+    :param db: Writable VaultDB
+    :param vacuum: Rebuild the DB file (needs free disk space of about its size);
+        this also switches DBs created before incremental vacuum to that mode
+    :return: File sizes (DB + WAL) before and after, per-step timings, and
+        which files are (now) in incremental vacuum mode
+    """
+    db._require_writable()
+    databases = db.databases()
+    result = OptimizeResult(
+        sum(sum(_file_sizes(database.db_path)) for database in databases), 0
+    )
+    try:
+        for database in databases:
+            _optimize_one(database, vacuum, result)
+    except StorageError:
+        raise
+    except Exception as e:
+        raise StorageError(f"Failed to optimize vault DB: {e}")
+    result.bytes_after = sum(
+        sum(_file_sizes(database.db_path)) for database in databases
+    )
+    return result
+
+
+def reclaim_space(db, step_pages: int = RECLAIM_STEP_PAGES) -> int:
+    """
+    Truncate free pages off the end of every DB file of the vault.
+
+    Runs ``PRAGMA incremental_vacuum`` in steps of ``step_pages``, each in its
+    own write transaction, so the vault is never locked for a full rewrite.
+    DBs not in ``auto_vacuum=INCREMENTAL`` mode are left alone.
+
+    :param db: Writable VaultDB
+    :return: Bytes returned to the filesystem
+    """
+    db._require_writable()
+    before = sum(sum(_file_sizes(d.db_path)) for d in db.databases())
+    try:
+        for database in db.databases():
+            _reclaim_one(database, step_pages)
+    except StorageError:
+        raise
+    except Exception as e:
+        raise StorageError(f"Failed to reclaim free pages: {e}")
+    after = sum(sum(_file_sizes(d.db_path)) for d in db.databases())
+    return max(before - after, 0)
+
+
+def _reclaim_one(db, step_pages: int):
+    conn = db.conn
+    if _pragma(conn, "auto_vacuum") != 2:
+        return
+    free = _pragma(conn, "freelist_count")
+    while free:
+        with db.write_transaction():
+            # The pragma does its work while its (empty) result is stepped
+            conn.execute(f"PRAGMA incremental_vacuum({step_pages})").fetchall()
+        remaining = _pragma(conn, "freelist_count")
+        if remaining >= free:
+            break
+        free = remaining
+    # The file shrinks once the truncation is checkpointed out of the WAL
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+
+def _optimize_one(db, vacuum: bool, result: OptimizeResult):
+    conn = db.conn
+    timings = result.timings
+
+    def step(name, operation):
+        started = time.perf_counter()
+        operation()
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+    def checkpoint():
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+    def analyze():
+        conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        with db.write_transaction():
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA optimize")
+
+    def rebuild():
+        # Only a VACUUM can switch an existing file's auto_vacuum mode
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # VACUUM cannot run inside a transaction; retry it on its own
+        db.retry_busy(lambda: conn.execute("VACUUM"))
+        # In WAL mode VACUUM goes through the WAL; checkpoint it again after
+        checkpoint()
+
+    incremental = _pragma(conn, "auto_vacuum") == 2
+    step("checkpoint", checkpoint)
+    step("analyze", analyze)
+    if vacuum:
+        step("vacuum", rebuild)
+        if not incremental and _pragma(conn, "auto_vacuum") == 2:
+            result.converted += 1
+    else:
+        step("reclaim", lambda: _reclaim_one(db, RECLAIM_STEP_PAGES))
+        if not incremental:
+            result.unconverted += 1
@@ -5,6 +5,7 @@ applied migration names and each migration is idempotent so it can be re-run
 against an existing DB.
 """
 
+import mimetypes
 import sqlite3
 from datetime import datetime, timezone
 
@@ -39,7 +40,8 @@ def get_applied(conn: sqlite3.Connection) -> set:
 
 def record_applied(conn: sqlite3.Connection, name: str):
     conn.execute(
-        "INSERT INTO migrations (name, applied_at) VALUES (?, ?)",
+        # OR IGNORE: another process may have applied it concurrently
+        "INSERT OR IGNORE INTO migrations (name, applied_at) VALUES (?, ?)",
         (name, datetime.now(timezone.utc).isoformat()),
     )
     conn.commit()
@@ -59,6 +61,184 @@ def add_filename_column(conn: sqlite3.Connection):
         pass
 
 
+@migration("0002_add_search_indexes")
+def add_search_indexes(conn: sqlite3.Connection):
+    """Index the columns `vault search` matches on.
+
+    The primary key already covers `project`-prefixed lookups; these indexes let
+    prefix/glob searches on the other columns avoid a full table scan.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_secrets_key ON secrets(key)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_secrets_env ON secrets(environment, key)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_secrets_filename ON secrets(filename)")
+    conn.commit()
+
+
+def _guess_mime(filename):
+    if not filename:
+        return None
+    return mimetypes.guess_type(filename)[0]
+
+
+@migration("0003_add_metadata_columns")
+def add_metadata_columns(conn: sqlite3.Connection):
+    """Add plaintext metadata columns populated at write time and backfill them.
+
+    `size`, `kind`, `filename` and `mime` are derivable from existing rows (the
+    AES-GCM ciphertext is the plaintext plus a 16-byte tag). The keyed
+    `fingerprint` needs the master password, so it stays NULL until the secret
+    is rewritten.
+    """
+    for column, decl in (
+        ("size", "INTEGER"),
+        ("fingerprint", "TEXT"),
+        ("kind", "TEXT"),
+        ("mime", "TEXT"),
+    ):
+        try:
+            conn.execute(f"ALTER TABLE secrets ADD COLUMN {column} {decl}")
+        except sqlite3.OperationalError:
+            # Column probably already exists — ignore
+            pass
+    conn.create_function("guess_mime", 1, _guess_mime, deterministic=True)
+    conn.execute(
+        """
+        UPDATE secrets SET
+            size = COALESCE(size, length(value) - 16),
+            kind = COALESCE(kind, CASE WHEN is_file THEN 'file' ELSE 'text' END),
+            filename = COALESCE(filename, CASE WHEN is_file THEN key END)
+        WHERE size IS NULL OR kind IS NULL
+        """
+    )
+    conn.execute(
+        "UPDATE secrets SET mime = guess_mime(filename) "
+        "WHERE mime IS NULL AND filename IS NOT NULL"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_secrets_fingerprint ON secrets(fingerprint)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_secrets_kind ON secrets(project, environment, kind)"
+    )
+    conn.commit()
+
+
+@migration("0004_add_vault_meta")
+def add_vault_meta(conn: sqlite3.Connection):
+    """Add a name/value table for vault-wide parameters (e.g. the vault salt)."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vault_meta (
+            name TEXT PRIMARY KEY,
+            value BLOB NOT NULL
+        )
+        """
+    )
+    conn.commit()
+
+
+@migration("0005_add_kdf_column")
+def add_kdf_column(conn: sqlite3.Connection):
+    """Record the KDF algorithm and parameters used for each secret.
+
+    NULL means the parameters every secret used before this column existed
+    (PBKDF2-HMAC-SHA256, 200k iterations).
+    """
+    try:
+        conn.execute("ALTER TABLE secrets ADD COLUMN kdf TEXT")
+        conn.commit()
+    except sqlite3.OperationalError:
+        # Column probably already exists — ignore
+        pass
+
+
+@migration("0006_add_sync_tables")
+def add_sync_tables(conn: sqlite3.Connection):
+    """Add tombstones for deleted secrets and a per-environment digest cache.
+
+    `vault sync` compares environments by digest. Triggers mark an
+    environment's cached digest stale (NULL) whenever one of its rows or
+    tombstones changes, so only those environments are ever re-hashed.
+    """
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS tombstones (
+            project TEXT NOT NULL,
+            environment TEXT NOT NULL,
+            key TEXT NOT NULL,
+            deleted_at TEXT NOT NULL,
+            PRIMARY KEY(project, environment, key)
+        );
+        CREATE TABLE IF NOT EXISTS sync_digests (
+            project TEXT NOT NULL,
+            environment TEXT NOT NULL,
+            digest TEXT,
+            PRIMARY KEY(project, environment)
+        );
+        """
+    )
+    for table in ("secrets", "tombstones"):
+        for event, rows in (
+            ("INSERT", ("NEW",)),
+            ("UPDATE", ("OLD", "NEW")),
+            ("DELETE", ("OLD",)),
+        ):
+            # No OR REPLACE: the outer statement's conflict policy (e.g. an
+            # upsert's) would override it inside the trigger
+            marks = " ".join(
+                f"UPDATE sync_digests SET digest = NULL WHERE project = {row}.project "
+                f"AND environment = {row}.environment; "
+                "INSERT INTO sync_digests (project, environment, digest) "
+                f"SELECT {row}.project, {row}.environment, NULL WHERE NOT EXISTS "
+                "(SELECT 1 FROM sync_digests WHERE project = "
+                f"{row}.project AND environment = {row}.environment);"
+                for row in rows
+            )
+            conn.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_digest
+                AFTER {event} ON {table} BEGIN {marks} END
+                """
+            )
+    # Existing environments start out stale
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO sync_digests (project, environment, digest)
+        SELECT DISTINCT project, environment, NULL FROM secrets
+        """
+    )
+    conn.commit()
+
+
+@migration("0007_add_fingerprint_index")
+def add_fingerprint_index(conn: sqlite3.Connection):
+    """Cover `vault diff`'s join with an index ending in the fingerprint.
+
+    The join then reads only index pages, never the rows holding the
+    ciphertext. Fingerprints missing from older rows need the master password
+    and are filled in by `vault diff --backfill`.
+    """
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_secrets_scope_fingerprint "
+        "ON secrets(project, environment, key, fingerprint)"
+    )
+    conn.commit()
+
+
+@migration("0008_enable_incremental_vacuum")
+def enable_incremental_vacuum(conn: sqlite3.Connection):
+    """Let deletes hand free pages back with `PRAGMA incremental_vacuum`.
+
+    New DBs are created in this mode. An existing DB only switches when it is
+    next rebuilt, which rewrites the whole file and so is left to
+    `vault optimize --vacuum` rather than whichever command opens it first;
+    until then deletes leave free pages in the file as before.
+    """
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+
 def apply_migrations(conn: sqlite3.Connection):
     ensure_migrations_table(conn)
     applied = get_applied(conn)
@@ -13,3 +13,26 @@ class SecretRecord:
     created_at: datetime
     updated_at: datetime
     is_file: bool = False  # distinguish file vs string
+    # Plaintext metadata recorded at write time (never requires decryption)
+    filename: str | None = None  # original filename of file secrets
+    size: int | None = None  # plaintext bytes
+    fingerprint: str | None = None  # keyed HMAC of the plaintext (hex)
+    kind: str | None = None  # "text" or "file"
+    mime: str | None = None
+    kdf: str | None = None  # encoded KdfParams; None means the legacy default
+
+
+@dataclass
+class SecretInfo:
+    """Plaintext metadata about a stored secret; never carries ciphertext."""
+
+    project: str
+    environment: str
+    key: str
+    is_file: bool
+    filename: str | None
+    updated_at: datetime
+    size: int | None = None  # plaintext bytes
+    fingerprint: str | None = None
+    kind: str | None = None
+    mime: str | None = None
@@ -0,0 +1,144 @@
+"""Promoting secrets from one environment of a project to another.
+
+Secrets are encrypted under a key derived from the master password and a
+per-record salt, and the ciphertext is not bound to its project, environment
+or key. A promotion therefore copies the stored rows as they are, with one
+set-based ``INSERT ... SELECT`` upsert: nothing is decrypted, no KDF runs and
+no password is needed. Both environments belong to one project and so always
+share a DB, even when the vault is sharded.
+
+The plan (which keys are added, updated or skipped under the conflict
+policy) and the copy run in one write transaction, so a promotion is applied
+entirely or not at all.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from vault import tracing
+from vault.exceptions import StorageError
+from vault.storage.bundle import CONFLICT_POLICIES, _utc
+
+# Stay well under SQLite's default host-parameter limit
+_KEY_BATCH = 500
+
+
+@dataclass
+class PromoteResult:
+    added: list[str] = field(default_factory=list)
+    updated: list[str] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+
+def _plan(conn, project, source, target, patterns, on_conflict) -> PromoteResult:
+    where, params = ["s.project = ?", "s.environment = ?"], [target, project, source]
+    if patterns:
+        where.append("(" + " OR ".join("s.key GLOB ?" for _ in patterns) + ")")
+        params.extend(patterns)
+    rows = conn.execute(
+        f"""
+        SELECT s.key, s.updated_at, t.updated_at
+        FROM secrets s LEFT JOIN secrets t
+          ON t.project = s.project AND t.environment = ? AND t.key = s.key
+        WHERE {" AND ".join(where)}
+        ORDER BY s.key
+        """,
+        params,
+    ).fetchall()
+    result = PromoteResult()
+    for key, source_at, target_at in rows:
+        if target_at is None:
+            result.added.append(key)
+        elif on_conflict == "skip" or (
+            on_conflict == "newer"
+            and _utc(datetime.fromisoformat(target_at))
+            >= _utc(datetime.fromisoformat(source_at))
+        ):
+            result.skipped.append(key)
+        else:
+            result.updated.append(key)
+    return result
+
+
+def _copy(conn, project, source, target, keys, now):
+    for i in range(0, len(keys), _KEY_BATCH):
+        part = keys[i : i + _KEY_BATCH]
+        marks = ", ".join("?" * len(part))
+        conn.execute(
+            f"""
+            INSERT INTO secrets
+            (project, environment, key, value, iv, salt, created_at, updated_at,
+             is_file, filename, size, fingerprint, kind, mime, kdf)
+            SELECT project, ?, key, value, iv, salt, ?, ?,
+                   is_file, filename, size, fingerprint, kind, mime, kdf
+            FROM secrets
+            WHERE project = ? AND environment = ? AND key IN ({marks})
+            ON CONFLICT(project, environment, key)
+            DO UPDATE SET
+                value=excluded.value,
+                iv=excluded.iv,
+                salt=excluded.salt,
+                updated_at=excluded.updated_at,
+                is_file=excluded.is_file,
+                filename=excluded.filename,
+                size=excluded.size,
+                fingerprint=excluded.fingerprint,
+                kind=excluded.kind,
+                mime=excluded.mime,
+                kdf=excluded.kdf
+            """,
+            (target, now, now, project, source, *part),
+        )
+        # Promoted keys are live again in the target environment
+        conn.execute(
+            f"""
+            DELETE FROM tombstones
+            WHERE project = ? AND environment = ? AND key IN ({marks})
+            """,
+            (project, target, *part),
+        )
+
+
+@tracing.traced("promote")
+def promote_secrets(
+    db,
+    project: str,
+    source: str,
+    target: str,
+    patterns=(),
+    on_conflict: str = "skip",
+    dry_run: bool = False,
+) -> PromoteResult:
+    """
+    Copy the secrets of ``project``/``source`` into ``project``/``target``.
+
+    :param patterns: Only promote keys matching one of these globs (default all)
+    :param on_conflict: For keys that already exist in ``target``: ``skip``
+        them, ``overwrite`` them, or overwrite them only if the source copy is
+        ``newer`` by ``updated_at``
+    :param dry_run: Only report what would be done
+    :return: Keys added, updated and skipped
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise StorageError(f"Unknown conflict policy {on_conflict!r}")
+    if source == target:
+        raise StorageError("Source and target environment are the same")
+    shard = db.shard(project, create=False)
+    if shard is None:
+        return PromoteResult()
+    if dry_run:
+        with shard.snapshot() as conn:
+            return _plan(conn, project, source, target, patterns, on_conflict)
+    shard._require_writable()
+    try:
+        with shard.write_transaction() as conn:
+            result = _plan(conn, project, source, target, patterns, on_conflict)
+            keys = result.added + result.updated
+            if keys:
+                now = datetime.now(timezone.utc).isoformat()
+                _copy(conn, project, source, target, keys, now)
+    except StorageError:
+        raise
+    except Exception as e:
+        raise StorageError(f"Failed to promote secrets: {e}")
+    return result
@@ -0,0 +1,179 @@
+"""Registry of plaintext files materialised by the CLI, and secure wiping.
+
+Every decrypted file the CLI writes (temp files from `get_file`, workspace
+copies) is recorded with its origin and an optional expiry in a small SQLite
+DB next to the config. `sweep` wipes expired (or all) entries in parallel;
+checking for expired entries is a single indexed query, so running it at the
+start of every invocation is cheap.
+
+Note: secure deletion cannot be guaranteed on all filesystems (SSD, snapshots).
+"""
+
+import os
+import sqlite3
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from vault import tracing
+from vault.exceptions import StorageError
+
+WIPE_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+# Shared, read-only source of zeros reused by every wipe
+_ZEROS = memoryview(bytes(WIPE_CHUNK_SIZE))
+# Opening never follows a symlink swapped in after the check, nor blocks on a FIFO
+_WIPE_FLAGS = os.O_WRONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_NONBLOCK", 0)
+
+
+@tracing.traced("file.wipe")
+def wipe_file(path: str | Path, sync: bool = True):
+    """
+    Overwrite a file with zeros and delete it.
+
+    The file is zeroed from one shared buffer and flushed to disk with a single
+    ``fsync`` at the end rather than per chunk. Links are never followed.
+    """
+    path = Path(path)
+    try:
+        # A symlink (or FIFO, device, ...) put in the file's place is only
+        # removed: zeroing through it would destroy whatever it points to
+        if stat.S_ISREG(path.lstat().st_mode):
+            fd = os.open(path, _WIPE_FLAGS)
+            with open(fd, "wb", buffering=0) as f:
+                st = os.fstat(fd)
+                remaining = st.st_size if stat.S_ISREG(st.st_mode) else 0
+                while remaining > 0:
+                    remaining -= f.write(_ZEROS[: min(WIPE_CHUNK_SIZE, remaining)])
+                if sync:
+                    os.fsync(fd)
+        path.unlink()
+    except FileNotFoundError:
+        return
+    except Exception as e:
+        raise StorageError(f"Failed to wipe file {path}: {e}")
+
+
+def wipe_files(paths, workers: int | None = None) -> dict[str, str]:
+    """
+    Wipe many files concurrently; returns ``{path: error}`` for failures.
+    """
+    errors = {}
+
+    def _wipe(path):
+        try:
+            wipe_file(path)
+        except StorageError as e:
+            errors[str(path)] = str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_wipe, paths))
+    return errors
+
+
+@dataclass
+class SweepResult:
+    wiped: list[str] = field(default_factory=list)
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+class MaterializedRegistry:
+    def __init__(self, registry_path: str | Path):
+        self.path = Path(registry_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS materialized (
+                path TEXT PRIMARY KEY,
+                origin TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                expires_at TEXT
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_materialized_expires "
+            "ON materialized(expires_at)"
+        )
+        self.conn.commit()
+        try:
+            os.chmod(self.path, 0o600)
+        except Exception:
+            pass
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def register(self, path: str | Path, origin: str, ttl: float | None = None):
+        """
+        Track a plaintext file.
+
+        :param path: File written by the CLI
+        :param origin: Where it came from, e.g. ``myapp/dev/key.jks``
+        :param ttl: Seconds until the file should be wiped (``None``: never)
+        """
+        self.register_many([(path, origin)], ttl)
+
+    def register_many(self, items, ttl: float | None = None):
+        """Track several ``(path, origin)`` pairs in one transaction."""
+        now = datetime.now(timezone.utc)
+        expires = (
+            (now + timedelta(seconds=ttl)).isoformat() if ttl is not None else None
+        )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO materialized VALUES (?, ?, ?, ?)",
+            [
+                (str(Path(path).resolve()), origin, now.isoformat(), expires)
+                for path, origin in items
+            ],
+        )
+        self.conn.commit()
+
+    def entries(self) -> list[tuple[str, str, str | None]]:
+        return self.conn.execute(
+            "SELECT path, origin, expires_at FROM materialized ORDER BY path"
+        ).fetchall()
+
+    def expired(self, now: datetime | None = None) -> list[str]:
+        now = now or datetime.now(timezone.utc)
+        rows = self.conn.execute(
+            "SELECT path FROM materialized WHERE expires_at <= ?", (now.isoformat(),)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def forget(self, paths):
+        self.conn.executemany(
+            "DELETE FROM materialized WHERE path = ?", [(str(p),) for p in paths]
+        )
+        self.conn.commit()
+
+    def sweep(self, everything: bool = False, workers: int | None = None):
+        """Wipe expired entries (or all with ``everything``) and untrack them."""
+        paths = [row[0] for row in self.entries()] if everything else self.expired()
+        result = SweepResult()
+        if not paths:
+            return result
+        result.errors = wipe_files(paths, workers=workers)
+        result.wiped = [p for p in paths if p not in result.errors]
+        self.forget(result.wiped)
+        return result
+
+
+def sweep_expired(registry_path: str | Path) -> SweepResult:
+    """Cheap auto-sweep: does nothing unless the registry exists."""
+    if not Path(registry_path).exists():
+        return SweepResult()
+    with MaterializedRegistry(registry_path) as registry:
+        return registry.sweep()
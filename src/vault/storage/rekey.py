@@ -0,0 +1,314 @@
+"""Master-password rotation for the whole vault.
+
+Re-encryption runs on a process pool (each secret costs two KDF runs) and is
+staged into `rekey_staging`, committed in batches. The staging table doubles
+as the checkpoint: an interrupted run resumes with the rows that are not
+staged yet. The live `secrets` rows are only replaced at cutover, in a single
+transaction, so until then the vault stays readable with the old password.
+"""
+
+import hmac
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from vault.crypto.aes import decrypt, encrypt
+from vault.crypto.fingerprint import FINGERPRINT_CONTEXT, derive_subkey, fingerprint
+from vault.crypto.kdf import KdfParams, derive_key, generate_salt
+from vault.exceptions import InvalidPasswordError, StorageError
+from vault.logging import setup_logger
+from vault.storage.db import VERIFIER_CONTEXT
+
+logger = setup_logger("vault-rekey")
+
+REKEY_CHECK_CONTEXT = b"vault-rekey-check-v1"
+
+_worker_state: dict = {}
+
+
+@dataclass
+class RekeyProgress:
+    done: int
+    total: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+
+def _init_worker(
+    old_password: str, new_password: str, fingerprint_key: bytes, kdf: str
+):
+    _worker_state.update(
+        old=old_password,
+        new=new_password,
+        fp_key=fingerprint_key,
+        kdf=KdfParams.decode(kdf),
+    )
+
+
+def _reencrypt(row):
+    project, environment, key, value, iv, salt, kdf, updated_at = row
+    old_key = derive_key(_worker_state["old"], salt, KdfParams.decode(kdf))
+    plaintext = decrypt(old_key, iv, value)
+    new_salt = generate_salt()
+    new_kdf = _worker_state["kdf"]
+    new_iv, ciphertext = encrypt(
+        derive_key(_worker_state["new"], new_salt, new_kdf), plaintext
+    )
+    return (
+        project,
+        environment,
+        key,
+        ciphertext,
+        new_iv,
+        new_salt,
+        new_kdf.encode(),
+        fingerprint(_worker_state["fp_key"], plaintext),
+        updated_at,
+    )
+
+
+def _ensure_tables(db):
+    with db.write_transaction() as conn:
+        _create_tables(conn)
+
+
+def _create_tables(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rekey_staging (
+            project TEXT NOT NULL,
+            environment TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value BLOB NOT NULL,
+            iv BLOB NOT NULL,
+            salt BLOB NOT NULL,
+            kdf TEXT,
+            fingerprint TEXT,
+            source_updated_at TEXT NOT NULL,
+            PRIMARY KEY(project, environment, key)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rekey_state (
+            name TEXT PRIMARY KEY,
+            value BLOB NOT NULL
+        )
+        """
+    )
+
+
+def rekey_in_progress(db) -> bool:
+    row = db.conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='rekey_state'"
+    ).fetchone()
+    return row is not None
+
+
+def abort_rekey(db):
+    """Discard a partially staged rotation; the vault keeps the old password."""
+    with db.write_transaction() as conn:
+        conn.execute("DROP TABLE IF EXISTS rekey_staging")
+        conn.execute("DROP TABLE IF EXISTS rekey_state")
+
+
+def _new_vault_key(db, new_password: str) -> tuple[bytes, bytes, KdfParams]:
+    """
+    Return (new vault salt, new vault key, KDF), pinned for the whole rotation.
+
+    The KDF parameters are the connection's when the rotation starts; a resumed
+    run keeps them even if the configured KDF has changed since, so the vault
+    key, the verifier and every re-encrypted secret agree.
+    """
+    conn = db.conn
+    state = dict(conn.execute("SELECT name, value FROM rekey_state").fetchall())
+    if "vault_salt" in state:
+        salt = state["vault_salt"]
+        kdf = KdfParams.decode(state["kdf"])
+        key_bytes = derive_key(new_password, salt, kdf)
+        check = derive_subkey(key_bytes, REKEY_CHECK_CONTEXT)
+        if not hmac.compare_digest(check, state["check"]):
+            raise InvalidPasswordError(
+                "A rekey to a different new password is in progress; "
+                "rerun with the same new password or abort it first"
+            )
+        return salt, key_bytes, kdf
+    salt = generate_salt()
+    key_bytes = derive_key(new_password, salt, db.kdf)
+    with db.write_transaction():
+        conn.executemany(
+            "INSERT INTO rekey_state (name, value) VALUES (?, ?)",
+            [
+                ("vault_salt", salt),
+                ("kdf", db.kdf.encode()),
+                ("check", derive_subkey(key_bytes, REKEY_CHECK_CONTEXT)),
+            ],
+        )
+    return salt, key_bytes, db.kdf
+
+
+def _pending(conn, after, batch_size):
+    # Rows never staged, or changed (under the old password) since staging
+    keyset = "AND (s.project, s.environment, s.key) > (?, ?, ?)" if after else ""
+    return conn.execute(
+        f"""
+        SELECT s.project, s.environment, s.key, s.value, s.iv, s.salt, s.kdf,
+               s.updated_at
+        FROM secrets s
+        LEFT JOIN rekey_staging r
+            ON r.project = s.project
+            AND r.environment = s.environment
+            AND r.key = s.key
+        WHERE (r.key IS NULL OR r.source_updated_at != s.updated_at)
+            {keyset}
+        ORDER BY s.project, s.environment, s.key
+        LIMIT ?
+        """,
+        (*(after or ()), batch_size),
+    ).fetchall()
+
+
+def _count_pending(conn) -> int:
+    return conn.execute(
+        """
+        SELECT COUNT(*) FROM secrets s
+        LEFT JOIN rekey_staging r
+            ON r.project = s.project
+            AND r.environment = s.environment
+            AND r.key = s.key
+        WHERE r.key IS NULL OR r.source_updated_at != s.updated_at
+        """
+    ).fetchone()[0]
+
+
+def rekey_vault(
+    db,
+    old_password: str,
+    new_password: str,
+    workers: int | None = None,
+    batch_size: int = 256,
+    progress: Callable[[RekeyProgress], None] | None = None,
+) -> int:
+    """
+    Re-encrypt every secret under ``new_password``, resuming any earlier run.
+
+    :param db: Writable VaultDB
+    :param old_password: Current master password
+    :param new_password: New master password
+    :param workers: Process pool size (``None``: one per CPU, ``1``: in-process)
+    :param batch_size: Rows re-encrypted and committed per transaction
+    :param progress: Optional callback invoked after every committed batch
+    :return: Number of secrets re-encrypted by this run
+    """
+    db._require_writable()
+    if len(db.databases()) > 1:
+        # The cutover swaps secrets and the verifier in one transaction, which
+        # cannot span several SQLite files in WAL mode.
+        raise StorageError("Rekey is not supported for sharded vaults yet")
+    # Fail after one KDF rather than on the first re-encrypted row
+    db.unlock(old_password)
+    conn = db.conn
+    _ensure_tables(db)
+    new_salt, new_key, new_kdf = _new_vault_key(db, new_password)
+    fp_key = derive_subkey(new_key, FINGERPRINT_CONTEXT)
+    verifier = derive_subkey(new_key, VERIFIER_CONTEXT)
+
+    total = _count_pending(conn)
+    done = 0
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(old_password, new_password, fp_key, new_kdf.encode()),
+        )
+    else:
+        _init_worker(old_password, new_password, fp_key, new_kdf.encode())
+
+    try:
+        while True:
+            after = None
+            while True:
+                rows = _pending(conn, after, batch_size)
+                if not rows:
+                    break
+                after = rows[-1][:3]
+                if pool:
+                    chunksize = max(1, len(rows) // (workers * 4))
+                    staged = list(pool.map(_reencrypt, rows, chunksize=chunksize))
+                else:
+                    staged = [_reencrypt(row) for row in rows]
+                with db.write_transaction():
+                    conn.executemany(
+                        """
+                        INSERT OR REPLACE INTO rekey_staging
+                        (project, environment, key, value, iv, salt, kdf,
+                         fingerprint, source_updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        staged,
+                    )
+                done += len(staged)
+                if progress:
+                    elapsed = time.perf_counter() - started
+                    progress(RekeyProgress(done, max(total, done), elapsed))
+            if _cutover(db, new_salt, new_kdf, verifier):
+                break
+            # Something was written under the old password meanwhile; stage it.
+            total = done + _count_pending(conn)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        _worker_state.clear()
+
+    logger.info(f"Rekeyed {done} secrets in {time.perf_counter() - started:.1f}s")
+    return done
+
+
+def _cutover(db, new_salt: bytes, new_kdf: KdfParams, verifier: bytes) -> bool:
+    conn = db.conn
+    try:
+        # The write lock is taken first so nothing can change between the
+        # check and the swap.
+        with db.write_transaction():
+            if _count_pending(conn):
+                return False
+            conn.execute(
+                """
+                UPDATE secrets SET
+                    value = r.value,
+                    iv = r.iv,
+                    salt = r.salt,
+                    kdf = r.kdf,
+                    fingerprint = r.fingerprint
+                FROM rekey_staging r
+                WHERE r.project = secrets.project
+                    AND r.environment = secrets.environment
+                    AND r.key = secrets.key
+                """
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO vault_meta (name, value) VALUES (?, ?)",
+                [
+                    ("vault_salt", new_salt),
+                    ("vault_kdf", new_kdf.encode().encode()),
+                    ("verifier", verifier),
+                ],
+            )
+            conn.execute("DROP TABLE rekey_staging")
+            conn.execute("DROP TABLE rekey_state")
+    except StorageError:
+        raise
+    except Exception as e:
+        raise StorageError(f"Failed to switch vault to the new password: {e}")
+    db._vault_key = None
+    db._unlocked = None
+    return True
@@ -0,0 +1,134 @@
+"""Rendering templates that reference secrets.
+
+A placeholder ``{{ vault:project/environment/KEY }}`` is replaced by the
+decrypted secret. All templates of one run are scanned first, and every
+distinct reference is then resolved together:
+
+- one query per project/environment (`VaultDB.get_secrets`) fetches the rows;
+- secrets that share a salt (e.g. those written by one `vault watch` batch)
+  share one KDF run, and the KDFs run on a thread pool (they release the GIL);
+- nothing is written unless every reference resolved, and each output file is
+  written atomically with ``0600`` permissions.
+"""
+
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from vault import tracing
+from vault.crypto.aes import decrypt
+from vault.crypto.kdf import KdfParams, derive_key
+from vault.exceptions import StorageError, VaultError
+from vault.storage.workspace import atomic_write
+
+PLACEHOLDER = re.compile(
+    r"\{\{\s*vault:(?P<project>[^/\s{}]+)/(?P<environment>[^/\s{}]+)/"
+    r"(?P<key>[^\s{}]+)\s*\}\}"
+)
+
+STDOUT = "-"
+
+
+@dataclass
+class RenderResult:
+    written: list[Path] = field(default_factory=list)
+    output: list[str] = field(default_factory=list)  # text rendered for stdout
+    secrets: int = 0  # distinct references resolved
+
+
+def find_references(text: str) -> list[tuple[str, str, str]]:
+    """Distinct ``(project, environment, key)`` references, in order of appearance."""
+    refs = (
+        m.group("project", "environment", "key") for m in PLACEHOLDER.finditer(text)
+    )
+    return list(dict.fromkeys(refs))
+
+
+def resolve_references(
+    db, master_password: str, refs, workers: int | None = None
+) -> dict[tuple[str, str, str], str]:
+    """
+    Decrypt the secrets behind ``refs``.
+
+    :param db: VaultDB
+    :param workers: KDF threads (default: ``min(32, cpu_count + 4)``)
+    :return: Plaintext (text) by reference
+    :raises StorageError: If any reference does not exist
+    """
+    db.unlock(master_password)
+    scopes = defaultdict(set)
+    for project, environment, key in refs:
+        scopes[project, environment].add(key)
+
+    groups, missing = defaultdict(list), []
+    for (project, environment), keys in sorted(scopes.items()):
+        found = db.get_secrets(project, environment, keys)
+        for key in sorted(keys):
+            record = found.get(key)
+            if record is None:
+                missing.append(f"{project}/{environment}/{key}")
+                continue
+            groups[record.salt, record.kdf].append(
+                ((project, environment, key), record)
+            )
+    if missing:
+        raise StorageError(f"Unknown secret reference(s): {', '.join(missing)}")
+
+    def decrypt_group(item):
+        (salt, kdf), records = item
+        key_bytes = derive_key(master_password, salt, KdfParams.decode(kdf))
+        return [(ref, decrypt(key_bytes, r.iv, r.value)) for ref, r in records]
+
+    values = {}
+    with tracing.span("render.decrypt", secrets=len(refs), kdfs=len(groups)):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for decrypted in pool.map(decrypt_group, groups.items()):
+                for ref, plaintext in decrypted:
+                    try:
+                        values[ref] = plaintext.decode("utf-8")
+                    except UnicodeDecodeError:
+                        raise VaultError(f"{'/'.join(ref)} is not UTF-8 text")
+    return values
+
+
+def render_text(text: str, values: dict) -> str:
+    return PLACEHOLDER.sub(
+        lambda m: values[m.group("project", "environment", "key")], text
+    )
+
+
+def render_templates(
+    db, master_password: str, jobs, workers: int | None = None
+) -> RenderResult:
+    """
+    Render several templates with one lookup and decryption pass.
+
+    :param jobs: ``(template, dest)`` pairs; a ``dest`` of ``"-"`` collects the
+        rendered text in ``RenderResult.output`` instead of writing a file
+    :param workers: KDF threads, as for `resolve_references`
+    """
+    templates = []
+    for template, dest in jobs:
+        try:
+            text = Path(template).read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            raise StorageError(f"Cannot read template {template}: {e}")
+        templates.append((text, dest))
+
+    refs = list(
+        dict.fromkeys(ref for text, _ in templates for ref in find_references(text))
+    )
+    values = resolve_references(db, master_password, refs, workers) if refs else {}
+    result = RenderResult(secrets=len(values))
+    for text, dest in templates:
+        rendered = render_text(text, values)
+        if str(dest) == STDOUT:
+            result.output.append(rendered)
+            continue
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(dest, rendered.encode("utf-8"))
+        result.written.append(dest)
+    return result
@@ -0,0 +1,380 @@
+"""Sharded vault layout: one SQLite file per project behind a catalog.
+
+The catalog (the configured `vault_db_path`) keeps the vault-wide parameters
+in `vault_meta` and a `shards` table mapping each project to its own DB file
+under `shards/`. `ShardedVaultDB` routes every per-project call to that
+file, so a bulk import into one project only holds that project's write
+lock and a project can be backed up on its own. Cross-project queries
+ATTACH the shards to the catalog connection in batches.
+
+All shards share the catalog's vault salt and verifier, so unlocking costs
+one KDF however many shards a command touches, and fingerprints stay
+comparable across projects.
+"""
+
+import functools
+import hashlib
+import re
+import sqlite3
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+from vault.exceptions import StorageError
+from vault.storage.db import (
+    _INFO_COLUMNS,
+    SEARCH_FIELDS,
+    SECRET_COLUMNS,
+    VaultDB,
+    _compile_regex,
+    _regexp,
+    _row_to_info,
+    _search_filter,
+)
+from vault.storage.models import SecretInfo
+
+SHARD_DIR = "shards"
+# SQLite allows 10 attached databases by default; keep a little headroom
+ATTACH_BATCH = 8
+
+
+def shard_filename(project: str) -> str:
+    """Readable, collision-free file name for a project's shard."""
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", project)[:40]
+    digest = hashlib.sha256(project.encode("utf-8")).hexdigest()[:8]
+    return f"{safe}-{digest}.db"
+
+
+def is_sharded(db_path: str | Path) -> bool:
+    """True if ``db_path`` is a sharded-vault catalog."""
+    path = Path(db_path)
+    if not path.is_file():
+        return False
+    try:
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='shards'"
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return row is not None
+
+
+class _Shard(VaultDB):
+    """A project's DB; vault-wide parameters and unlocking go to the catalog."""
+
+    def __init__(self, db_path: str, catalog: "ShardedVaultDB", **kwargs):
+        self.catalog = catalog
+        super().__init__(db_path, **kwargs)
+
+    def get_meta(self, name: str) -> bytes | None:
+        return self.catalog.get_meta(name)
+
+    def set_meta(self, name: str, value: bytes, replace: bool = True) -> bytes:
+        return self.catalog.set_meta(name, value, replace)
+
+    def unlock(self, master_password: str):
+        self.catalog.unlock(master_password)
+
+    def _derive_vault_key(self, master_password: str) -> bytes:
+        return self.catalog._derive_vault_key(master_password)
+
+
+def _routed(name: str):
+    """Forward ``name(project, ...)`` to the project's shard."""
+    base = getattr(VaultDB, name)
+
+    @functools.wraps(base)
+    def method(self, project, *args, **kwargs):
+        shard = self.shard(project)
+        if shard is None:
+            # The catalog holds no secrets, so this is the not-found behaviour
+            return base(self, project, *args, **kwargs)
+        return getattr(shard, name)(project, *args, **kwargs)
+
+    return method
+
+
+class ShardedVaultDB(VaultDB):
+    def __init__(self, db_path: str, **kwargs):
+        """
+        Open (and if needed create) a sharded vault.
+
+        :param db_path: Path to the catalog DB; shards live in ``shards/`` next to it
+        :param kwargs: As for `VaultDB`, applied to the catalog and every shard
+        """
+        super().__init__(db_path, **kwargs)
+        self.shard_dir = self.db_path.parent / SHARD_DIR
+        self._shard_kwargs = dict(
+            readonly=self.readonly,
+            immutable=self.immutable,
+            kdf=self.kdf,
+            upgrade_kdf=self.upgrade_kdf,
+            lock_timeout=self.lock_timeout,
+            check_same_thread=self.check_same_thread,
+        )
+        self._shards: dict[str, _Shard] = {}
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='shards'"
+        ).fetchone()
+        if not exists and not self.readonly:
+            with self.write_transaction() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS shards (
+                        project TEXT PRIMARY KEY,
+                        filename TEXT NOT NULL UNIQUE,
+                        created_at TEXT NOT NULL
+                    )
+                    """
+                )
+
+    def close(self):
+        for shard in self._shards.values():
+            shard.close()
+        self._shards.clear()
+        super().close()
+
+    def _shard_file(self, project: str) -> str | None:
+        try:
+            row = self.conn.execute(
+                "SELECT filename FROM shards WHERE project = ?", (project,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to read shard catalog: {e}")
+        return row[0] if row else None
+
+    def shard(self, project: str, create: bool = False) -> _Shard | None:
+        """
+        Return the DB holding ``project``.
+
+        :param create: Register and create the shard if the project is new
+        :return: The shard, or ``None`` if the project has none and ``create``
+            is false
+        """
+        shard = self._shards.get(project)
+        if shard is not None:
+            return shard
+        filename = self._shard_file(project)
+        if filename is None:
+            if not create:
+                return None
+            self._require_writable()
+            self.shard_dir.mkdir(parents=True, exist_ok=True)
+            with self.write_transaction() as conn:
+                # OR IGNORE: another process may register it concurrently
+                conn.execute(
+                    "INSERT OR IGNORE INTO shards VALUES (?, ?, ?)",
+                    (
+                        project,
+                        shard_filename(project),
+                        datetime.now(timezone.utc).isoformat(),
+                    ),
+                )
+            filename = self._shard_file(project)
+        shard = _Shard(str(self.shard_dir / filename), self, **self._shard_kwargs)
+        self._shards[project] = shard
+        return shard
+
+    def shards(self) -> Iterator[tuple[str, Path]]:
+        """Yield ``(project, shard file)`` pairs in project order."""
+        rows = self.conn.execute(
+            "SELECT project, filename FROM shards ORDER BY project"
+        ).fetchall()
+        for project, filename in rows:
+            yield project, self.shard_dir / filename
+
+    def databases(self) -> list[VaultDB]:
+        return [self] + [self.shard(project) for project, _ in self.shards()]
+
+    # Per-project operations go to the project's shard
+    get_secret = _routed("get_secret")
+    get_secrets = _routed("get_secrets")
+    delete_secret = _routed("delete_secret")
+    delete_secrets = _routed("delete_secrets")
+    list_environments = _routed("list_environments")
+    list_entries = _routed("list_entries")
+    decrypt_file_secret = _routed("decrypt_file_secret")
+    write_file_secret_to = _routed("write_file_secret_to")
+    open_file_secret_memfd = _routed("open_file_secret_memfd")
+    get_file_secret = _routed("get_file_secret")
+
+    def add_text_secret(self, project, environment, key, value, master_password):
+        # Check the password before a new project's shard is registered
+        self.unlock(master_password)
+        self.shard(project, create=True).add_text_secret(
+            project, environment, key, value, master_password
+        )
+
+    def add_file_secret(self, project, environment, key, filepath, master_password):
+        self.unlock(master_password)
+        self.shard(project, create=True).add_file_secret(
+            project, environment, key, filepath, master_password
+        )
+
+    def add_secret(self, record):
+        self.shard(record.project, create=True).add_secret(record)
+
+    def decrypt_secret(self, record, master_password: str) -> bytes:
+        shard = self.shard(record.project)
+        if shard is None:
+            return super().decrypt_secret(record, master_password)
+        return shard.decrypt_secret(record, master_password)
+
+    def _check_against_sample(self, master_password: str):
+        # The catalog has no secrets; check against the first non-empty shard
+        for project, _ in self.shards():
+            shard = self.shard(project)
+            if shard.conn.execute("SELECT 1 FROM secrets LIMIT 1").fetchone():
+                VaultDB._check_against_sample(shard, master_password)
+                return
+
+    def list_projects(
+        self, after: str | None = None, limit: int | None = None
+    ) -> Iterator[str]:
+        """Yield project names from the catalog, starting after ``after``."""
+        sql = "SELECT project FROM shards"
+        params: list = []
+        if after is not None:
+            sql += " WHERE project > ?"
+            params.append(after)
+        sql += " ORDER BY project"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        try:
+            rows = self.conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to list projects: {e}")
+        return (row[0] for row in rows)
+
+    def search_secrets(
+        self,
+        pattern: str,
+        mode: str = "glob",
+        fields: tuple[str, ...] = SEARCH_FIELDS,
+        project: str | None = None,
+        environment: str | None = None,
+    ) -> Iterator[SecretInfo]:
+        """
+        Search one shard, or all of them by ATTACHing them in batches.
+
+        Results are ordered by project, environment and key as for `VaultDB`.
+        """
+        if project is not None:
+            shard = self.shard(project)
+            if shard is None:
+                return iter(())
+            return shard.search_secrets(pattern, mode, fields, project, environment)
+        where, params = _search_filter(pattern, mode, fields, None, environment)
+        if mode == "regex":
+            try:
+                _compile_regex(pattern)
+            except re.error as e:
+                raise StorageError(f"Invalid regex {pattern!r}: {e}")
+            self.conn.create_function("REGEXP", 2, _regexp, deterministic=True)
+        return self._search_attached(where, params)
+
+    def _search_attached(self, where: str, params: list) -> Iterator[SecretInfo]:
+        files = [path for _, path in self.shards()]
+        for start in range(0, len(files), ATTACH_BATCH):
+            batch = files[start : start + ATTACH_BATCH]
+            rows = self._query_attached(
+                batch,
+                lambda schema: f"SELECT {_INFO_COLUMNS} FROM {schema}.secrets "
+                f"WHERE {where}",
+                params,
+                "ORDER BY project, environment, key",
+            )
+            yield from (_row_to_info(row) for row in rows)
+
+    def _query_attached(self, files, select, params, suffix="") -> list:
+        """Run ``select(schema)`` over each attached file as one UNION ALL."""
+        schemas = [f"shard{i}" for i in range(len(files))]
+        attached = []
+        try:
+            for schema, path in zip(schemas, files):
+                mode = "ro&immutable=1" if self.immutable else "ro"
+                self.conn.execute(
+                    "ATTACH DATABASE ? AS " + schema,
+                    (f"{Path(path).resolve().as_uri()}?mode={mode}",),
+                )
+                attached.append(schema)
+            sql = " UNION ALL ".join(select(schema) for schema in schemas)
+            return self.conn.execute(
+                f"{sql} {suffix}", params * len(schemas)
+            ).fetchall()
+        except sqlite3.Error as e:
+            raise StorageError(f"Failed to query shards: {e}")
+        finally:
+            for schema in attached:
+                self.conn.execute(f"DETACH DATABASE {schema}")
+
+
+def split_vault(source_path: str, catalog_path: str, **kwargs) -> ShardedVaultDB:
+    """
+    Copy a single-file vault into a new sharded layout at ``catalog_path``.
+
+    Ciphertext rows, tombstones and vault-wide parameters are copied as-is
+    (nothing is decrypted, no password is needed); the source file is left
+    untouched.
+
+    :return: The opened sharded vault
+    """
+    if Path(catalog_path).exists():
+        raise StorageError(f"{catalog_path} already exists")
+    catalog = ShardedVaultDB(catalog_path, **kwargs)
+    uri = f"{Path(source_path).resolve().as_uri()}?mode=ro"
+    try:
+        # ATTACH cannot run inside a transaction; the copies below each run in
+        # their own write transaction on the target file.
+        catalog.conn.execute("ATTACH DATABASE ? AS source", (uri,))
+        try:
+            with catalog.write_transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO main.vault_meta "
+                    "SELECT name, value FROM source.vault_meta"
+                )
+            # Deletes a peer has not synced yet must survive the split
+            has_tombstones = catalog.conn.execute(
+                "SELECT 1 FROM source.sqlite_master WHERE name = 'tombstones'"
+            ).fetchone()
+            tables = ("secrets", "tombstones") if has_tombstones else ("secrets",)
+            projects = [
+                row[0]
+                for row in catalog.conn.execute(
+                    " UNION ".join(
+                        f"SELECT project FROM source.{table}" for table in tables
+                    )
+                    + " ORDER BY project"
+                )
+            ]
+        finally:
+            catalog.conn.execute("DETACH DATABASE source")
+        for project in projects:
+            shard = catalog.shard(project, create=True)
+            shard.conn.execute("ATTACH DATABASE ? AS source", (uri,))
+            try:
+                with shard.write_transaction() as conn:
+                    conn.execute(
+                        f"INSERT INTO main.secrets ({SECRET_COLUMNS}) "
+                        f"SELECT {SECRET_COLUMNS} FROM source.secrets "
+                        "WHERE project = ?",
+                        (project,),
+                    )
+                    if has_tombstones:
+                        conn.execute(
+                            "INSERT INTO main.tombstones "
+                            "SELECT project, environment, key, deleted_at "
+                            "FROM source.tombstones WHERE project = ?",
+                            (project,),
+                        )
+            finally:
+                shard.conn.execute("DETACH DATABASE source")
+    except sqlite3.Error as e:
+        catalog.close()
+        raise StorageError(f"Failed to split vault: {e}")
+    return catalog
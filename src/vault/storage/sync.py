@@ -0,0 +1,283 @@
+"""Two-way sync between vaults.
+
+Vaults are compared top-down as a digest tree: vault, then project, then
+environment. An environment's digest covers the ``(key, updated_at, iv)``
+version of each of its rows and tombstones; it is cached in
+``sync_digests`` and only recomputed after triggers mark it stale. Only the
+environments whose digests differ are compared row by row, and only the
+differing rows are copied, so a sync costs roughly the number of changes
+rather than the size of either vault.
+
+The IV stands in for a content fingerprint: it changes on every write,
+travels with the copied ciphertext, and unlike the keyed fingerprint it
+means the same thing in vaults with different vault keys.
+
+Rows are copied as stored ciphertext, so both vaults must use the same
+master password. Deletes travel as tombstones. Keys changed on both sides
+since the vaults last synced are conflicts: ``newer`` resolves them by last
+writer (``updated_at``/``deleted_at``), ``report`` leaves both sides alone.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from vault import tracing
+from vault.exceptions import StorageError
+from vault.storage.db import SECRET_COLUMNS, VaultDB
+from vault.storage.shards import ShardedVaultDB, is_sharded
+
+SYNC_STRATEGIES = ("newer", "report")
+
+_COLUMNS = [column.strip() for column in SECRET_COLUMNS.split(",")]
+_UPSERT = (
+    f"INSERT INTO secrets ({SECRET_COLUMNS}) "
+    f"VALUES ({', '.join('?' for _ in _COLUMNS)}) "
+    "ON CONFLICT(project, environment, key) DO UPDATE SET "
+    + ", ".join(
+        f"{c}=excluded.{c}"
+        for c in _COLUMNS
+        if c not in ("project", "environment", "key", "created_at")
+    )
+)
+_FINGERPRINT = _COLUMNS.index("fingerprint")
+
+# (updated_at or deleted_at, iv); the iv is None for a tombstone
+Version = tuple[str, bytes | None]
+
+
+@dataclass
+class SyncResult:
+    pulled: list[str] = field(default_factory=list)  # project/env/key copied here
+    pushed: list[str] = field(default_factory=list)  # copied to the other vault
+    conflicts: list[str] = field(default_factory=list)  # changed on both sides
+    scanned: int = 0  # environments compared row by row
+
+    @property
+    def in_sync(self) -> bool:
+        return not (self.pulled or self.pushed or self.conflicts)
+
+
+def open_vault(path: str | Path, **kwargs) -> VaultDB:
+    """Open a vault file, single or sharded catalog alike."""
+    if not Path(path).is_file():
+        raise StorageError(f"No vault at {path}")
+    db_class = ShardedVaultDB if is_sharded(path) else VaultDB
+    return db_class(str(path), **kwargs)
+
+
+def _parse(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    # Rows written before timestamps were timezone-aware are UTC as well
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _order(version: Version):
+    # Last writer wins; ties (a lazy KDF upgrade re-encrypts without touching
+    # updated_at) go the same way on both sides so the vaults converge
+    stamp, iv = version
+    return _parse(stamp), iv is None, iv or b""
+
+
+def _versions(conn, project: str, environment: str) -> dict[str, Version]:
+    # Every write of a key clears its tombstone, so a key is in one table only
+    scope = (project, environment)
+    return {
+        key: (stamp, iv)
+        for key, stamp, iv in conn.execute(
+            "SELECT key, updated_at, iv FROM secrets WHERE project=? AND environment=? "
+            "UNION ALL "
+            "SELECT key, deleted_at, NULL FROM tombstones "
+            "WHERE project=? AND environment=?",
+            scope + scope,
+        )
+    }
+
+
+def _digest(versions: dict[str, Version]) -> str:
+    h = hashlib.sha256()
+    for key in sorted(versions):
+        stamp, iv = versions[key]
+        h.update(f"{key}\0{stamp}\0{iv.hex() if iv else '-'}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _refresh_digests(db: VaultDB):
+    """Recompute the stale environment digests of one DB file."""
+    stale = db.conn.execute(
+        "SELECT project, environment FROM sync_digests WHERE digest IS NULL"
+    ).fetchall()
+    if not stale:
+        return
+    tracing.count("sync.digests", len(stale))
+    with db.write_transaction() as conn:
+        for project, environment in stale:
+            versions = _versions(conn, project, environment)
+            if versions:
+                conn.execute(
+                    "UPDATE sync_digests SET digest=? WHERE project=? AND environment=?",
+                    (_digest(versions), project, environment),
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM sync_digests WHERE project=? AND environment=?",
+                    (project, environment),
+                )
+
+
+def digest_tree(db: VaultDB) -> dict[str, dict[str, str]]:
+    """
+    Per-environment digests of a vault, refreshing stale ones first.
+
+    :return: ``{project: {environment: digest}}``
+    """
+    tree: dict[str, dict[str, str]] = {}
+    for part in db.databases():
+        _refresh_digests(part)
+        for project, environment, digest in part.conn.execute(
+            "SELECT project, environment, digest FROM sync_digests"
+        ):
+            tree.setdefault(project, {})[environment] = digest
+    return tree
+
+
+def _fold(digests: dict[str, str]) -> str:
+    h = hashlib.sha256()
+    for name in sorted(digests):
+        h.update(f"{name}\0{digests[name]}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _differing(mine: dict, theirs: dict) -> list:
+    return sorted(
+        n for n in mine.keys() | theirs.keys() if mine.get(n) != theirs.get(n)
+    )
+
+
+def _copy(source, target, project, environment, changes, keep_fingerprints):
+    """Apply the winning versions of ``changes`` (key -> Version) from source to target."""
+    with target.write_transaction() as conn:
+        for key, (stamp, iv) in changes.items():
+            scope = (project, environment, key)
+            if iv is None:
+                conn.execute(
+                    "DELETE FROM secrets WHERE project=? AND environment=? AND key=?",
+                    scope,
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO tombstones VALUES (?, ?, ?, ?)",
+                    scope + (stamp,),
+                )
+                continue
+            row = list(
+                source.conn.execute(
+                    f"SELECT {SECRET_COLUMNS} FROM secrets "
+                    "WHERE project=? AND environment=? AND key=?",
+                    scope,
+                ).fetchone()
+            )
+            if not keep_fingerprints:
+                # Keyed fingerprints are only valid under the vault key they came from
+                row[_FINGERPRINT] = None
+            conn.execute(_UPSERT, row)
+            conn.execute(
+                "DELETE FROM tombstones WHERE project=? AND environment=? AND key=?",
+                scope,
+            )
+
+
+def _sync_key(db: VaultDB) -> str:
+    return f"sync:{db.db_path.resolve()}"
+
+
+def _last_synced(db: VaultDB, other: VaultDB) -> datetime | None:
+    value = db.get_meta(_sync_key(other))
+    return None if value is None else _parse(value.decode("ascii"))
+
+
+@tracing.traced("sync")
+def sync_vaults(
+    db: VaultDB, other: VaultDB, master_password: str, strategy: str = "newer"
+) -> SyncResult:
+    """
+    Bring two vaults to the same contents.
+
+    :param db: This vault (writable)
+    :param other: The vault to sync with (writable, same master password)
+    :param strategy: For keys changed on both sides since the last sync:
+        ``newer`` keeps the last write, ``report`` only lists them
+    :return: Keys pulled, pushed and in conflict
+    """
+    if strategy not in SYNC_STRATEGIES:
+        raise StorageError(f"Unknown sync strategy {strategy!r}")
+    if db.db_path.resolve() == other.db_path.resolve():
+        raise StorageError("Cannot sync a vault with itself")
+    db._require_writable()
+    other._require_writable()
+    db.unlock(master_password)
+    other.unlock(master_password)
+    started = datetime.now(timezone.utc)
+    last = _last_synced(db, other)
+    keep_fingerprints = db.get_meta("vault_salt") == other.get_meta("vault_salt")
+
+    result = SyncResult()
+    mine, theirs = digest_tree(db), digest_tree(other)
+    mine_projects = {p: _fold(envs) for p, envs in mine.items()}
+    theirs_projects = {p: _fold(envs) for p, envs in theirs.items()}
+    if _fold(mine_projects) != _fold(theirs_projects):
+        for project in _differing(mine_projects, theirs_projects):
+            for environment in _differing(
+                mine.get(project, {}), theirs.get(project, {})
+            ):
+                _sync_environment(
+                    db,
+                    other,
+                    project,
+                    environment,
+                    last,
+                    strategy,
+                    keep_fingerprints,
+                    result,
+                )
+
+    if strategy == "newer" or not result.conflicts:
+        # Unresolved conflicts must still be conflicts on the next run
+        stamp = started.isoformat().encode("ascii")
+        db.set_meta(_sync_key(other), stamp)
+        other.set_meta(_sync_key(db), stamp)
+    return result
+
+
+def _sync_environment(
+    db, other, project, environment, last, strategy, keep_fingerprints, result
+):
+    result.scanned += 1
+    local, remote = db.shard(project), other.shard(project)
+    mine = {} if local is None else _versions(local.conn, project, environment)
+    theirs = {} if remote is None else _versions(remote.conn, project, environment)
+    pull: dict[str, Version] = {}
+    push: dict[str, Version] = {}
+    for key in sorted(mine.keys() | theirs.keys()):
+        a, b = mine.get(key), theirs.get(key)
+        if a == b:
+            continue
+        name = f"{project}/{environment}/{key}"
+        if a is not None and b is not None and a[0] != b[0]:
+            changed = last is None or (_parse(a[0]) > last and _parse(b[0]) > last)
+            if changed:
+                result.conflicts.append(name)
+                if strategy == "report":
+                    continue
+        if a is None or (b is not None and _order(b) > _order(a)):
+            pull[key] = b
+            result.pulled.append(name)
+        else:
+            push[key] = a
+            result.pushed.append(name)
+    if pull:
+        target = db.shard(project, create=True)
+        _copy(remote, target, project, environment, pull, keep_fingerprints)
+    if push:
+        target = other.shard(project, create=True)
+        _copy(local, target, project, environment, push, keep_fingerprints)
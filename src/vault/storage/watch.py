@@ -0,0 +1,337 @@
+"""Writing workspace edits back into the vault.
+
+`WorkspaceWatcher` follows the files recorded in the workspace manifest
+(written by `vault workspace sync` and `vault workspace import`). Changes
+are noticed with inotify on Linux, or otherwise by a stat-only scan of the
+tracked files every ``poll_interval`` seconds. Either way an idle watcher
+only sleeps in ``select``/``wait`` and costs no CPU.
+
+A changed file is only flushed once it has been quiet for ``debounce``
+seconds, so an editor's burst of writes becomes a single update. Flushing
+re-reads the file and compares its keyed fingerprint with the one in the
+manifest, so saves that did not change the content cost no encryption.
+A file claimed by more than one manifest entry is never written back.
+Changed files are encrypted under one fresh salt per batch (one KDF rather
+than one per file) and written in one transaction per DB. A secret changed
+in the vault since it was materialised is reported as a conflict and left
+alone.
+"""
+
+import ctypes
+import ctypes.util
+import mimetypes
+import os
+import select
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from vault import tracing
+from vault.crypto.aes import encrypt
+from vault.crypto.kdf import derive_key, generate_salt
+from vault.exceptions import LockTimeoutError
+from vault.storage.models import SecretRecord
+from vault.storage.workspace import MANIFEST_NAME, load_manifest, save_manifest
+
+DEFAULT_DEBOUNCE = 0.5
+DEFAULT_POLL_INTERVAL = 1.0
+
+# <sys/inotify.h>
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_EVENT = struct.Struct("iIII")
+
+
+@dataclass
+class WatchBatch:
+    written: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)  # saved without changes
+    conflicts: list[str] = field(default_factory=list)  # changed in the vault too
+
+
+class _Inotify:
+    """Names of files written in one directory, via Linux inotify."""
+
+    def __init__(self, directory: Path):
+        name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def wait(self, timeout: float) -> set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names, offset = set(), 0
+        while offset + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            raw = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if raw:
+                names.add(os.fsdecode(raw))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class WorkspaceWatcher:
+    def __init__(
+        self,
+        db,
+        master_password: str,
+        workspace_dir: str | Path,
+        project: str | None = None,
+        environment: str | None = None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        use_inotify: bool = True,
+    ):
+        """
+        :param db: Writable VaultDB
+        :param workspace_dir: Workspace holding the manifest and plaintext files
+        :param project: Only watch this project's files (likewise ``environment``)
+        :param debounce: Seconds a file must be quiet before it is written back
+        :param poll_interval: Seconds between scans when polling
+        :param use_inotify: Use inotify where available instead of polling
+        """
+        db._require_writable()
+        db.unlock(master_password)
+        self.db = db
+        self.master_password = master_password
+        self.workspace = Path(workspace_dir)
+        self.project = project
+        self.environment = environment
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._manifest: dict = {}
+        self._manifest_state = None
+        self._tracked: dict[str, str] = {}  # file name -> manifest key
+        self._shared: set[str] = set()  # file names several entries claim
+        self._seen: dict[str, tuple[int, int] | None] = {}
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(self.workspace)
+            except (OSError, AttributeError, TypeError):
+                # Not Linux (or no libc): fall back to polling
+                self._inotify = None
+        self._reload_manifest()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify else "polling"
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _stat(self, name: str) -> tuple[int, int] | None:
+        try:
+            st = (self.workspace / name).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _reload_manifest(self) -> bool:
+        """Re-read the manifest if it changed; returns whether it did."""
+        state = self._stat(MANIFEST_NAME)
+        if state == self._manifest_state and self._manifest_state is not None:
+            return False
+        self._manifest_state = state
+        self._manifest = load_manifest(self.workspace)
+        self._tracked = {}
+        claims: dict[str, int] = {}
+        for entry in self._manifest.values():
+            claims[entry["path"]] = claims.get(entry["path"], 0) + 1
+        # Left by older versions, which synced same-named files of different
+        # environments over each other: the file's owner is unknown
+        self._shared = {path for path, count in claims.items() if count > 1}
+        for name, entry in self._manifest.items():
+            project, environment, _ = name.split("/", 2)
+            if self.project not in (None, project):
+                continue
+            if self.environment not in (None, environment):
+                continue
+            self._tracked[entry["path"]] = name
+            # What the file looked like when it was last written or saved
+            self._seen.setdefault(entry["path"], (entry["size"], entry["mtime_ns"]))
+        return True
+
+    @property
+    def tracked(self) -> list[str]:
+        """Manifest keys of the watched files."""
+        return sorted(self._tracked.values())
+
+    def scan(self, names=None) -> list[str]:
+        """File names (of ``names``, default all tracked) whose size or mtime changed."""
+        changed = []
+        for name in self._tracked if names is None else names:
+            if name not in self._tracked:
+                continue
+            state = self._stat(name)
+            if state is not None and state != self._seen.get(name):
+                self._seen[name] = state
+                changed.append(name)
+        return changed
+
+    def _wait(self, timeout: float) -> list[str]:
+        if self._inotify is None:
+            time.sleep(timeout)
+            self._reload_manifest()
+            return self.scan()
+        names = self._inotify.wait(timeout)
+        if MANIFEST_NAME in names and self._reload_manifest():
+            return self.scan()
+        self.scan(names)
+        # Every write event re-arms the debounce, even if size and mtime
+        # happen to match the last stat (e.g. a truncate-then-write save)
+        return [name for name in names if name in self._tracked]
+
+    @tracing.traced("watch.flush")
+    def flush(self, names: list[str]) -> WatchBatch:
+        """Write the given (tracked) files back to the vault in one batch."""
+        batch = WatchBatch()
+        changed: dict[str, list[tuple[str, str, bytes]]] = {}
+        for name in sorted(names):
+            key_name = self._tracked.get(name)
+            if key_name is None:
+                continue
+            try:
+                data = (self.workspace / name).read_bytes()
+            except FileNotFoundError:
+                continue
+            if name in self._shared:
+                batch.conflicts.append(key_name)
+                continue
+            entry = self._manifest[key_name]
+            if self.db.fingerprint(self.master_password, data) == entry["fingerprint"]:
+                batch.unchanged.append(key_name)
+                self._remember(key_name, name)
+                continue
+            project = key_name.split("/", 1)[0]
+            changed.setdefault(project, []).append((key_name, name, data))
+
+        if changed:
+            # One KDF for the whole batch; every record still gets its own IV
+            salt = generate_salt()
+            key_bytes = derive_key(self.master_password, salt, self.db.kdf)
+            for project, files in changed.items():
+                self._write(project, files, salt, key_bytes, batch)
+        if batch.written or batch.unchanged:
+            save_manifest(self.workspace, self._manifest)
+            self._manifest_state = self._stat(MANIFEST_NAME)
+        return batch
+
+    def _write(self, project, files, salt, key_bytes, batch):
+        target = self.db.shard(project, create=True)
+        saved = []
+        with target.write_transaction():
+            for key_name, name, data in files:
+                _, environment, key = key_name.split("/", 2)
+                entry = self._manifest[key_name]
+                existing = target.get_secret(project, environment, key)
+                if (
+                    existing is None
+                    or existing.updated_at.isoformat() != entry["updated_at"]
+                ):
+                    # Deleted or rewritten in the vault since it was materialised
+                    batch.conflicts.append(key_name)
+                    continue
+                iv, ciphertext = encrypt(key_bytes, data)
+                now = datetime.now(timezone.utc)
+                record = SecretRecord(
+                    project=project,
+                    environment=environment,
+                    key=key,
+                    value=ciphertext,
+                    iv=iv,
+                    salt=salt,
+                    created_at=existing.created_at,
+                    updated_at=now,
+                    is_file=True,
+                    filename=existing.filename or name,
+                    size=len(data),
+                    fingerprint=self.db.fingerprint(self.master_password, data),
+                    kind="file",
+                    mime=existing.mime or mimetypes.guess_type(name)[0],
+                    kdf=self.db.kdf.encode(),
+                )
+                target.add_secret(record)
+                saved.append((key_name, name, record))
+        # Only once committed: after a rollback the manifest must still match
+        # the vault, or every later save of the file would be a false conflict
+        for key_name, name, record in saved:
+            entry = self._manifest[key_name]
+            entry["updated_at"] = record.updated_at.isoformat()
+            entry["fingerprint"] = record.fingerprint
+            self._remember(key_name, name)
+            batch.written.append(key_name)
+
+    def _remember(self, key_name: str, name: str):
+        state = self._stat(name)
+        if state is not None:
+            entry = self._manifest[key_name]
+            entry["size"], entry["mtime_ns"] = state
+
+    def run(self, stop: threading.Event | None = None, on_batch=None):
+        """
+        Watch until ``stop`` is set (or forever), flushing debounced changes.
+
+        :param on_batch: Called with each non-empty `WatchBatch`
+        """
+        stop = stop or threading.Event()
+        pending: dict[str, float] = {}  # file name -> time of its last change
+        # Pick up edits made while nobody was watching
+        for name in self.scan():
+            pending[name] = time.monotonic() - self.debounce
+        while not stop.is_set():
+            if pending:
+                oldest = min(pending.values())
+                timeout = max(0.0, oldest + self.debounce - time.monotonic())
+            else:
+                timeout = self.poll_interval
+            now_changed = self._wait(min(timeout, self.poll_interval))
+            now = time.monotonic()
+            for name in now_changed:
+                pending[name] = now
+            due = [n for n, t in pending.items() if now - t >= self.debounce]
+            if not due:
+                continue
+            for name in due:
+                del pending[name]
+            try:
+                batch = self.flush(due)
+            except LockTimeoutError:
+                # Another writer holds the vault; try again after the next wait
+                for name in due:
+                    pending[name] = now
+                continue
+            if on_batch and (batch.written or batch.unchanged or batch.conflicts):
+                on_batch(batch)
@@ -0,0 +1,215 @@
+"""Materialising file secrets into the plaintext workspace.
+
+`sync_workspace` writes every file secret of a project/environment into the
+workspace. Decryption (one KDF + AES-GCM per file, both of which release the
+GIL) runs on a thread pool, and a manifest kept next to the files records the
+`updated_at` and keyed fingerprint each file was written from, so re-syncs
+skip files that have not changed in the vault.
+"""
+
+import json
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from vault import tracing
+from vault.exceptions import StorageError
+from vault.storage.db import decrypt_record
+
+MANIFEST_NAME = ".vault-manifest.json"
+MANIFEST_VERSION = 1
+
+# Why `sync_workspace` left a file alone
+CONFLICT_EDITED = "edited"  # changed in the workspace since it was synced
+CONFLICT_NOT_OWNED = "not_owned"  # another secret's file, or the user's own
+CONFLICT_SHARED_NAME = "shared_name"  # same file name as another secret of the env
+
+
+@dataclass
+class SyncResult:
+    written: list[str] = field(default_factory=list)
+    paths: dict[str, Path] = field(default_factory=dict)  # written key -> file
+    unchanged: list[str] = field(default_factory=list)
+    conflicts: list[str] = field(default_factory=list)
+    reasons: dict[str, str] = field(default_factory=dict)  # conflict -> CONFLICT_*
+
+    def conflict(self, name: str, reason: str):
+        self.conflicts.append(name)
+        self.reasons[name] = reason
+
+
+def manifest_key(project: str, environment: str, key: str) -> str:
+    return f"{project}/{environment}/{key}"
+
+
+def load_manifest(workspace_dir: str | Path) -> dict:
+    """Return manifest entries keyed by ``project/environment/key``."""
+    path = Path(workspace_dir) / MANIFEST_NAME
+    try:
+        data = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        raise StorageError(f"Unreadable workspace manifest {path}: {e}")
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("entries", {})
+
+
+def save_manifest(workspace_dir: str | Path, entries: dict):
+    payload = json.dumps(
+        {"version": MANIFEST_VERSION, "entries": entries}, indent=2, sort_keys=True
+    )
+    atomic_write(Path(workspace_dir) / MANIFEST_NAME, payload.encode("utf-8"))
+
+
+@tracing.traced("file.write")
+def atomic_write(dest: Path, data: bytes) -> os.stat_result:
+    """
+    Write ``data`` to ``dest`` via a 0600 temp file in the same directory and an
+    atomic rename, so readers never observe a partially written file.
+    """
+    fd, name = tempfile.mkstemp(prefix=".vault_", suffix=".part", dir=dest.parent)
+    try:
+        try:
+            os.fchmod(fd, 0o600)
+        except Exception:
+            # os.fchmod may not be available on some systems; best effort
+            pass
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(name, dest)
+    except Exception as e:
+        try:
+            Path(name).unlink()
+        except Exception:
+            pass
+        raise StorageError(f"Failed to write {dest}: {e}")
+    return dest.stat()
+
+
+def record_materialized(workspace_dir: str | Path, record, path: Path):
+    """Add one file secret just written to ``path`` to the workspace manifest."""
+    manifest = load_manifest(workspace_dir)
+    st = path.stat()
+    # The file now holds this secret, whichever entry it belonged to before
+    for name in [n for n, entry in manifest.items() if entry["path"] == path.name]:
+        del manifest[name]
+    manifest[manifest_key(record.project, record.environment, record.key)] = {
+        "path": path.name,
+        "updated_at": record.updated_at.isoformat(),
+        "fingerprint": record.fingerprint,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+    save_manifest(workspace_dir, manifest)
+
+
+def _local_state(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def sync_workspace(
+    db,
+    project: str,
+    environment: str,
+    master_password: str,
+    workspace_dir: str | Path,
+    workers: int | None = None,
+    force: bool = False,
+) -> SyncResult:
+    """
+    Materialise all file secrets of ``project``/``environment`` into the workspace.
+
+    Files whose vault version matches the manifest and that still exist are
+    skipped without decrypting. Files edited locally since the last sync, and
+    files the manifest does not attribute to this secret (the user's own, or
+    the same file name synced from another project/environment), are reported
+    as conflicts and left alone unless ``force`` is set. Secrets of one
+    environment that share a file name are always conflicts.
+
+    :param db: VaultDB
+    :param workers: Decryption threads (default: ``min(32, cpu_count + 4)``)
+    :return: Which manifest keys were written, unchanged or in conflict (and
+        why, as one of the ``CONFLICT_*`` reasons)
+    """
+    workspace = Path(workspace_dir)
+    workspace.mkdir(parents=True, exist_ok=True)
+    db.unlock(master_password)
+    manifest = load_manifest(workspace)
+    result = SyncResult()
+
+    # The workspace is flat: note which manifest entries (of any project or
+    # environment) own each file name, and which names this sync would reuse
+    owners: dict[str, set[str]] = {}
+    for key_name, entry in manifest.items():
+        owners.setdefault(entry["path"], set()).add(key_name)
+    infos = [info for info in db.list_entries(project, environment) if info.is_file]
+    dest_names = Counter(Path(info.filename or info.key).name for info in infos)
+
+    todo = []
+    for info in infos:
+        name = manifest_key(project, environment, info.key)
+        dest = workspace / Path(info.filename or info.key).name
+        entry = manifest.get(name)
+        local = _local_state(dest)
+        claimed = owners.get(dest.name, set()) - {name}
+        synced = entry and local == (entry["size"], entry["mtime_ns"])
+        vault_unchanged = entry and (
+            entry["updated_at"] == info.updated_at.isoformat()
+            and entry["fingerprint"] == info.fingerprint
+        )
+        if dest_names[dest.name] > 1:
+            # Several secrets of this environment share a file name; even with
+            # --force only one of them could be written there
+            result.conflict(name, CONFLICT_SHARED_NAME)
+        elif (claimed or (entry is None and local)) and not force:
+            # Written for another project/environment, or the user's own file
+            result.conflict(name, CONFLICT_NOT_OWNED)
+        elif synced and vault_unchanged and not force:
+            result.unchanged.append(name)
+        elif entry and local and not synced and not force:
+            # Edited in the workspace since we wrote it; never clobber edits
+            result.conflict(name, CONFLICT_EDITED)
+        else:
+            todo.append((name, dest, info))
+
+    def materialise(item):
+        name, dest, record = item
+        st = atomic_write(dest, decrypt_record(record, master_password))
+        return name, dest, record, st
+
+    # Records are read on this thread, in one query; sqlite connections are
+    # not shareable. Secrets deleted since they were listed are dropped.
+    found = db.get_secrets(project, environment, [info.key for _, _, info in todo])
+    records = [
+        (name, dest, found[info.key]) for name, dest, info in todo if info.key in found
+    ]
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for name, dest, record, st in pool.map(materialise, records):
+                # With --force the file now belongs to this secret alone
+                for other in owners.get(dest.name, set()) - {name}:
+                    manifest.pop(other, None)
+                manifest[name] = {
+                    "path": dest.name,
+                    "updated_at": record.updated_at.isoformat(),
+                    "fingerprint": record.fingerprint,
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                }
+                result.written.append(name)
+                result.paths[name] = dest
+    finally:
+        if result.written:
+            save_manifest(workspace, manifest)
+    return result
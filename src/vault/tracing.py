@@ -0,0 +1,194 @@
+# vault/tracing.py
+"""Lightweight per-phase timing for diagnosing slow commands.
+
+Enabled with ``vault --trace`` / ``VAULT_TRACE=1`` (stderr) or
+``--trace-file PATH`` / ``VAULT_TRACE_FILE``. Each finished span is written
+as one JSON line (name, start offset, duration, nesting depth and
+attributes) to stderr or PATH, followed by a summary line with per-span
+totals and counters when the command ends.
+
+When tracing is disabled, `span` returns a shared no-op context manager and
+`traced` functions make a single ``None`` check before calling through, so
+the instrumentation costs essentially nothing.
+"""
+
+import contextlib
+import functools
+import json
+import sys
+import threading
+import time
+
+# Taken when the vault package starts importing, so the first trace line can
+# report how long imports took before the command ran.
+IMPORT_STARTED = time.perf_counter()
+
+_NOOP = contextlib.nullcontext()
+_tracer: "Tracer | None" = None
+
+
+class Tracer:
+    def __init__(self, stream, close_stream: bool = False):
+        self.stream = stream
+        self.close_stream = close_stream
+        self.started = IMPORT_STARTED
+        self.spans: dict[str, list[float]] = {}  # name -> [count, total ms]
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _emit(self, payload: dict):
+        line = json.dumps(payload, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def _record(self, name: str, started: float, ended: float, depth: int, attrs):
+        ms = (ended - started) * 1000
+        with self._lock:
+            total = self.spans.setdefault(name, [0, 0.0])
+            total[0] += 1
+            total[1] += ms
+        self._emit(
+            {
+                "type": "span",
+                "name": name,
+                "start_ms": round((started - self.started) * 1000, 3),
+                "ms": round(ms, 3),
+                "depth": depth,
+                **attrs,
+            }
+        )
+
+    @contextlib.contextmanager
+    def span(self, name: str, attrs: dict):
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        started = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            self._local.depth = depth
+            self._record(name, started, time.perf_counter(), depth, attrs)
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self, **attrs):
+        self._emit(
+            {
+                "type": "summary",
+                "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+                "spans": {
+                    name: {"count": count, "ms": round(ms, 3)}
+                    for name, (count, ms) in sorted(self.spans.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+                **attrs,
+            }
+        )
+        if self.close_stream:
+            self.stream.close()
+
+
+def enable(path: str | None = None) -> Tracer:
+    """
+    Start tracing to stderr, or append to ``path`` if given.
+
+    An ``imports`` span covering the time since the package was imported is
+    recorded immediately.
+    """
+    global _tracer
+    if path:
+        tracer = Tracer(open(path, "a", encoding="utf-8"), close_stream=True)
+    else:
+        tracer = Tracer(sys.stderr)
+    tracer._record("imports", IMPORT_STARTED, time.perf_counter(), 0, {})
+    _tracer = tracer
+    return tracer
+
+
+def disable(**attrs):
+    """Emit the summary line and stop tracing."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.finish(**attrs)
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attrs):
+    """
+    Time a block: ``with span("kdf", algorithm="scrypt"): ...``.
+
+    The yielded dict can be updated with attributes known only at the end.
+    """
+    if _tracer is None:
+        return _NOOP
+    return _tracer.span(name, attrs)
+
+
+def count(name: str, value: int = 1):
+    """Add ``value`` to a counter reported in the summary line."""
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def traced(name: str):
+    """Decorator form of `span` for whole functions."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with _tracer.span(name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TracedConnection:
+    """
+    sqlite3 connection proxy timing ``execute``/``executemany``/``commit``.
+
+    Only installed while tracing is enabled; cursors are returned unwrapped,
+    so row fetching after the first step is not included in ``sql`` spans.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def execute(self, sql, *args):
+        with span("sql", op=_statement_kind(sql)):
+            count("sql.statements")
+            return self._conn.execute(sql, *args)
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        with span("sql", op=_statement_kind(sql), rows=len(rows)):
+            count("sql.statements")
+            count("sql.rows_written", len(rows))
+            return self._conn.executemany(sql, rows)
+
+    def commit(self):
+        with span("sql.commit"):
+            count("sql.commits")
+            return self._conn.commit()
+
+
+def _statement_kind(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].upper() if words else ""
@@ -0,0 +1,77 @@
+import json
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _run(*args):
+    return subprocess.run(
+        [sys.executable, "-m", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _rows(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(
+            "SELECT project, environment, key, size, kind FROM secrets ORDER BY 1, 2, 3"
+        ).fetchall()
+
+
+def test_generator_is_deterministic(tmp_path):
+    for name in ("a.db", "b.db"):
+        _run(
+            "benchmarks.generate",
+            str(tmp_path / name),
+            "--rows",
+            "200",
+            "--projects",
+            "4",
+            "--file-ratio",
+            "0.3",
+        )
+    rows = _rows(tmp_path / "a.db")
+    assert len(rows) == 200
+    assert {row[4] for row in rows} == {"text", "file"}
+    assert rows == _rows(tmp_path / "b.db")
+
+
+def test_suite_writes_comparable_results(tmp_path):
+    out = tmp_path / "results.json"
+    _run(
+        "benchmarks.run",
+        "--rows",
+        "60",
+        "--projects",
+        "2",
+        "--repeat",
+        "2",
+        "--file-sizes",
+        "1024",
+        "--stream-size",
+        "3000000",
+        "--stream-workers",
+        "1,2",
+        "-o",
+        str(out),
+    )
+    report = json.loads(out.read_text())
+    assert report["meta"]["rows"] == 60
+    assert report["results"]["get_file_1024"]["median_ms"] > 0
+    assert "cli_cold_start" in report["results"]
+    assert report["results"]["stream_encrypt_w2"]["gb_per_s"] > 0
+
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.compare", str(out), str(out)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0
+    assert "get_file_1024" in result.stdout
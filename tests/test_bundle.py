@@ -0,0 +1,171 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from click.testing import CliRunner
+
+from vault import tracing
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.exceptions import CryptoError, InvalidPasswordError, StorageError
+from vault.storage import bundle as bundle_module
+from vault.storage.bundle import export_bundle, import_bundle
+from vault.storage.db import VaultDB
+from vault.storage.shards import ShardedVaultDB
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+def _vault(path):
+    return VaultDB(str(path), kdf=FAST_KDF)
+
+
+def _populate(db, tmp_path):
+    db.add_text_secret("myapp", "dev", "API_KEY", "dev-key", "masterpass")
+    db.add_text_secret("myapp", "prod", "API_KEY", "prod-key", "masterpass")
+    payload = tmp_path / "keystore.jks"
+    payload.write_bytes(bytes(range(256)) * 64)
+    db.add_file_secret("myapp", "prod", "keystore.jks", str(payload), "masterpass")
+    db.add_text_secret("other", "prod", "API_KEY", "other-key", "masterpass")
+
+
+def test_export_import_round_trip_with_one_kdf(tmp_path, monkeypatch):
+    with _vault(tmp_path / "source.db") as db:
+        _populate(db, tmp_path)
+        # Small chunks so the bundle spans several of them
+        monkeypatch.setattr(bundle_module, "CHUNK_SIZE", 4096)
+        assert export_bundle(db, str(tmp_path / "b.bundle"), "masterpass", "myapp") == 3
+        fingerprint = db.get_secret("myapp", "prod", "keystore.jks").fingerprint
+
+    with _vault(tmp_path / "target.db") as db:
+        db.unlock("masterpass")
+        tracer = tracing.enable(str(tmp_path / "trace.jsonl"))
+        try:
+            result = import_bundle(db, str(tmp_path / "b.bundle"), "masterpass")
+        finally:
+            tracing.disable()
+        # The bundle key is the only KDF run; secrets are never decrypted
+        assert tracer.counters["kdf.calls"] == 1
+        assert sorted(result.added) == [
+            "dev/API_KEY",
+            "prod/API_KEY",
+            "prod/keystore.jks",
+        ]
+        record = db.get_secret("myapp", "prod", "keystore.jks")
+        assert db.decrypt_secret(record, "masterpass") == bytes(range(256)) * 64
+        assert record.filename == "keystore.jks" and record.size == 256 * 64
+        # Different vault key: the source's fingerprint is meaningless here
+        assert record.fingerprint is None and fingerprint is not None
+        assert list(db.list_projects()) == ["myapp"]
+
+
+def test_conflict_policies(tmp_path):
+    with _vault(tmp_path / "source.db") as db:
+        _populate(db, tmp_path)
+        export_bundle(db, str(tmp_path / "prod.bundle"), "masterpass", "myapp", "prod")
+
+    with _vault(tmp_path / "target.db") as db:
+        db.add_text_secret("myapp", "prod", "API_KEY", "local", "masterpass")
+
+        result = import_bundle(db, str(tmp_path / "prod.bundle"), "masterpass")
+        assert result.skipped == ["prod/API_KEY"]
+        assert result.added == ["prod/keystore.jks"]
+        record = db.get_secret("myapp", "prod", "API_KEY")
+        assert db.decrypt_secret(record, "masterpass") == b"local"
+
+        # The local copy is newer than the bundled one
+        result = import_bundle(db, str(tmp_path / "prod.bundle"), "masterpass", "newer")
+        assert result.skipped == ["prod/API_KEY", "prod/keystore.jks"]
+
+        db.conn.execute(
+            "UPDATE secrets SET updated_at = ? WHERE key = 'API_KEY'",
+            ((datetime.now(timezone.utc) - timedelta(days=1)).isoformat(),),
+        )
+        db.conn.commit()
+        result = import_bundle(db, str(tmp_path / "prod.bundle"), "masterpass", "newer")
+        assert result.updated == ["prod/API_KEY"]
+
+        db.add_text_secret("myapp", "prod", "API_KEY", "local", "masterpass")
+        result = import_bundle(
+            db, str(tmp_path / "prod.bundle"), "masterpass", "overwrite"
+        )
+        assert sorted(result.updated) == ["prod/API_KEY", "prod/keystore.jks"]
+        record = db.get_secret("myapp", "prod", "API_KEY")
+        assert db.decrypt_secret(record, "masterpass") == b"prod-key"
+
+
+def test_wrong_password_and_tampering_write_nothing(tmp_path):
+    with _vault(tmp_path / "source.db") as db:
+        _populate(db, tmp_path)
+        export_bundle(db, str(tmp_path / "b.bundle"), "masterpass", "myapp")
+    data = (tmp_path / "b.bundle").read_bytes()
+
+    with _vault(tmp_path / "other.db") as db:
+        db.add_text_secret("x", "dev", "K", "v", "otherpass")
+        with pytest.raises(InvalidPasswordError):
+            import_bundle(db, str(tmp_path / "b.bundle"), "otherpass")
+
+    (tmp_path / "tampered.bundle").write_bytes(data[:-40] + bytes(40))
+    (tmp_path / "truncated.bundle").write_bytes(data[: len(data) // 2])
+    (tmp_path / "trailing.bundle").write_bytes(data + os.urandom(700))
+    with _vault(tmp_path / "target.db") as db:
+        for name in ("tampered.bundle", "truncated.bundle", "trailing.bundle"):
+            for workers in (1, 4):
+                with pytest.raises((CryptoError, InvalidPasswordError)):
+                    import_bundle(
+                        db, str(tmp_path / name), "masterpass", workers=workers
+                    )
+        # The single transaction was rolled back
+        assert list(db.list_projects()) == []
+        with pytest.raises(StorageError):
+            import_bundle(db, str(tmp_path / "b.bundle"), "masterpass", "merge")
+        with pytest.raises(StorageError):
+            import_bundle(db, str(tmp_path / "missing.bundle"), "masterpass")
+
+
+def test_cli_bundle_export_import(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+    bundle_path = tmp_path / "myapp.vaultbundle"
+    result = runner.invoke(
+        cli,
+        ["bundle", "export", "myapp", "-o", str(bundle_path)],
+        input="masterpass\n",
+    )
+    assert "Exported 1 secret(s)" in result.output
+
+    # A freshly set up machine
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / "agent"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    result = runner.invoke(
+        cli, ["bundle", "import", str(bundle_path)], input="masterpass\n"
+    )
+    assert "Imported 1 new, 0 updated, 0 skipped." in result.output
+    result = runner.invoke(
+        cli, ["bundle", "import", str(tmp_path / "missing.vaultbundle")]
+    )
+    assert result.exit_code == 2 and "does not exist" in result.output
+    result = runner.invoke(
+        cli, ["get", "myapp", "dev", "API_KEY", "--show"], input="masterpass\n"
+    )
+    assert "secret123" in result.output
+
+
+def test_import_into_sharded_vault(tmp_path):
+    with _vault(tmp_path / "source.db") as db:
+        _populate(db, tmp_path)
+        export_bundle(db, str(tmp_path / "b.bundle"), "masterpass", "myapp")
+
+    with ShardedVaultDB(str(tmp_path / "catalog.db"), kdf=FAST_KDF) as db:
+        result = import_bundle(db, str(tmp_path / "b.bundle"), "masterpass")
+        assert len(result.added) == 3
+        assert [project for project, _ in db.shards()] == ["myapp"]
+        record = db.get_secret("myapp", "dev", "API_KEY")
+        assert db.decrypt_secret(record, "masterpass") == b"dev-key"
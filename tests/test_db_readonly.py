@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.exceptions import StorageError
+from vault.storage.db import VaultDB
+from vault.storage.models import SecretRecord
+
+
+def _record(key="API_KEY"):
+    return SecretRecord(
+        project="myapp",
+        environment="dev",
+        key=key,
+        value=b"encrypted_data_here",
+        iv=b"iv_bytes",
+        salt=b"salt_bytes",
+        created_at=datetime.now(timezone.utc),
+        updated_at=datetime.now(timezone.utc),
+        is_file=False,
+    )
+
+
+def test_readonly_db_reads_but_refuses_writes(tmp_path):
+    db_path = tmp_path / "vault.db"
+    with VaultDB(str(db_path)) as db:
+        db.add_secret(_record())
+
+    with VaultDB(str(db_path), readonly=True) as ro:
+        assert ro.get_secret("myapp", "dev", "API_KEY").value == b"encrypted_data_here"
+        with pytest.raises(StorageError):
+            ro.add_secret(_record("OTHER"))
+
+
+def test_immutable_db_opens_snapshot(tmp_path):
+    db_path = tmp_path / "snapshot.db"
+    with VaultDB(str(db_path)) as db:
+        db.add_secret(_record())
+        db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    with VaultDB(str(db_path), immutable=True) as snap:
+        assert snap.readonly
+        assert snap.get_secret("myapp", "dev", "API_KEY") is not None
+
+
+def test_readonly_missing_db_is_not_created(tmp_path):
+    db_path = tmp_path / "missing.db"
+    with pytest.raises(StorageError):
+        VaultDB(str(db_path), readonly=True)
+    assert not db_path.exists()
+
+
+def test_cli_readonly_flag(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+
+    result = runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+    assert result.exit_code == 0
+
+    result = runner.invoke(cli, ["--readonly", "list", "myapp", "dev"])
+    assert result.exit_code == 0
+    assert "API_KEY" in result.output
+
+    result = runner.invoke(
+        cli,
+        ["--readonly", "add", "myapp", "dev", "OTHER"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+    assert "read-only" in result.output
@@ -0,0 +1,107 @@
+import os
+import sqlite3
+
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.storage.db import VaultDB
+from vault.storage.maintenance import optimize, reclaim_space
+from vault.storage.shards import ShardedVaultDB
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+def _auto_vacuum(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_existing_db_is_switched_to_incremental_vacuum_by_optimize(tmp_path):
+    path = str(tmp_path / "vault.db")
+    VaultDB(path).close()
+    assert _auto_vacuum(path) == 2
+    # A DB created before migration 0008
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA auto_vacuum = NONE")
+    conn.execute("VACUUM")
+    conn.execute("DELETE FROM migrations WHERE name = '0008_enable_incremental_vacuum'")
+    conn.commit()
+    conn.close()
+    assert _auto_vacuum(path) == 0
+    with VaultDB(path) as db:
+        # Opening the vault never rewrites the whole file
+        assert _auto_vacuum(path) == 0
+        assert optimize(db).unconverted == 1
+        assert optimize(db, vacuum=True).converted == 1
+    assert _auto_vacuum(path) == 2
+    with VaultDB(path) as db:
+        result = optimize(db, vacuum=True)
+        assert (result.converted, result.unconverted) == (0, 0)
+
+
+@pytest.mark.parametrize("vault_class", [VaultDB, ShardedVaultDB])
+def test_bulk_delete_leaves_tombstones_and_reclaims_space(tmp_path, vault_class):
+    blob = tmp_path / "blob.bin"
+    blob.write_bytes(os.urandom(200_000))
+    with vault_class(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        for i in range(5):
+            db.add_file_secret("app", "dev", f"old_{i}.bin", str(blob), "masterpass")
+        db.add_text_secret("app", "dev", "KEEP", "v", "masterpass")
+        db.add_text_secret("app", "prod", "old_0.bin", "v", "masterpass")
+        shard = db.shard("app")
+        pages = shard.conn.execute("PRAGMA page_count").fetchone()[0]
+
+        deleted = db.delete_secrets("app", "dev", "old_*")
+        assert [info.key for info in deleted] == [f"old_{i}.bin" for i in range(5)]
+        tombstones = shard.conn.execute(
+            "SELECT environment, key FROM tombstones ORDER BY key"
+        ).fetchall()
+        assert tombstones == [("dev", f"old_{i}.bin") for i in range(5)]
+        assert [i.key for i in db.list_entries("app", "dev")] == ["KEEP"]
+        assert db.get_secret("app", "prod", "old_0.bin") is not None
+
+        reclaimed = reclaim_space(db, step_pages=16)
+        assert reclaimed > 0
+        assert shard.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert shard.conn.execute("PRAGMA page_count").fetchone()[0] < pages / 10
+
+        assert [i.key for i in db.delete_secrets("app")] == ["KEEP", "old_0.bin"]
+        assert list(db.list_environments("app")) == []
+
+
+def test_cli_rm(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    for key in ("API_KEY", "LEGACY_A", "LEGACY_B"):
+        runner.invoke(
+            cli, ["add", "myapp", "dev", key], input="masterpass\nsecret\nsecret\n"
+        )
+
+    result = runner.invoke(cli, ["rm", "myapp", "dev", "API_KEY"])
+    assert "Deleted myapp/dev/API_KEY" in result.output
+    result = runner.invoke(cli, ["rm", "myapp", "dev", "API_KEY"])
+    assert "No secret found" in result.output
+
+    result = runner.invoke(
+        cli, ["rm", "myapp", "dev", "--glob", "LEGACY_*", "--dry-run"]
+    )
+    assert "myapp/dev/LEGACY_A" in result.output
+    assert "Would delete 2 secret(s)." in result.output
+    result = runner.invoke(
+        cli, ["rm", "--project", "myapp", "--env", "dev"], input="n\n"
+    )
+    assert "Deleted" not in result.output
+    result = runner.invoke(cli, ["rm", "--project", "myapp", "--env", "dev", "--yes"])
+    assert "Deleted 2 secret(s)." in result.output
+
+    result = runner.invoke(cli, ["rm", "myapp", "dev"])
+    assert result.exit_code == 2
+    result = runner.invoke(cli, ["rm", "myapp", "--env", "dev"])
+    assert result.exit_code == 2
@@ -0,0 +1,98 @@
+import json
+
+from click.testing import CliRunner
+
+from vault import tracing
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.storage.db import VaultDB
+from vault.storage.diff import _JOIN, backfill_fingerprints, diff_environments
+from vault.storage.shards import ShardedVaultDB
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+def _fill(db):
+    for key, value in (("SAME", "1"), ("CHANGED", "old"), ("ONLY_STAGING", "x")):
+        db.add_text_secret("app", "staging", key, value, "masterpass")
+    for key, value in (("SAME", "1"), ("CHANGED", "new"), ("ONLY_PROD", "y")):
+        db.add_text_secret("app", "prod", key, value, "masterpass")
+
+
+def test_diff_without_decrypting(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        _fill(db)
+        tracer = tracing.enable(str(tmp_path / "trace.jsonl"))
+        try:
+            result = diff_environments(db, ("app", "staging"), ("app", "prod"))
+        finally:
+            tracing.disable()
+        assert "kdf.calls" not in tracer.counters
+        assert "aes.bytes_decrypted" not in tracer.counters
+        assert result.equal == ["SAME"]
+        assert result.different == ["CHANGED"]
+        assert result.missing == ["ONLY_STAGING"]
+        assert result.extra == ["ONLY_PROD"]
+        assert not result.unknown and not result.in_sync
+
+        # The join reads the covering index, not the ciphertext rows
+        plan = " ".join(
+            row[-1]
+            for row in db.conn.execute(
+                f"EXPLAIN QUERY PLAN {_JOIN}",
+                {"pa": "app", "ea": "staging", "pb": "app", "eb": "prod"},
+            )
+        )
+        assert "COVERING INDEX idx_secrets_scope_fingerprint" in plan
+
+
+def test_diff_across_shards(tmp_path):
+    with ShardedVaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        db.add_text_secret("web", "prod", "TOKEN", "t", "masterpass")
+        db.add_text_secret("api", "prod", "TOKEN", "t", "masterpass")
+        db.add_text_secret("api", "prod", "DB_URL", "u", "masterpass")
+        result = diff_environments(db, ("web", "prod"), ("api", "prod"))
+        assert result.equal == ["TOKEN"] and result.extra == ["DB_URL"]
+        result = diff_environments(db, ("web", "prod"), ("nope", "prod"))
+        assert result.missing == ["TOKEN"]
+
+
+def test_backfill_fills_missing_fingerprints(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        _fill(db)
+        # As left by migration 0003 for rows written before fingerprints
+        db.conn.execute("UPDATE secrets SET fingerprint = NULL WHERE key = 'SAME'")
+        db.conn.commit()
+        result = diff_environments(db, ("app", "staging"), ("app", "prod"))
+        assert result.unknown == ["SAME"] and not result.equal
+
+        scopes = [("app", "staging"), ("app", "prod")]
+        assert backfill_fingerprints(db, "masterpass", scopes) == 2
+        assert backfill_fingerprints(db, "masterpass", scopes) == 0
+        result = diff_environments(db, ("app", "staging"), ("app", "prod"))
+        assert result.equal == ["SAME"] and not result.unknown
+
+
+def test_cli_diff(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    for env, value in (("staging", "a"), ("prod", "b")):
+        runner.invoke(
+            cli, ["add", "myapp", env, "KEY"], input=f"masterpass\n{value}\n{value}\n"
+        )
+
+    result = runner.invoke(cli, ["diff", "myapp", "staging", "prod"])
+    assert "~ KEY" in result.output
+    assert "0 equal, 1 different, 0 missing, 0 extra" in result.output
+    assert result.exit_code == 0
+
+    result = runner.invoke(
+        cli, ["diff", "myapp/staging", "myapp/prod", "--format", "json", "--exit-code"]
+    )
+    assert result.exit_code == 1
+    assert json.loads(result.output)["different"] == ["KEY"]
+
+    result = runner.invoke(cli, ["diff", "myapp", "staging"])
+    assert result.exit_code == 2
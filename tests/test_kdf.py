@@ -0,0 +1,64 @@
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.crypto.kdf import DEFAULT_KDF, KdfParams, calibrate, derive_key
+from vault.exceptions import CryptoError
+from vault.storage.db import VaultDB
+
+
+def test_kdf_params_roundtrip_and_validation():
+    scrypt = KdfParams.scrypt(n=2**12, r=8, p=1)
+    assert KdfParams.decode(scrypt.encode()) == scrypt
+    assert KdfParams.decode("pbkdf2-sha256$i=1000") == KdfParams.pbkdf2(1000)
+    assert KdfParams.decode(None) == DEFAULT_KDF
+    with pytest.raises(CryptoError):
+        KdfParams.decode("scrypt$n=1000,r=8,p=1")
+    with pytest.raises(CryptoError):
+        KdfParams.decode("argon2$t=3")
+
+    salt = b"s" * 16
+    assert derive_key("masterpass", salt, scrypt) != derive_key("masterpass", salt)
+
+
+def test_old_records_are_upgraded_on_access(tmp_path):
+    db_path = str(tmp_path / "vault.db")
+    with VaultDB(db_path) as db:
+        db.add_text_secret("app", "dev", "API_KEY", "secret123", "masterpass")
+        assert db.get_secret("app", "dev", "API_KEY").kdf == DEFAULT_KDF.encode()
+
+    fast = KdfParams.scrypt(n=2**12)
+    with VaultDB(db_path, readonly=True, kdf=fast) as ro:
+        record = ro.get_secret("app", "dev", "API_KEY")
+        assert ro.decrypt_secret(record, "masterpass") == b"secret123"
+        # Read-only opens never rewrite records
+        assert ro.get_secret("app", "dev", "API_KEY").kdf == DEFAULT_KDF.encode()
+
+    with VaultDB(db_path, kdf=fast) as db:
+        record = db.get_secret("app", "dev", "API_KEY")
+        assert db.decrypt_secret(record, "masterpass") == b"secret123"
+        upgraded = db.get_secret("app", "dev", "API_KEY")
+        assert upgraded.kdf == fast.encode()
+        assert upgraded.updated_at == record.updated_at
+        assert db.decrypt_secret(upgraded, "masterpass") == b"secret123"
+
+
+def test_calibrate_scales_with_target():
+    low = calibrate(1, "scrypt")
+    assert low.algorithm == "scrypt"
+    assert calibrate(50, "pbkdf2-sha256").iterations >= 1000
+
+
+def test_cli_bench_kdf_save(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+
+    result = runner.invoke(
+        cli, ["bench", "kdf", "--target-ms", "5", "--algorithm", "scrypt", "--save"]
+    )
+    assert result.exit_code == 0
+    assert "scrypt$n=" in result.output
+
+    result = runner.invoke(cli, ["config", "show"])
+    assert '"kdf": "scrypt$n=' in result.output
@@ -0,0 +1,69 @@
+import json
+from datetime import datetime, timezone
+
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.storage.db import VaultDB
+from vault.storage.models import SecretRecord
+
+
+def _add(db, project, environment, key, value=b"x" * 20):
+    db.add_secret(
+        SecretRecord(
+            project=project,
+            environment=environment,
+            key=key,
+            value=value,
+            iv=b"iv",
+            salt=b"salt",
+            created_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc),
+        )
+    )
+
+
+def test_db_walks_hierarchy_with_keyset_pagination(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        for project in ("c", "a", "b"):
+            for env in ("prod", "dev"):
+                for key in ("K2", "K1", "K3"):
+                    _add(db, project, env, key)
+
+        assert list(db.list_projects()) == ["a", "b", "c"]
+        assert list(db.list_projects(after="a", limit=1)) == ["b"]
+        assert list(db.list_environments("b")) == ["dev", "prod"]
+
+        page = list(db.list_entries("a", "dev", limit=2))
+        assert [info.key for info in page] == ["K1", "K2"]
+        rest = list(db.list_entries("a", "dev", after=page[-1].key))
+        assert [info.key for info in rest] == ["K3"]
+        # AES-GCM tag is excluded from the reported plaintext size
+        assert rest[0].size == 4
+
+
+def test_cli_list_levels_and_ndjson(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    for key in ("API_KEY", "DB_URL"):
+        runner.invoke(
+            cli,
+            ["add", "myapp", "dev", key],
+            input="masterpass\nsecret123\nsecret123\n",
+        )
+
+    result = runner.invoke(cli, ["list"])
+    assert result.exit_code == 0
+    assert "myapp/" in result.output
+
+    result = runner.invoke(cli, ["list", "myapp", "dev", "--limit", "1"])
+    assert "- API_KEY (Text, 9 B" in result.output
+    assert "DB_URL" not in result.output
+    assert "More results: --after API_KEY" in result.output
+
+    result = runner.invoke(cli, ["list", "--tree", "--format", "ndjson"])
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert {"project": "myapp"} in lines
+    assert [e["key"] for e in lines if "key" in e] == ["API_KEY", "DB_URL"]
@@ -0,0 +1,76 @@
+import json
+
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.storage.db import VaultDB
+from vault.storage.maintenance import collect_stats, optimize
+
+
+def _populate(db, count=50, size=8192):
+    src_dir = db.db_path.parent / "src"
+    src_dir.mkdir(exist_ok=True)
+    for i in range(count):
+        path = src_dir / f"blob-{i}.bin"
+        path.write_bytes(bytes([i]) * size)
+        db.add_file_secret("app", "prod", path.name, str(path), "masterpass")
+    db.add_text_secret("app", "dev", "API_KEY", "secret123", "masterpass")
+
+
+def test_stats_report_rows_histogram_and_indexes(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        _populate(db, count=5)
+    with VaultDB(str(tmp_path / "vault.db"), readonly=True) as db:
+        stats = collect_stats(db)
+    assert stats.rows == 6 and stats.files == 5
+    assert [(s.project, s.environment, s.rows) for s in stats.scopes] == [
+        ("app", "dev", 1),
+        ("app", "prod", 5),
+    ]
+    # 9 B text secret + 16 B tag in the 32 B bucket, 8 KiB files + tag in 16 KiB
+    assert dict(stats.histogram) == {32: 1, 16384: 5}
+    names = {obj.name for obj in stats.objects}
+    assert {"secrets", "idx_secrets_key"} <= names
+    assert stats.page_count > 0
+
+
+def test_optimize_vacuum_reclaims_deleted_space(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        _populate(db)
+        db.conn.execute("DELETE FROM secrets WHERE environment = 'prod'")
+        db.conn.commit()
+        result = optimize(db, vacuum=True)
+        stats = collect_stats(db)
+    assert set(result.timings) == {"checkpoint", "analyze", "vacuum"}
+    assert result.reclaimed > 50 * 8192 // 2
+    assert stats.freelist_count == 0
+    assert stats.wal_bytes == 0
+    # ANALYZE populated planner statistics
+    assert any(obj.stat for obj in stats.objects)
+
+
+def test_cli_stats_and_optimize(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+
+    result = runner.invoke(cli, ["--readonly", "stats"])
+    assert result.exit_code == 0
+    assert "Secrets: 1 (0 files)" in result.output
+    assert "myapp/dev: 1 rows" in result.output
+
+    result = runner.invoke(cli, ["stats", "--format", "json"])
+    assert json.loads(result.output)["rows"] == 1
+
+    result = runner.invoke(cli, ["optimize"])
+    assert result.exit_code == 0
+    assert "reclaimed" in result.output
+
+    result = runner.invoke(cli, ["--readonly", "optimize"])
+    assert "[ERROR]" in result.output
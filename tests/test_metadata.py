@@ -0,0 +1,36 @@
+from vault.storage.db import VaultDB
+
+
+def test_file_secret_metadata_recorded_at_write_time(tmp_path):
+    cert = tmp_path / "server.pem"
+    cert.write_bytes(b"-----BEGIN CERTIFICATE-----")
+
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        db.add_file_secret("app", "dev", cert.name, str(cert), "masterpass")
+        db.add_file_secret("app", "prod", cert.name, str(cert), "masterpass")
+        db.add_text_secret("app", "dev", "API_KEY", "secret123", "masterpass")
+
+        dev = db.get_secret("app", "dev", "server.pem")
+        prod = db.get_secret("app", "prod", "server.pem")
+        text = db.get_secret("app", "dev", "API_KEY")
+
+    assert dev.filename == "server.pem"
+    assert dev.size == len(b"-----BEGIN CERTIFICATE-----")
+    assert dev.kind == "file"
+    assert dev.mime.startswith("application/")
+    # Same plaintext, same vault: same keyed fingerprint despite distinct salts
+    assert dev.salt != prod.salt
+    assert dev.fingerprint == prod.fingerprint
+    assert text.kind == "text"
+    assert text.size == 9
+    assert text.fingerprint != dev.fingerprint
+
+
+def test_fingerprint_is_keyed_by_vault(tmp_path):
+    with VaultDB(str(tmp_path / "a.db")) as a, VaultDB(str(tmp_path / "b.db")) as b:
+        assert a.fingerprint("masterpass", b"data") == a.fingerprint(
+            "masterpass", b"data"
+        )
+        assert a.fingerprint("masterpass", b"data") != b.fingerprint(
+            "masterpass", b"data"
+        )
@@ -37,3 +37,39 @@ def test_migration_adds_filename_column(tmp_path):
     conn.close()
 
     assert "filename" in columns
+
+
+def test_migration_backfills_metadata_columns(tmp_path):
+    db_path = tmp_path / "old_vault.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE secrets (
+            project TEXT NOT NULL,
+            environment TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value BLOB NOT NULL,
+            iv BLOB NOT NULL,
+            salt BLOB NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            is_file INTEGER NOT NULL,
+            PRIMARY KEY(project, environment, key)
+        )
+    """
+    )
+    conn.execute(
+        "INSERT INTO secrets VALUES ('app', 'dev', 'cert.pem', ?, ?, ?, ?, ?, 1)",
+        (b"x" * 26, b"iv", b"salt", "2025-01-01T00:00:00", "2025-01-01T00:00:00"),
+    )
+    conn.commit()
+    conn.close()
+
+    with VaultDB(str(db_path)) as db:
+        record = db.get_secret("app", "dev", "cert.pem")
+
+    assert record.size == 10
+    assert record.kind == "file"
+    assert record.filename == "cert.pem"
+    assert record.mime is not None
+    assert record.fingerprint is None
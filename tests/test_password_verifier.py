@@ -0,0 +1,58 @@
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.exceptions import InvalidPasswordError
+from vault.storage.db import VaultDB
+from vault.storage.rekey import rekey_in_progress, rekey_vault
+
+
+def test_writes_under_wrong_password_are_refused(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        db.add_text_secret("app", "dev", "A", "one", "masterpass")
+        assert db.get_meta("verifier") is not None
+
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        with pytest.raises(InvalidPasswordError):
+            db.add_text_secret("app", "dev", "B", "two", "mastrepass")
+        assert db.get_secret("app", "dev", "B") is None
+        db.unlock("masterpass")
+
+
+def test_legacy_vault_is_checked_against_a_secret(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        db.add_text_secret("app", "dev", "A", "one", "masterpass")
+        # Simulate a vault written before verifiers existed
+        db.conn.execute("DELETE FROM vault_meta WHERE name = 'verifier'")
+        db.conn.commit()
+
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        with pytest.raises(InvalidPasswordError):
+            db.unlock("wrongpassword")
+        assert db.get_meta("verifier") is None
+        db.unlock("masterpass")
+        assert db.get_meta("verifier") is not None
+
+
+def test_rekey_aborts_before_any_work_on_wrong_password(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        db.add_text_secret("app", "dev", "A", "one", "masterpass")
+        with pytest.raises(InvalidPasswordError):
+            rekey_vault(db, "wrongpassword", "newpassword", workers=1)
+        assert not rekey_in_progress(db)
+
+
+def test_cli_refuses_backup_under_wrong_password(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+
+    result = runner.invoke(cli, ["backup_encrypt"], input="wrongpass\n")
+    assert "Incorrect master password" in result.output
+    assert ".enc" not in result.output
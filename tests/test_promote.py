@@ -0,0 +1,84 @@
+import pytest
+from click.testing import CliRunner
+
+from vault import tracing
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.exceptions import StorageError
+from vault.storage.db import VaultDB
+from vault.storage.promote import promote_secrets
+from vault.storage.shards import ShardedVaultDB
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+def _value(db, environment, key):
+    record = db.get_secret("app", environment, key)
+    return None if record is None else db.decrypt_secret(record, "masterpass")
+
+
+@pytest.mark.parametrize("vault_class", [VaultDB, ShardedVaultDB])
+def test_promote_copies_ciphertext_in_one_transaction(tmp_path, vault_class):
+    with vault_class(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        for key in ("API_KEY", "API_URL", "DB_URL"):
+            db.add_text_secret("app", "dev", key, f"dev {key}", "masterpass")
+        db.add_text_secret("app", "staging", "API_URL", "staging url", "masterpass")
+        db.add_text_secret("app", "staging", "API_KEY", "x", "masterpass")
+        db.delete_secret("app", "staging", "API_KEY")
+        before = db.get_secret("app", "staging", "API_URL")
+
+        tracer = tracing.enable(str(tmp_path / "trace.jsonl"))
+        try:
+            plan = promote_secrets(db, "app", "dev", "staging", ["API_*"], dry_run=True)
+            result = promote_secrets(db, "app", "dev", "staging", ["API_*"])
+        finally:
+            tracing.disable()
+        # Nothing was decrypted or re-encrypted
+        assert "kdf.calls" not in tracer.counters
+        assert plan == result
+        assert result.added == ["API_KEY"] and result.skipped == ["API_URL"]
+        assert _value(db, "staging", "API_KEY") == b"dev API_KEY"
+        assert db.get_secret("app", "staging", "DB_URL") is None
+        tombstones = db.shard("app").conn.execute("SELECT key FROM tombstones")
+        assert tombstones.fetchall() == []
+
+        result = promote_secrets(db, "app", "dev", "staging", on_conflict="overwrite")
+        assert result.added == ["DB_URL"]
+        assert result.updated == ["API_KEY", "API_URL"]
+        promoted = db.get_secret("app", "staging", "API_URL")
+        assert _value(db, "staging", "API_URL") == b"dev API_URL"
+        assert promoted.created_at == before.created_at
+        assert promoted.updated_at > before.updated_at
+
+        # Staging's copies are now newer than dev's
+        result = promote_secrets(db, "app", "dev", "staging", on_conflict="newer")
+        assert result.skipped == ["API_KEY", "API_URL", "DB_URL"]
+
+
+def test_promote_rejects_bad_arguments(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        with pytest.raises(StorageError):
+            promote_secrets(db, "app", "dev", "dev")
+        with pytest.raises(StorageError):
+            promote_secrets(db, "app", "dev", "prod", on_conflict="merge")
+
+
+def test_cli_promote(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli, ["add", "myapp", "dev", "API_KEY"], input="masterpass\nsecret\nsecret\n"
+    )
+
+    result = runner.invoke(cli, ["promote", "myapp", "dev", "prod", "--dry-run"])
+    assert "+ API_KEY" in result.output
+    assert "Would promote 1 new, 0 updated, 0 skipped" in result.output
+    result = runner.invoke(cli, ["promote", "myapp", "dev", "prod"])
+    assert "Promoted 1 new" in result.output
+
+    result = runner.invoke(
+        cli, ["get", "myapp", "prod", "API_KEY", "--show"], input="masterpass\n"
+    )
+    assert "API_KEY = secret" in result.output
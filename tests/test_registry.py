@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.storage.registry import MaterializedRegistry, sweep_expired, wipe_file
+
+
+def test_wipe_file_zeroes_then_deletes(tmp_path, monkeypatch):
+    target = tmp_path / "secret.bin"
+    target.write_bytes(b"s" * (3 * 1024 * 1024 + 5))
+    seen = {}
+    real_unlink = type(target).unlink
+
+    def spy_unlink(self, *args, **kwargs):
+        seen["data"] = self.read_bytes()
+        return real_unlink(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(target), "unlink", spy_unlink)
+    wipe_file(target)
+
+    assert not target.exists()
+    assert seen["data"] == bytes(3 * 1024 * 1024 + 5)
+    # Missing files are not an error
+    wipe_file(target)
+
+
+def test_wipe_file_removes_symlinks_without_touching_their_target(tmp_path):
+    target = tmp_path / "precious.txt"
+    target.write_bytes(b"keep me")
+    link = tmp_path / "workspace.pem"
+    link.symlink_to(target)
+
+    wipe_file(link)
+
+    assert not link.is_symlink()
+    assert target.read_bytes() == b"keep me"
+
+
+def test_registry_sweeps_expired_or_all(tmp_path):
+    files = []
+    for name in ("old", "fresh", "forever"):
+        path = tmp_path / name
+        path.write_bytes(b"plaintext")
+        files.append(path)
+
+    registry_path = tmp_path / "materialized.db"
+    with MaterializedRegistry(registry_path) as registry:
+        registry.register(files[0], "app/dev/old", ttl=0)
+        registry.register(files[1], "app/dev/fresh", ttl=3600)
+        registry.register(files[2], "app/dev/forever")
+        later = datetime.now(timezone.utc) + timedelta(hours=2)
+        assert sorted(registry.expired(later)) == sorted(
+            str(path.resolve()) for path in files[:2]
+        )
+
+    assert sweep_expired(registry_path).wiped == [str(files[0].resolve())]
+    assert not files[0].exists()
+    assert files[1].exists()
+
+    with MaterializedRegistry(registry_path) as registry:
+        result = registry.sweep(everything=True, workers=2)
+        assert len(result.wiped) == 2
+        assert registry.entries() == []
+    assert not files[1].exists() and not files[2].exists()
+
+
+def test_sweep_without_registry_is_a_noop(tmp_path):
+    assert sweep_expired(tmp_path / "missing.db").wiped == []
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_cli_tracks_and_cleans_materialized_files(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    jks_file = tmp_path / "test.jks"
+    jks_file.write_bytes(b"fake-jks-content")
+    runner.invoke(
+        cli,
+        ["add_file", "myapp", "dev", str(jks_file)],
+        input="masterpass\nmasterpass\n",
+    )
+
+    # Temp files expire immediately; auto-sweep wipes them on the next run
+    runner.invoke(cli, ["config", "set", "temp_ttl", "0"])
+    runner.invoke(cli, ["config", "set", "auto_sweep", "true"])
+    result = runner.invoke(
+        cli,
+        ["get_file", "myapp", "dev", "test.jks", "--output-dir", str(tmp_path)],
+        input="masterpass\n",
+    )
+    temp_path = result.output.strip().rsplit(" ", 1)[-1]
+    assert (tmp_path / temp_path).exists()
+    runner.invoke(cli, ["health"])
+    assert not (tmp_path / temp_path).exists()
+
+    workspace_dir = tmp_path / "workspace"
+    runner.invoke(cli, ["config", "set", "workspace_dir", str(workspace_dir)])
+    runner.invoke(
+        cli, ["workspace", "import", "myapp", "dev", "test.jks"], input="masterpass\n"
+    )
+    assert (workspace_dir / "test.jks").exists()
+
+    result = runner.invoke(cli, ["workspace", "clean"])
+    assert "Wiped 0 file(s)." in result.output
+    result = runner.invoke(cli, ["workspace", "clean", "--all"])
+    assert "Wiped 1 file(s)." in result.output
+    assert not (workspace_dir / "test.jks").exists()
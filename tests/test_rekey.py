@@ -0,0 +1,106 @@
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.crypto.aes import decrypt
+from vault.crypto.kdf import KdfParams, derive_key
+from vault.exceptions import CryptoError
+from vault.storage.db import VaultDB
+from vault.storage.rekey import rekey_in_progress, rekey_vault
+
+
+def _reveal(db, key, password):
+    record = db.get_secret("app", "dev", key)
+    return decrypt(derive_key(password, record.salt), record.iv, record.value)
+
+
+def test_rekey_resumes_after_interruption(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        for key in ("A", "B", "C"):
+            db.add_text_secret("app", "dev", key, f"value-{key}", "oldpassword")
+
+        def interrupt(progress):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            rekey_vault(
+                db,
+                "oldpassword",
+                "newpassword",
+                workers=1,
+                batch_size=1,
+                progress=interrupt,
+            )
+        # One batch is checkpointed but the vault still uses the old password
+        assert rekey_in_progress(db)
+        staged = db.conn.execute("SELECT COUNT(*) FROM rekey_staging").fetchone()[0]
+        assert staged == 1
+        assert _reveal(db, "A", "oldpassword") == b"value-A"
+
+        assert rekey_vault(db, "oldpassword", "newpassword", workers=2) == 2
+        assert not rekey_in_progress(db)
+        for key in ("A", "B", "C"):
+            assert _reveal(db, key, "newpassword") == f"value-{key}".encode()
+        with pytest.raises(CryptoError):
+            _reveal(db, "A", "oldpassword")
+        # Fingerprints are rekeyed along with the vault salt
+        record = db.get_secret("app", "dev", "B")
+        assert record.fingerprint == db.fingerprint("newpassword", b"value-B")
+
+
+def test_resume_keeps_the_kdf_the_rotation_started_with(tmp_path):
+    path = str(tmp_path / "vault.db")
+    first = KdfParams.decode("pbkdf2-sha256$i=1000")
+    with VaultDB(path, kdf=first) as db:
+        for key in ("A", "B"):
+            db.add_text_secret("app", "dev", key, f"value-{key}", "oldpassword")
+
+        def interrupt(progress):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            rekey_vault(
+                db,
+                "oldpassword",
+                "newpassword",
+                workers=1,
+                batch_size=1,
+                progress=interrupt,
+            )
+
+    # The KDF configured on this host changed before the rotation was resumed
+    with VaultDB(path, kdf=KdfParams.decode("pbkdf2-sha256$i=2000")) as db:
+        rekey_vault(db, "oldpassword", "newpassword", workers=1)
+        db.unlock("newpassword")
+        for key in ("A", "B"):
+            record = db.get_secret("app", "dev", key)
+            assert record.kdf == first.encode()
+            assert db.decrypt_secret(record, "newpassword") == f"value-{key}".encode()
+            assert record.fingerprint == db.fingerprint(
+                "newpassword", f"value-{key}".encode()
+            )
+
+
+def test_cli_rekey(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+
+    result = runner.invoke(
+        cli,
+        ["rekey", "--workers", "1"],
+        input="masterpass\nnewmasterpass\nnewmasterpass\n",
+    )
+    assert result.exit_code == 0
+    assert "Rekeyed 1 secrets" in result.output
+
+    result = runner.invoke(
+        cli, ["get", "myapp", "dev", "API_KEY", "--show"], input="newmasterpass\n"
+    )
+    assert "secret123" in result.output
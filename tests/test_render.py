@@ -0,0 +1,105 @@
+import os
+import stat
+
+import pytest
+from click.testing import CliRunner
+
+from vault import tracing
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.exceptions import StorageError
+from vault.storage.db import VaultDB
+from vault.storage.render import find_references, render_templates
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+def test_find_references_dedupes_in_order():
+    text = (
+        "a: {{ vault:app/dev/A }}\n"
+        "b: {{vault:app/prod/db.password}}\n"
+        "again: {{  vault:app/dev/A  }}\n"
+        "not ours: {{ other }}\n"
+    )
+    assert find_references(text) == [
+        ("app", "dev", "A"),
+        ("app", "prod", "db.password"),
+    ]
+
+
+def test_render_resolves_all_templates_in_one_pass(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        for key in ("USER", "PASSWORD", "TOKEN"):
+            db.add_text_secret("app", "dev", key, f"{key.lower()}-value", "masterpass")
+        db.add_text_secret("web", "prod", "TOKEN", "npm-token", "masterpass")
+        yml = tmp_path / "application.yml.tmpl"
+        yml.write_text(
+            "user: {{ vault:app/dev/USER }}\npass: {{ vault:app/dev/PASSWORD }}\n"
+        )
+        npmrc = tmp_path / ".npmrc.tmpl"
+        npmrc.write_text("//registry/:_authToken={{ vault:web/prod/TOKEN }}\n")
+        out = tmp_path / "out"
+
+        tracer = tracing.enable(str(tmp_path / "trace.jsonl"))
+        try:
+            result = render_templates(
+                db,
+                "masterpass",
+                [(yml, out / "application.yml"), (npmrc, "-")],
+                workers=2,
+            )
+        finally:
+            tracing.disable()
+        assert result.secrets == 3
+        # One KDF per salt; app/dev/TOKEN is never decrypted
+        assert tracer.counters["kdf.calls"] == 3
+        assert (out / "application.yml").read_text() == (
+            "user: user-value\npass: password-value\n"
+        )
+        assert stat.S_IMODE(os.stat(out / "application.yml").st_mode) == 0o600
+        assert result.output == ["//registry/:_authToken=npm-token\n"]
+
+
+def test_missing_reference_writes_nothing(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        db.add_text_secret("app", "dev", "A", "a", "masterpass")
+        good = tmp_path / "good.tmpl"
+        good.write_text("{{ vault:app/dev/A }}")
+        bad = tmp_path / "bad.tmpl"
+        bad.write_text("{{ vault:app/dev/B }} {{ vault:app/qa/A }}")
+        with pytest.raises(StorageError, match="app/dev/B, app/qa/A"):
+            render_templates(
+                db,
+                "masterpass",
+                [(good, tmp_path / "good"), (bad, tmp_path / "bad")],
+            )
+        assert not (tmp_path / "good").exists()
+
+
+def test_cli_render_many_templates(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli, ["add", "myapp", "dev", "API_KEY"], input="masterpass\nsecret\nsecret\n"
+    )
+    first = tmp_path / "a.env.tmpl"
+    first.write_text("API_KEY={{ vault:myapp/dev/API_KEY }}\n")
+    second = tmp_path / "b.tpl"
+    second.write_text("key: {{ vault:myapp/dev/API_KEY }}\n")
+
+    result = runner.invoke(
+        cli,
+        ["render", str(first), str(second), "-o", str(tmp_path / "build")],
+        input="masterpass\n",
+    )
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "build" / "a.env").read_text() == "API_KEY=secret\n"
+    assert (tmp_path / "build" / "b").read_text() == "key: secret\n"
+
+    result = runner.invoke(cli, ["render", str(first)], input="masterpass\n")
+    assert "API_KEY=secret" in result.output
+
+    result = runner.invoke(cli, ["render", str(first), str(second)])
+    assert result.exit_code != 0 and "-o DIRECTORY" in result.output
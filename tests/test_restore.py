@@ -0,0 +1,141 @@
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.exceptions import InvalidPasswordError
+from vault.storage.backup import backup_vault, encrypt_backup
+from vault.storage.db import VaultDB
+from vault.storage.restore import restore_backup
+from vault.storage.shards import ShardedVaultDB
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+def _value(db, project, environment, key):
+    record = db.get_secret(project, environment, key)
+    return None if record is None else db.decrypt_secret(record, "masterpass")
+
+
+def _populate(db):
+    for environment in ("dev", "prod"):
+        for key in ("API_KEY", "DB_URL"):
+            db.add_text_secret(
+                "myapp", environment, key, f"{environment}-{key}", "masterpass"
+            )
+    db.add_text_secret("other", "prod", "TOKEN", "token", "masterpass")
+
+
+def test_restore_one_environment_keeps_later_writes(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        _populate(db)
+        (backup,) = backup_vault(db, str(tmp_path / "backups"))
+        fingerprint = db.get_secret("myapp", "prod", "API_KEY").fingerprint
+
+        # Written after the backup, and an environment lost by accident
+        db.add_text_secret("myapp", "dev", "API_KEY", "changed", "masterpass")
+        db.add_text_secret("other", "prod", "NEW", "new", "masterpass")
+        db.conn.execute(
+            "DELETE FROM secrets WHERE project = 'myapp' AND environment = 'prod'"
+        )
+        db.conn.commit()
+
+        result = restore_backup(
+            db, backup, "masterpass", project="myapp", environment="prod"
+        )
+        assert (result.matched, result.restored) == (2, 2)
+        assert _value(db, "myapp", "prod", "API_KEY") == b"prod-API_KEY"
+        # Same vault key: fingerprints come back as they were
+        assert db.get_secret("myapp", "prod", "API_KEY").fingerprint == fingerprint
+        # Later writes survive
+        assert _value(db, "myapp", "dev", "API_KEY") == b"changed"
+
+        # `newer` never rolls back the newer dev value...
+        result = restore_backup(db, backup, "masterpass", project="myapp")
+        assert result.restored == 0
+        assert _value(db, "myapp", "dev", "API_KEY") == b"changed"
+        # ...`missing` only fills gaps, `overwrite` rolls back
+        db.conn.execute("DELETE FROM secrets WHERE project = 'other' AND key = 'TOKEN'")
+        db.conn.commit()
+        result = restore_backup(db, backup, "masterpass", strategy="missing")
+        assert result.restored == 1
+        assert _value(db, "other", "prod", "TOKEN") == b"token"
+        result = restore_backup(
+            db, backup, "masterpass", key="API_KEY", strategy="overwrite"
+        )
+        assert (result.matched, result.restored) == (2, 2)
+        assert _value(db, "myapp", "dev", "API_KEY") == b"dev-API_KEY"
+        assert _value(db, "other", "prod", "NEW") == b"new"
+        # The backup was detached again
+        assert len(db.conn.execute("PRAGMA database_list").fetchall()) == 1
+
+
+def test_restore_from_encrypted_backup_in_memory(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        _populate(db)
+        (backup,) = backup_vault(db, str(tmp_path / "backups"))
+        encrypted = encrypt_backup(backup, "masterpass")
+        backup.unlink()
+        db.conn.execute("DELETE FROM secrets WHERE project = 'myapp'")
+        db.conn.commit()
+
+        with pytest.raises(InvalidPasswordError):
+            restore_backup(db, encrypted, "wrongpass1")
+        result = restore_backup(db, encrypted, "masterpass", project="myapp")
+        assert result.restored == 4
+        assert _value(db, "myapp", "dev", "DB_URL") == b"dev-DB_URL"
+    # No decrypted copy was left next to the backup
+    assert [p.name for p in encrypted.parent.iterdir()] == [encrypted.name]
+
+
+def test_restore_rejects_rows_under_another_password(tmp_path):
+    with VaultDB(str(tmp_path / "old.db"), kdf=FAST_KDF) as db:
+        db.add_text_secret("myapp", "dev", "API_KEY", "old", "oldpassword")
+        (backup,) = backup_vault(db, str(tmp_path / "backups"))
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        db.add_text_secret("myapp", "dev", "OTHER", "x", "masterpass")
+        with pytest.raises(InvalidPasswordError):
+            restore_backup(db, backup, "masterpass")
+        assert _value(db, "myapp", "dev", "API_KEY") is None
+
+
+def test_restore_sharded_backup(tmp_path):
+    with ShardedVaultDB(str(tmp_path / "catalog.db"), kdf=FAST_KDF) as db:
+        _populate(db)
+        backup_dir = backup_vault(db, str(tmp_path / "backups"))[0].parent
+        db.shard("myapp").conn.execute("DELETE FROM secrets")
+        db.shard("myapp").conn.commit()
+        result = restore_backup(db, backup_dir, "masterpass", environment="prod")
+        assert (result.matched, result.restored) == (3, 2)
+        assert _value(db, "myapp", "prod", "DB_URL") == b"prod-DB_URL"
+        assert _value(db, "myapp", "dev", "DB_URL") is None
+
+
+def test_cli_restore(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+    result = runner.invoke(cli, ["backup_encrypt"], input="masterpass\n")
+    encrypted = result.output.split("created at ")[-1].strip()
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nchanged\nchanged\n",
+    )
+
+    result = runner.invoke(
+        cli,
+        ["restore", encrypted, "--key", "API_KEY", "--strategy", "overwrite"],
+        input="masterpass\n",
+    )
+    assert "Restored 1 of 1 matching secret(s)" in result.output
+    result = runner.invoke(
+        cli, ["get", "myapp", "dev", "API_KEY", "--show"], input="masterpass\n"
+    )
+    assert "secret123" in result.output
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.exceptions import StorageError
+from vault.storage.db import VaultDB
+from vault.storage.models import SecretRecord
+
+
+def _add(db, project, environment, key):
+    db.add_secret(
+        SecretRecord(
+            project=project,
+            environment=environment,
+            key=key,
+            value=b"ciphertext",
+            iv=b"iv",
+            salt=b"salt",
+            created_at=datetime.now(timezone.utc),
+            updated_at=datetime.now(timezone.utc),
+        )
+    )
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = VaultDB(str(tmp_path / "vault.db"))
+    _add(db, "shop", "prod", "STRIPE_KEY")
+    _add(db, "shop", "dev", "STRIPE_KEY")
+    _add(db, "blog", "prod", "STRIPE_WEBHOOK")
+    _add(db, "blog", "prod", "DB_PASSWORD")
+    yield db
+    db.close()
+
+
+def _keys(matches):
+    return [f"{m.project}/{m.environment}/{m.key}" for m in matches]
+
+
+def test_search_modes(db):
+    assert _keys(db.search_secrets("STRIPE_KEY", fields=("key",))) == [
+        "shop/dev/STRIPE_KEY",
+        "shop/prod/STRIPE_KEY",
+    ]
+    assert len(_keys(db.search_secrets("STRIPE", mode="prefix"))) == 3
+    assert _keys(db.search_secrets(r"PASS|HOOK$", mode="regex")) == [
+        "blog/prod/DB_PASSWORD",
+        "blog/prod/STRIPE_WEBHOOK",
+    ]
+    assert _keys(db.search_secrets("*", project="shop", environment="dev")) == [
+        "shop/dev/STRIPE_KEY"
+    ]
+
+
+def test_prefix_search_at_the_end_of_unicode(db):
+    top = chr(0x10FFFF)
+    _add(db, "shop", "prod", f"Z{top}{top}-1")
+    _add(db, "shop", "prod", f"{top}-2")
+    _add(db, "shop", "prod", "\ud7ffA")
+    assert _keys(db.search_secrets(f"Z{top}", mode="prefix")) == [
+        f"shop/prod/Z{top}{top}-1"
+    ]
+    assert _keys(db.search_secrets(top, mode="prefix")) == [f"shop/prod/{top}-2"]
+    assert _keys(db.search_secrets("\ud7ff", mode="prefix")) == ["shop/prod/\ud7ffA"]
+    assert len(_keys(db.search_secrets("", mode="prefix"))) == 7
+
+
+def test_search_uses_key_index(db):
+    plan = db.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT key FROM secrets WHERE key >= ? AND key < ?",
+        ("STRIPE", "STRIPF"),
+    ).fetchall()
+    assert any("idx_secrets_key" in row[-1] for row in plan)
+
+
+def test_search_rejects_bad_input(db):
+    with pytest.raises(StorageError):
+        db.search_secrets("(", mode="regex")
+    with pytest.raises(StorageError):
+        db.search_secrets("x", mode="fuzzy")
+
+
+def test_cli_search(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "STRIPE_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+
+    result = runner.invoke(cli, ["search", "STRIPE*"])
+    assert result.exit_code == 0
+    assert "myapp/dev/STRIPE_KEY (Text)" in result.output
+
+    result = runner.invoke(cli, ["search", "--mode", "prefix", "NOPE"])
+    assert "No secrets found." in result.output
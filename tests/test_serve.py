@@ -0,0 +1,194 @@
+import http.client
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.exceptions import InvalidPasswordError, StorageError
+from vault.server import SecretService, UnixHTTPConnection, make_server
+from vault.storage.db import VaultDB
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+@pytest.fixture
+def vault(tmp_path):
+    db = VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF, check_same_thread=False)
+    db.add_text_secret("myapp", "prod", "API_KEY", "secret123", "masterpass")
+    db.add_text_secret("myapp", "prod", "DB_URL", "postgres://db", "masterpass")
+    payload = tmp_path / "cert.pem"
+    payload.write_bytes(b"\x00binary\xff")
+    db.add_file_secret("myapp", "prod", "cert.pem", str(payload), "masterpass")
+    yield db
+    db.close()
+
+
+def _start(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _request(conn, method, path, body=None, headers=None):
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    data = response.read()
+    return response, json.loads(data) if data else None
+
+
+def test_unix_socket_get_batch_and_etags(vault, tmp_path):
+    service = SecretService(vault, "masterpass", cache_ttl=60)
+    socket_path = tmp_path / "vault.sock"
+    server = _start(make_server(service, socket_path=socket_path))
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        conn = UnixHTTPConnection(socket_path, timeout=5)
+
+        response, body = _request(conn, "GET", "/v1/secrets/myapp/prod/API_KEY")
+        assert response.status == 200
+        assert body["value"] == "secret123"
+        etag = response.getheader("ETag")
+
+        # Same keep-alive connection; the client's ETag is still current
+        response, body = _request(
+            conn,
+            "GET",
+            "/v1/secrets/myapp/prod/API_KEY",
+            headers={"If-None-Match": etag},
+        )
+        assert response.status == 304 and body is None
+
+        response, body = _request(conn, "GET", "/v1/secrets/myapp/prod/cert.pem")
+        assert body["value_b64"] == "AGJpbmFyef8="
+
+        response, body = _request(conn, "GET", "/v1/secrets/myapp/prod/NOPE")
+        assert response.status == 404
+
+        request = {
+            "secrets": [
+                {"project": "myapp", "environment": "prod", "key": "API_KEY"},
+                {"project": "myapp", "environment": "prod", "key": "DB_URL"},
+                {"project": "myapp", "environment": "dev", "key": "API_KEY"},
+            ]
+        }
+        response, body = _request(conn, "POST", "/v1/batch", json.dumps(request))
+        assert [s["value"] for s in body["secrets"]] == ["secret123", "postgres://db"]
+        assert body["missing"] == [
+            {"project": "myapp", "environment": "dev", "key": "API_KEY"}
+        ]
+        batch_etag = response.getheader("ETag")
+        response, _ = _request(
+            conn,
+            "POST",
+            "/v1/batch",
+            json.dumps(request),
+            headers={"If-None-Match": batch_etag},
+        )
+        assert response.status == 304
+
+        response, body = _request(conn, "GET", "/v1/secrets/myapp/prod")
+        assert [e["key"] for e in body["entries"]] == ["API_KEY", "DB_URL", "cert.pem"]
+        response, body = _request(conn, "GET", "/v1/projects")
+        assert body == {"projects": ["myapp"]}
+
+        response, body = _request(conn, "POST", "/v1/batch", b"not json")
+        assert response.status == 400
+
+        _, health = _request(conn, "GET", "/v1/health")
+        assert health["status"] == "ok"
+        # API_KEY was decrypted once; later reads came from the cache
+        assert health["cache_hits"] >= 2 and health["not_modified"] == 2
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unix_socket_of_a_running_server_is_not_taken_over(vault, tmp_path):
+    service = SecretService(vault, "masterpass")
+    socket_path = tmp_path / "vault.sock"
+    server = _start(make_server(service, socket_path=socket_path))
+    try:
+        with pytest.raises(StorageError, match="already listening"):
+            make_server(service, socket_path=socket_path)
+        conn = UnixHTTPConnection(socket_path, timeout=5)
+        response, _ = _request(conn, "GET", "/v1/health")
+        assert response.status == 200
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Left behind by a server that is gone: replaced
+    assert socket_path.exists()
+    server = make_server(service, socket_path=socket_path)
+    server.server_close()
+
+
+def test_cache_ttl_and_updates(vault):
+    service = SecretService(vault, "masterpass", cache_ttl=0)
+    etag, payload = service.lookup("myapp", "prod", "API_KEY")
+    vault.add_text_secret("myapp", "prod", "API_KEY", "rotated", "masterpass")
+    new_etag, payload = service.lookup("myapp", "prod", "API_KEY", {etag})
+    # Without caching the rotation is visible at once, with a new ETag
+    assert new_etag != etag and payload["value"] == "rotated"
+    assert service.stats.cache_hits == 0
+
+    cached = SecretService(vault, "masterpass", cache_ttl=60)
+    cached.lookup("myapp", "prod", "API_KEY")
+    vault.add_text_secret("myapp", "prod", "API_KEY", "again", "masterpass")
+    assert cached.lookup("myapp", "prod", "API_KEY")[1]["value"] == "rotated"
+    cached.invalidate()
+    assert cached.lookup("myapp", "prod", "API_KEY")[1]["value"] == "again"
+
+
+def test_tcp_requires_token_and_password_is_checked(vault):
+    with pytest.raises(InvalidPasswordError):
+        SecretService(vault, "wrongpass")
+    service = SecretService(vault, "masterpass")
+    with pytest.raises(StorageError):
+        make_server(service, port=0)
+
+    server = _start(make_server(service, port=0, token="s3cret-token"))
+    try:
+        host, port = server.server_address[:2]
+        assert host == "127.0.0.1"
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        response, _ = _request(conn, "GET", "/v1/secrets/myapp/prod/API_KEY")
+        assert response.status == 401
+        response, body = _request(
+            conn,
+            "GET",
+            "/v1/secrets/myapp/prod/API_KEY",
+            headers={"Authorization": "Bearer s3cret-token"},
+        )
+        assert response.status == 200 and body["value"] == "secret123"
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_cli_serve_reports_a_port_in_use(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli, ["add", "myapp", "dev", "API_KEY"], input="masterpass\nsecret\nsecret\n"
+    )
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+        result = runner.invoke(
+            cli, ["serve", "--port", str(port)], input="masterpass\n"
+        )
+    assert result.exception is None
+    assert "[ERROR] Cannot listen" in result.output
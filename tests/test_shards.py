@@ -0,0 +1,148 @@
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.exceptions import InvalidPasswordError, StorageError
+from vault.storage.backup import backup_vault
+from vault.storage.db import VaultDB
+from vault.storage.maintenance import collect_stats
+from vault.storage.rekey import rekey_vault
+from vault.storage.shards import ATTACH_BATCH, ShardedVaultDB, split_vault
+from vault.storage.sync import sync_vaults
+
+
+def test_projects_live_in_separate_files(tmp_path):
+    with ShardedVaultDB(str(tmp_path / "catalog.db")) as db:
+        db.add_text_secret("alpha", "dev", "API_KEY", "a-secret", "masterpass")
+        db.add_text_secret("beta", "prod", "API_KEY", "b-secret", "masterpass")
+        files = dict(db.shards())
+        assert set(files) == {"alpha", "beta"}
+        assert all(path.is_file() for path in files.values())
+        assert files["alpha"] != files["beta"]
+        # The catalog itself holds no secrets
+        assert db.conn.execute("SELECT COUNT(*) FROM secrets").fetchone()[0] == 0
+
+    with ShardedVaultDB(str(tmp_path / "catalog.db")) as db:
+        assert list(db.list_projects()) == ["alpha", "beta"]
+        assert list(db.list_environments("beta")) == ["prod"]
+        record = db.get_secret("alpha", "dev", "API_KEY")
+        assert db.decrypt_secret(record, "masterpass") == b"a-secret"
+        assert db.get_secret("gamma", "dev", "API_KEY") is None
+        assert list(db.list_entries("gamma", "dev")) == []
+
+
+def test_shards_share_one_verifier(tmp_path):
+    with ShardedVaultDB(str(tmp_path / "catalog.db")) as db:
+        db.add_text_secret("alpha", "dev", "KEY", "value", "masterpass")
+        with pytest.raises(InvalidPasswordError):
+            db.add_text_secret("beta", "dev", "KEY", "value", "wrongpass")
+        assert list(db.list_projects()) == ["alpha"]
+
+
+def test_search_across_attached_shards(tmp_path):
+    projects = [f"project-{i:02d}" for i in range(ATTACH_BATCH + 3)]
+    with ShardedVaultDB(str(tmp_path / "catalog.db")) as db:
+        for project in projects:
+            db.add_text_secret(project, "dev", "DB_URL", "x", "masterpass")
+            db.add_text_secret(project, "dev", "OTHER", "y", "masterpass")
+        hits = list(db.search_secrets("DB_*"))
+        assert [hit.project for hit in hits] == projects
+        assert {hit.key for hit in hits} == {"DB_URL"}
+        hits = list(db.search_secrets("^OTH", mode="regex", project="project-03"))
+        assert [(hit.project, hit.key) for hit in hits] == [("project-03", "OTHER")]
+        # Every shard was detached again
+        assert len(db.conn.execute("PRAGMA database_list").fetchall()) == 1
+
+
+def test_split_vault_keeps_secrets_decryptable(tmp_path):
+    source = tmp_path / "vault.db"
+    payload = tmp_path / "cert.pem"
+    payload.write_bytes(b"-----BEGIN CERT-----")
+    with VaultDB(str(source)) as db:
+        db.add_text_secret("alpha", "dev", "API_KEY", "a-secret", "masterpass")
+        db.add_file_secret("beta", "prod", "cert", str(payload), "masterpass")
+
+    with split_vault(str(source), str(tmp_path / "sharded" / "catalog.db")) as db:
+        assert list(db.list_projects()) == ["alpha", "beta"]
+        record = db.get_secret("alpha", "dev", "API_KEY")
+        assert db.decrypt_secret(record, "masterpass") == b"a-secret"
+        data = db.decrypt_file_secret("beta", "prod", "cert", "masterpass")
+        assert data == b"-----BEGIN CERT-----"
+        with pytest.raises(InvalidPasswordError):
+            db.unlock("wrongpass")
+
+    with pytest.raises(StorageError):
+        split_vault(str(source), str(tmp_path / "sharded" / "catalog.db"))
+
+
+def test_split_vault_keeps_unsynced_deletes(tmp_path):
+    source, peer = tmp_path / "vault.db", tmp_path / "peer.db"
+    with VaultDB(str(source)) as db, VaultDB(str(peer)) as other:
+        db.add_text_secret("alpha", "dev", "KEEP", "k", "masterpass")
+        db.add_text_secret("alpha", "dev", "OLD", "o", "masterpass")
+        db.add_text_secret("gamma", "dev", "GONE", "g", "masterpass")
+        sync_vaults(db, other, "masterpass")
+        assert db.delete_secret("alpha", "dev", "OLD")
+        assert db.delete_secret("gamma", "dev", "GONE")
+
+    with split_vault(str(source), str(tmp_path / "sharded" / "catalog.db")) as db:
+        assert db.shard("gamma").conn.execute(
+            "SELECT environment, key FROM tombstones"
+        ).fetchall() == [("dev", "GONE")]
+        with VaultDB(str(peer)) as other:
+            result = sync_vaults(db, other, "masterpass")
+            assert sorted(result.pushed) == ["alpha/dev/OLD", "gamma/dev/GONE"]
+            assert other.get_secret("alpha", "dev", "OLD") is None
+            assert other.get_secret("gamma", "dev", "GONE") is None
+            assert other.get_secret("alpha", "dev", "KEEP") is not None
+
+
+def test_backup_stats_and_rekey(tmp_path):
+    with ShardedVaultDB(str(tmp_path / "catalog.db")) as db:
+        db.add_text_secret("alpha", "dev", "KEY", "a", "masterpass")
+        db.add_text_secret("beta", "dev", "KEY", "b", "masterpass")
+
+        written = backup_vault(db, str(tmp_path / "backups"), projects=["beta"])
+        assert [path.parent.name for path in written] == ["shards"]
+        assert len(written) == 1
+        written = backup_vault(db, str(tmp_path / "backups"))
+        assert len(written) == 3
+        with pytest.raises(StorageError):
+            backup_vault(db, str(tmp_path / "backups"), projects=["gamma"])
+
+        stats = collect_stats(db)
+        assert stats.rows == 2
+        assert [scope.project for scope in stats.scopes] == ["alpha", "beta"]
+
+        with pytest.raises(StorageError):
+            rekey_vault(db, "masterpass", "newpass")
+
+
+def test_cli_shard_split_and_list(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+
+    result = runner.invoke(cli, ["shard", "list"])
+    assert "not sharded" in result.output
+
+    result = runner.invoke(cli, ["shard", "split"])
+    assert result.exit_code == 0
+    assert "1 shard(s)" in result.output
+
+    result = runner.invoke(cli, ["shard", "list"])
+    assert "- myapp: myapp-" in result.output
+
+    result = runner.invoke(
+        cli, ["get", "myapp", "dev", "API_KEY", "--show"], input="masterpass\n"
+    )
+    assert "secret123" in result.output
+
+    result = runner.invoke(cli, ["shard", "split"])
+    assert "already sharded" in result.output
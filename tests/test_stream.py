@@ -0,0 +1,94 @@
+import io
+import os
+
+import pytest
+
+from vault.crypto.aes import encrypt
+from vault.crypto.kdf import derive_key, generate_salt
+from vault.crypto.stream import ChunkReader, ChunkWriter
+from vault.exceptions import CryptoError
+from vault.storage.backup import (
+    ENC_MAGIC,
+    decrypt_backup,
+    decrypt_backup_bytes,
+    encrypt_backup,
+)
+
+KEY = bytes(range(32))
+CHUNK = 1000
+
+
+def _seal(data: bytes, workers: int, pieces: int = 7) -> bytes:
+    out = io.BytesIO()
+    with ChunkWriter(out, KEY, b"hdr", CHUNK, workers) as writer:
+        step = max(1, len(data) // pieces)
+        for i in range(0, len(data), step):
+            writer.write(data[i : i + step])
+    return out.getvalue()
+
+
+def _open(sealed: bytes, workers: int) -> bytes:
+    with ChunkReader(io.BytesIO(sealed), KEY, b"hdr", CHUNK, workers) as reader:
+        data = reader.read()
+        assert reader.at_end()
+    return data
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK, 3 * CHUNK, 10 * CHUNK + 17])
+def test_parallel_and_serial_streams_interoperate(size):
+    data = os.urandom(size)
+    for writer_workers, reader_workers in ((4, 1), (1, 4), (3, 3)):
+        sealed = _seal(data, writer_workers)
+        assert _open(sealed, reader_workers) == data
+
+
+def test_parallel_reader_detects_tampering_and_truncation():
+    sealed = _seal(os.urandom(20 * CHUNK), workers=4)
+    frame = 4 + 12 + CHUNK + 16
+    # Swap two chunks: both authenticate, but not at each other's index
+    swapped = sealed[frame : 2 * frame] + sealed[:frame] + sealed[2 * frame :]
+    # Drop the final chunk: the last remaining one is not marked final
+    truncated = sealed[: len(sealed) - (4 + 12 + 16)]
+    flipped = bytearray(sealed)
+    flipped[5 * frame + 100] ^= 1
+    for bad in (swapped, truncated, bytes(flipped)):
+        with pytest.raises(CryptoError):
+            _open(bad, workers=4)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("size", [0, 3 * CHUNK, 3 * CHUNK + 17])
+def test_reader_rejects_data_after_the_final_chunk(workers, size):
+    sealed = _seal(os.urandom(size), workers=1)
+    for trailer in (b"\0", os.urandom(700), sealed):
+        with pytest.raises(CryptoError, match="after the final chunk"):
+            _open(sealed + trailer, workers)
+
+
+def test_encrypted_backup_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr("vault.storage.backup.CHUNK_SIZE", 4096)
+    backup = tmp_path / "vault_backup.db"
+    payload = os.urandom(50_000)
+    backup.write_bytes(payload)
+
+    encrypted = encrypt_backup(backup, "masterpass", workers=4)
+    assert encrypted.read_bytes().startswith(ENC_MAGIC)
+    assert decrypt_backup_bytes(encrypted, "masterpass", workers=3) == payload
+    with pytest.raises(CryptoError):
+        decrypt_backup_bytes(encrypted, "wrongpass1")
+
+    backup.unlink()
+    assert decrypt_backup(str(encrypted), "masterpass").read_bytes() == payload
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "vault_backup.db",
+        "vault_backup.enc",
+    ]
+
+
+def test_legacy_encrypted_backup_still_decrypts(tmp_path):
+    payload = os.urandom(5000)
+    salt = generate_salt()
+    iv, ciphertext = encrypt(derive_key("masterpass", salt), payload)
+    legacy = tmp_path / "old_backup.enc"
+    legacy.write_bytes(salt + iv + ciphertext)
+    assert decrypt_backup_bytes(legacy, "masterpass") == payload
@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from click.testing import CliRunner
+
+from vault import tracing
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.exceptions import InvalidPasswordError
+from vault.storage.backup import backup_vault
+from vault.storage.bundle import export_bundle
+from vault.storage.db import VaultDB
+from vault.storage.restore import restore_backup
+from vault.storage.shards import ShardedVaultDB
+from vault.storage.sync import sync_vaults
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+def _vault(path):
+    return VaultDB(str(path), kdf=FAST_KDF)
+
+
+def _value(db, project, environment, key):
+    record = db.get_secret(project, environment, key)
+    return None if record is None else db.decrypt_secret(record, "masterpass")
+
+
+def _backdate(db, project, key, days=1):
+    # Stands in for a write made before the last sync
+    stamp = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    db.shard(project).conn.execute(
+        "UPDATE secrets SET updated_at = ? WHERE project = ? AND key = ?",
+        (stamp, project, key),
+    )
+    db.shard(project).conn.commit()
+
+
+def test_two_way_sync_only_touches_differences(tmp_path):
+    with _vault(tmp_path / "a.db") as a, _vault(tmp_path / "b.db") as b:
+        for environment in ("dev", "prod", "staging"):
+            a.add_text_secret(
+                "myapp", environment, "API_KEY", environment, "masterpass"
+            )
+        b.add_text_secret("other", "prod", "TOKEN", "token", "masterpass")
+
+        result = sync_vaults(a, b, "masterpass")
+        assert sorted(result.pushed) == [
+            "myapp/dev/API_KEY",
+            "myapp/prod/API_KEY",
+            "myapp/staging/API_KEY",
+        ]
+        assert result.pulled == ["other/prod/TOKEN"]
+        assert _value(b, "myapp", "prod", "API_KEY") == b"prod"
+        assert _value(a, "other", "prod", "TOKEN") == b"token"
+        # Different vault keys: copied rows drop their fingerprints
+        assert a.get_secret("other", "prod", "TOKEN").fingerprint is None
+        assert sync_vaults(a, b, "masterpass").in_sync
+
+        a.add_text_secret("myapp", "dev", "API_KEY", "changed", "masterpass")
+        tracer = tracing.enable(str(tmp_path / "trace.jsonl"))
+        try:
+            result = sync_vaults(a, b, "masterpass")
+        finally:
+            tracing.disable()
+        # Only the changed environment is re-hashed and compared
+        assert tracer.counters["sync.digests"] == 1
+        assert result.scanned == 1
+        assert result.pushed == ["myapp/dev/API_KEY"] and not result.conflicts
+        assert _value(b, "myapp", "dev", "API_KEY") == b"changed"
+
+
+def test_deletes_travel_as_tombstones(tmp_path):
+    with _vault(tmp_path / "a.db") as a, _vault(tmp_path / "b.db") as b:
+        a.add_text_secret("myapp", "dev", "API_KEY", "v1", "masterpass")
+        a.add_text_secret("myapp", "dev", "DB_URL", "db", "masterpass")
+        sync_vaults(a, b, "masterpass")
+
+        assert b.delete_secret("myapp", "dev", "API_KEY")
+        assert not b.delete_secret("myapp", "dev", "MISSING")
+        result = sync_vaults(a, b, "masterpass")
+        assert result.pulled == ["myapp/dev/API_KEY"]
+        assert a.get_secret("myapp", "dev", "API_KEY") is None
+        assert [e.key for e in a.list_entries("myapp", "dev")] == ["DB_URL"]
+
+        # Writing the key again revives it everywhere
+        a.add_text_secret("myapp", "dev", "API_KEY", "v2", "masterpass")
+        result = sync_vaults(a, b, "masterpass")
+        assert result.pushed == ["myapp/dev/API_KEY"]
+        assert _value(b, "myapp", "dev", "API_KEY") == b"v2"
+        assert sync_vaults(b, a, "masterpass").in_sync
+
+
+def test_restored_secrets_are_not_synced_as_deletes(tmp_path):
+    with _vault(tmp_path / "a.db") as a, _vault(tmp_path / "b.db") as b:
+        a.add_text_secret("myapp", "dev", "API_KEY", "v1", "masterpass")
+        sync_vaults(a, b, "masterpass")
+        (backup,) = backup_vault(a, str(tmp_path / "backups"))
+
+        assert a.delete_secret("myapp", "dev", "API_KEY")
+        assert restore_backup(a, backup, "masterpass").restored == 1
+        assert a.conn.execute("SELECT COUNT(*) FROM tombstones").fetchone()[0] == 0
+        # Pushed as a (re)write, not as a delete
+        assert sync_vaults(a, b, "masterpass").pushed == ["myapp/dev/API_KEY"]
+        assert _value(b, "myapp", "dev", "API_KEY") == b"v1"
+        assert sync_vaults(a, b, "masterpass").in_sync
+
+        # The peer has already seen the delete: the restore is the newer write
+        assert a.delete_secret("myapp", "dev", "API_KEY")
+        assert sync_vaults(a, b, "masterpass").pushed == ["myapp/dev/API_KEY"]
+        assert b.get_secret("myapp", "dev", "API_KEY") is None
+        assert restore_backup(a, backup, "masterpass").restored == 1
+        result = sync_vaults(a, b, "masterpass")
+        assert result.pushed == ["myapp/dev/API_KEY"] and not result.pulled
+        assert _value(a, "myapp", "dev", "API_KEY") == b"v1"
+        assert _value(b, "myapp", "dev", "API_KEY") == b"v1"
+
+
+def test_conflicts_last_writer_wins_or_reported(tmp_path):
+    with _vault(tmp_path / "a.db") as a, _vault(tmp_path / "b.db") as b:
+        a.add_text_secret("myapp", "dev", "API_KEY", "base", "masterpass")
+        a.add_text_secret("myapp", "dev", "DB_URL", "base", "masterpass")
+        sync_vaults(a, b, "masterpass")
+
+        a.add_text_secret("myapp", "dev", "API_KEY", "from-a", "masterpass")
+        b.add_text_secret("myapp", "dev", "API_KEY", "from-b", "masterpass")
+        b.add_text_secret("myapp", "dev", "DB_URL", "from-b", "masterpass")
+        result = sync_vaults(a, b, "masterpass", strategy="report")
+        assert result.conflicts == ["myapp/dev/API_KEY"]
+        # Only changed on one side: not a conflict
+        assert result.pulled == ["myapp/dev/DB_URL"]
+        assert _value(a, "myapp", "dev", "API_KEY") == b"from-a"
+        assert _value(b, "myapp", "dev", "API_KEY") == b"from-b"
+
+        result = sync_vaults(a, b, "masterpass")
+        assert result.conflicts == ["myapp/dev/API_KEY"]
+        assert result.pulled == ["myapp/dev/API_KEY"]
+        assert _value(a, "myapp", "dev", "API_KEY") == b"from-b"
+
+        # A write older than the last sync loses without being a conflict
+        a.add_text_secret("myapp", "dev", "DB_URL", "stale", "masterpass")
+        _backdate(a, "myapp", "DB_URL", days=2)
+        result = sync_vaults(a, b, "masterpass", strategy="report")
+        assert result.pulled == ["myapp/dev/DB_URL"] and not result.conflicts
+        assert _value(a, "myapp", "dev", "DB_URL") == b"from-b"
+
+
+def test_sync_sharded_with_single_and_password_check(tmp_path):
+    with (
+        ShardedVaultDB(str(tmp_path / "catalog.db"), kdf=FAST_KDF) as a,
+        _vault(tmp_path / "b.db") as b,
+    ):
+        a.add_text_secret("myapp", "dev", "API_KEY", "key", "masterpass")
+        b.add_text_secret("other", "dev", "TOKEN", "token", "masterpass")
+        result = sync_vaults(a, b, "masterpass")
+        assert (result.pulled, result.pushed) == (
+            ["other/dev/TOKEN"],
+            ["myapp/dev/API_KEY"],
+        )
+        assert [project for project, _ in a.shards()] == ["myapp", "other"]
+        assert _value(a, "other", "dev", "TOKEN") == b"token"
+
+    with _vault(tmp_path / "c.db") as c, _vault(tmp_path / "b.db") as b:
+        c.add_text_secret("x", "dev", "K", "v", "otherpass")
+        with pytest.raises(InvalidPasswordError):
+            sync_vaults(c, b, "otherpass")
+        assert b.get_secret("x", "dev", "K") is None
+
+
+def test_cli_sync_with_vault_and_bundle(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    runner.invoke(
+        cli,
+        ["add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+    with _vault(tmp_path / "laptop.db") as other:
+        other.add_text_secret("myapp", "prod", "API_KEY", "prod-key", "masterpass")
+        other.add_text_secret("tools", "ci", "TOKEN", "ci-token", "masterpass")
+        export_bundle(other, str(tmp_path / "tools.vaultbundle"), "masterpass", "tools")
+
+    result = runner.invoke(
+        cli, ["sync", str(tmp_path / "laptop.db")], input="masterpass\n"
+    )
+    assert "-> myapp/dev/API_KEY" in result.output
+    assert "<- myapp/prod/API_KEY" in result.output
+    assert "Pulled 2, pushed 1" in result.output
+    result = runner.invoke(
+        cli, ["sync", str(tmp_path / "laptop.db")], input="masterpass\n"
+    )
+    assert "Already in sync." in result.output
+
+    result = runner.invoke(
+        cli, ["sync", str(tmp_path / "tools.vaultbundle")], input="masterpass\n"
+    )
+    assert "1 already up to date" in result.output
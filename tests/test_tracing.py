@@ -0,0 +1,63 @@
+import json
+
+from click.testing import CliRunner
+
+from vault import tracing
+from vault.cli import cli
+
+
+def test_disabled_tracing_is_a_no_op():
+    assert not tracing.enabled()
+    assert tracing.span("kdf") is tracing.span("sql")
+
+    @tracing.traced("work")
+    def work(x):
+        return x * 2
+
+    assert work(21) == 42
+    tracing.count("ignored")
+
+
+def test_span_nesting_and_summary(tmp_path):
+    out = tmp_path / "trace.jsonl"
+    tracing.enable(str(out))
+    try:
+        with tracing.span("outer", phase="a") as attrs:
+            with tracing.span("inner"):
+                tracing.count("things", 3)
+            attrs["extra"] = 1
+    finally:
+        tracing.disable(command="test")
+    lines = [json.loads(line) for line in out.read_text().splitlines()]
+    by_name = {line.get("name"): line for line in lines if line["type"] == "span"}
+    assert by_name["inner"]["depth"] == 1
+    assert by_name["outer"]["depth"] == 0
+    assert by_name["outer"]["extra"] == 1
+    summary = lines[-1]
+    assert summary["type"] == "summary"
+    assert summary["counters"] == {"things": 3}
+    assert summary["spans"]["outer"]["count"] == 1
+    assert not tracing.enabled()
+
+
+def test_cli_trace_file_covers_kdf_sql_and_aes(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    trace_file = tmp_path / "trace.jsonl"
+
+    result = runner.invoke(
+        cli,
+        ["--trace-file", str(trace_file), "add", "myapp", "dev", "API_KEY"],
+        input="masterpass\nsecret123\nsecret123\n",
+    )
+    assert result.exit_code == 0
+    lines = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    names = {line["name"] for line in lines if line["type"] == "span"}
+    assert {"imports", "config.load", "db.open", "kdf", "aes.encrypt", "sql"} <= names
+    summary = lines[-1]
+    assert summary["command"] == "add"
+    assert summary["counters"]["kdf.calls"] >= 1
+    assert summary["counters"]["sql.commits"] >= 1
+    assert not tracing.enabled()
@@ -0,0 +1,206 @@
+import os
+import threading
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from vault import tracing
+from vault.cli import cli
+from vault.crypto.kdf import KdfParams
+from vault.exceptions import LockTimeoutError
+from vault.storage.db import VaultDB
+from vault.storage.watch import WorkspaceWatcher
+from vault.storage.workspace import load_manifest, save_manifest, sync_workspace
+
+FAST_KDF = KdfParams.decode("pbkdf2-sha256$i=1000")
+
+
+def _value(db, key):
+    return db.decrypt_secret(db.get_secret("app", "dev", key), "masterpass")
+
+
+def _setup(tmp_path, db, names=("a.pem", "b.pem", "c.pem")):
+    for name in names:
+        src = tmp_path / name
+        src.write_bytes(name.encode())
+        db.add_file_secret("app", "dev", name, str(src), "masterpass")
+    workspace = tmp_path / "workspace"
+    sync_workspace(db, "app", "dev", "masterpass", workspace)
+    return workspace
+
+
+def _edit(path, data):
+    path.write_bytes(data)
+    # Make the change visible even on coarse mtime filesystems
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_flush_batches_changes_and_skips_noop_saves(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        workspace = _setup(tmp_path, db)
+        before = db.get_secret("app", "dev", "c.pem").updated_at
+        with WorkspaceWatcher(db, "masterpass", workspace, use_inotify=False) as w:
+            assert w.tracked == ["app/dev/a.pem", "app/dev/b.pem", "app/dev/c.pem"]
+            _edit(workspace / "a.pem", b"new a")
+            _edit(workspace / "b.pem", b"new b")
+            _edit(workspace / "c.pem", b"c.pem")  # saved without changes
+            changed = w.scan()
+            assert sorted(changed) == ["a.pem", "b.pem", "c.pem"]
+
+            tracer = tracing.enable(str(tmp_path / "trace.jsonl"))
+            try:
+                batch = w.flush(changed)
+            finally:
+                tracing.disable()
+            # One KDF for the whole batch, one write transaction
+            assert tracer.counters["kdf.calls"] == 1
+            assert batch.written == ["app/dev/a.pem", "app/dev/b.pem"]
+            assert batch.unchanged == ["app/dev/c.pem"]
+            assert _value(db, "a.pem") == b"new a"
+            assert db.get_secret("app", "dev", "c.pem").updated_at == before
+            assert w.scan() == []
+
+        # The manifest now matches the vault: a re-sync rewrites nothing
+        result = sync_workspace(db, "app", "dev", "masterpass", workspace)
+        assert result.written == [] and not result.conflicts
+        entry = load_manifest(workspace)["app/dev/a.pem"]
+        assert entry["fingerprint"] == db.get_secret("app", "dev", "a.pem").fingerprint
+
+
+def test_vault_side_changes_are_conflicts(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        workspace = _setup(tmp_path, db, names=("a.pem",))
+        src = tmp_path / "elsewhere" / "a.pem"
+        src.parent.mkdir()
+        src.write_bytes(b"from the vault")
+        db.add_file_secret("app", "dev", "a.pem", str(src), "masterpass")
+
+        with WorkspaceWatcher(db, "masterpass", workspace, "app", "dev") as w:
+            _edit(workspace / "a.pem", b"local edit")
+            batch = w.flush(w.scan())
+        assert batch.conflicts == ["app/dev/a.pem"] and not batch.written
+        assert _value(db, "a.pem") == b"from the vault"
+
+
+def test_failed_batch_leaves_the_manifest_alone(tmp_path, monkeypatch):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        workspace = _setup(tmp_path, db, names=("a.pem", "b.pem"))
+        with WorkspaceWatcher(db, "masterpass", workspace, use_inotify=False) as w:
+            _edit(workspace / "a.pem", b"new a")
+            _edit(workspace / "b.pem", b"new b")
+            changed = w.scan()
+            add_secret = db.add_secret
+            calls = []
+
+            def busy_on_second(record):
+                calls.append(record.key)
+                if len(calls) == 2:
+                    raise LockTimeoutError("vault is locked")
+                add_secret(record)
+
+            # The whole transaction (a.pem included) is rolled back
+            monkeypatch.setattr(db, "add_secret", busy_on_second)
+            with pytest.raises(LockTimeoutError):
+                w.flush(changed)
+            assert _value(db, "a.pem") == b"a.pem"
+            monkeypatch.setattr(db, "add_secret", add_secret)
+
+            batch = w.flush(changed)
+            assert batch.written == ["app/dev/a.pem", "app/dev/b.pem"]
+            assert not batch.conflicts
+            assert _value(db, "a.pem") == b"new a"
+
+
+def test_files_claimed_by_several_entries_are_not_written_back(tmp_path):
+    with VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF) as db:
+        for environment in ("dev", "prod"):
+            src = tmp_path / environment / "app.json"
+            src.parent.mkdir()
+            src.write_bytes(environment.upper().encode() + b"CONF")
+            db.add_file_secret("app", environment, "CONF", str(src), "masterpass")
+        workspace = tmp_path / "workspace"
+        sync_workspace(db, "app", "dev", "masterpass", workspace)
+        dev_entry = load_manifest(workspace)["app/dev/CONF"]
+        # As left by older versions, which let prod overwrite dev's copy
+        sync_workspace(db, "app", "prod", "masterpass", workspace, force=True)
+        manifest = load_manifest(workspace)
+        manifest["app/dev/CONF"] = dev_entry
+        save_manifest(workspace, manifest)
+
+        with WorkspaceWatcher(db, "masterpass", workspace, "app", "dev") as w:
+            _edit(workspace / "app.json", b"PRODCONF edited")
+            batch = w.flush(w.scan())
+        assert batch.conflicts == ["app/dev/CONF"] and not batch.written
+        assert (
+            db.decrypt_secret(db.get_secret("app", "dev", "CONF"), "masterpass")
+            == b"DEVCONF"
+        )
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_run_debounces_and_writes_back(tmp_path, use_inotify):
+    # The watcher runs on its own thread
+    db = VaultDB(str(tmp_path / "vault.db"), kdf=FAST_KDF, check_same_thread=False)
+    workspace = _setup(tmp_path, db)
+    # Edited before the watcher started: picked up straight away
+    _edit(workspace / "c.pem", b"offline edit")
+    batches = []
+    stop = threading.Event()
+    watcher = WorkspaceWatcher(
+        db,
+        "masterpass",
+        workspace,
+        debounce=0.3,
+        poll_interval=0.05,
+        use_inotify=use_inotify,
+    )
+    thread = threading.Thread(
+        target=watcher.run, kwargs={"stop": stop, "on_batch": batches.append}
+    )
+    thread.start()
+
+    def wait_for(name):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if name in [n for b in batches for n in b.written]:
+                return
+            time.sleep(0.02)
+
+    try:
+        wait_for("app/dev/c.pem")
+        # A burst of saves ends up as one write
+        for i in range(5):
+            _edit(workspace / "a.pem", f"draft {i}".encode())
+            time.sleep(0.02)
+        wait_for("app/dev/a.pem")
+    finally:
+        stop.set()
+        thread.join()
+        watcher.close()
+    written = [n for b in batches for n in b.written]
+    assert written.count("app/dev/a.pem") == 1
+    assert "app/dev/c.pem" in written
+    assert _value(db, "a.pem") == b"draft 4"
+    assert _value(db, "c.pem") == b"offline edit"
+    db.close()
+
+
+def test_workspace_import_is_watchable(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    src = tmp_path / "app.pem"
+    src.write_bytes(b"pem")
+    runner.invoke(
+        cli, ["add_file", "myapp", "dev", str(src)], input="masterpass\nmasterpass\n"
+    )
+    workspace_dir = tmp_path / "workspace"
+    runner.invoke(cli, ["config", "set", "workspace_dir", str(workspace_dir)])
+    runner.invoke(
+        cli, ["workspace", "import", "myapp", "dev", "app.pem"], input="masterpass\n"
+    )
+    entry = load_manifest(workspace_dir)["myapp/dev/app.pem"]
+    assert entry["path"] == "app.pem" and entry["size"] == 3
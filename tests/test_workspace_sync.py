@@ -0,0 +1,161 @@
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.storage.db import VaultDB
+from vault.storage.workspace import (
+    CONFLICT_EDITED,
+    CONFLICT_NOT_OWNED,
+    CONFLICT_SHARED_NAME,
+    load_manifest,
+    sync_workspace,
+)
+
+
+def _add_files(db, tmp_path, contents):
+    for name, data in contents.items():
+        src = tmp_path / name
+        src.write_bytes(data)
+        db.add_file_secret("app", "dev", name, str(src), "masterpass")
+
+
+def test_sync_is_incremental_and_preserves_local_edits(tmp_path):
+    workspace = tmp_path / "workspace"
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        _add_files(db, tmp_path, {"a.jks": b"A" * 100, "b.pem": b"B", "c.p12": b"C"})
+        db.add_text_secret("app", "dev", "API_KEY", "not-a-file", "masterpass")
+
+        first = sync_workspace(db, "app", "dev", "masterpass", workspace, workers=2)
+        assert sorted(first.written) == [
+            "app/dev/a.jks",
+            "app/dev/b.pem",
+            "app/dev/c.p12",
+        ]
+        assert (workspace / "a.jks").read_bytes() == b"A" * 100
+        assert not (workspace / "API_KEY").exists()
+        assert (workspace / "a.jks").stat().st_mode & 0o777 == 0o600
+        assert set(load_manifest(workspace)) == set(first.written)
+
+        second = sync_workspace(db, "app", "dev", "masterpass", workspace)
+        assert second.written == []
+        assert len(second.unchanged) == 3
+
+        # Vault-side change is picked up; a local edit is not clobbered
+        _add_files(db, tmp_path, {"b.pem": b"B2"})
+        (workspace / "c.p12").write_bytes(b"edited locally")
+        third = sync_workspace(db, "app", "dev", "masterpass", workspace)
+        assert third.written == ["app/dev/b.pem"]
+        assert third.conflicts == ["app/dev/c.p12"]
+        assert third.reasons == {"app/dev/c.p12": CONFLICT_EDITED}
+        assert (workspace / "b.pem").read_bytes() == b"B2"
+        assert (workspace / "c.p12").read_bytes() == b"edited locally"
+
+        # A deleted workspace file is restored
+        (workspace / "a.jks").unlink()
+        fourth = sync_workspace(db, "app", "dev", "masterpass", workspace)
+        assert fourth.written == ["app/dev/a.jks"]
+
+
+def test_sync_never_overwrites_files_it_does_not_own(tmp_path):
+    workspace = tmp_path / "workspace"
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        for environment in ("dev", "prod"):
+            src = tmp_path / environment / "app.json"
+            src.parent.mkdir()
+            src.write_bytes(environment.encode())
+            db.add_file_secret("app", environment, "CONF", str(src), "masterpass")
+
+        assert sync_workspace(db, "app", "dev", "masterpass", workspace).written
+        # Same file name from another environment
+        prod = sync_workspace(db, "app", "prod", "masterpass", workspace)
+        assert prod.conflicts == ["app/prod/CONF"] and not prod.written
+        assert prod.reasons["app/prod/CONF"] == CONFLICT_NOT_OWNED
+        assert (workspace / "app.json").read_bytes() == b"dev"
+
+        # With --force the file changes hands in the manifest
+        prod = sync_workspace(db, "app", "prod", "masterpass", workspace, force=True)
+        assert prod.written == ["app/prod/CONF"]
+        assert set(load_manifest(workspace)) == {"app/prod/CONF"}
+
+        # The user's own file, not in the manifest
+        (workspace / "b.pem").write_bytes(b"mine")
+        _add_files(db, tmp_path, {"b.pem": b"vault"})
+        dev = sync_workspace(db, "app", "dev", "masterpass", workspace)
+        assert dev.conflicts == ["app/dev/CONF", "app/dev/b.pem"]
+        assert dev.reasons["app/dev/b.pem"] == CONFLICT_NOT_OWNED
+        assert (workspace / "b.pem").read_bytes() == b"mine"
+
+        # Two secrets of one environment with the same file name
+        other = tmp_path / "other" / "b.pem"
+        other.parent.mkdir()
+        other.write_bytes(b"other")
+        db.add_file_secret("app", "dev", "B_COPY", str(other), "masterpass")
+        dev = sync_workspace(db, "app", "dev", "masterpass", workspace, force=True)
+        assert sorted(dev.conflicts) == ["app/dev/B_COPY", "app/dev/b.pem"]
+        assert set(dev.reasons.values()) == {CONFLICT_SHARED_NAME}
+        assert dev.written == ["app/dev/CONF"]
+        assert (workspace / "b.pem").read_bytes() == b"mine"
+
+
+def test_sync_skips_secrets_deleted_while_it_runs(tmp_path):
+    workspace = tmp_path / "workspace"
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        _add_files(db, tmp_path, {"a.jks": b"A", "b.pem": b"B"})
+        list_entries = db.list_entries
+
+        def list_then_delete(*args):
+            entries = list(list_entries(*args))
+            db.delete_secret("app", "dev", "b.pem")
+            return entries
+
+        db.list_entries = list_then_delete
+        result = sync_workspace(db, "app", "dev", "masterpass", workspace)
+        assert result.written == ["app/dev/a.jks"]
+        assert not (workspace / "b.pem").exists()
+
+
+def test_cli_workspace_sync(tmp_path, monkeypatch):
+    runner = CliRunner()
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    jks_file = tmp_path / "release.jks"
+    jks_file.write_bytes(b"keystore")
+    runner.invoke(
+        cli,
+        ["add_file", "myapp", "dev", str(jks_file)],
+        input="masterpass\nmasterpass\n",
+    )
+    workspace_dir = tmp_path / "workspace"
+    runner.invoke(cli, ["config", "set", "workspace_dir", str(workspace_dir)])
+
+    result = runner.invoke(
+        cli, ["workspace", "sync", "myapp", "dev"], input="masterpass\n"
+    )
+    assert result.exit_code == 0
+    assert "Synced 1 file(s), 0 unchanged" in result.output
+    assert (workspace_dir / "release.jks").read_bytes() == b"keystore"
+
+    result = runner.invoke(
+        cli, ["workspace", "sync", "myapp", "dev"], input="masterpass\n"
+    )
+    assert "Synced 0 file(s), 1 unchanged" in result.output
+
+    # Each kind of conflict says whether --force can help
+    (workspace_dir / "release.jks").write_bytes(b"edited")
+    result = runner.invoke(
+        cli, ["workspace", "sync", "myapp", "dev"], input="masterpass\n"
+    )
+    assert "edited in the workspace since it was synced" in result.output
+    notes = tmp_path / "notes.txt"
+    notes.write_bytes(b"vault notes")
+    runner.invoke(
+        cli,
+        ["add_file", "myapp", "dev", str(notes)],
+        input="masterpass\nmasterpass\n",
+    )
+    (workspace_dir / "notes.txt").write_bytes(b"my own notes")
+    result = runner.invoke(
+        cli, ["workspace", "sync", "myapp", "dev"], input="masterpass\n"
+    )
+    assert "notes.txt: its file in the workspace was not synced" in result.output
+    assert (workspace_dir / "notes.txt").read_bytes() == b"my own notes"
@@ -0,0 +1,117 @@
+import os
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+from vault.cli import cli
+from vault.storage.db import VaultDB
+
+
+@pytest.fixture
+def db(tmp_path):
+    src = tmp_path / "key.jks"
+    src.write_bytes(b"keystore-bytes")
+    with VaultDB(str(tmp_path / "vault.db")) as db:
+        db.add_file_secret("app", "prod", "key.jks", str(src), "masterpass")
+        yield db
+
+
+def test_write_file_secret_to_pipe(db):
+    read_fd, write_fd = os.pipe()
+    try:
+        written = db.write_file_secret_to(
+            "app", "prod", "key.jks", "masterpass", write_fd
+        )
+        assert written == len(b"keystore-bytes")
+        assert os.read(read_fd, 100) == b"keystore-bytes"
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+@pytest.mark.skipif(not hasattr(os, "memfd_create"), reason="Linux only")
+def test_memfd_is_readable_via_proc_and_sealed(db):
+    fd = db.open_file_secret_memfd("app", "prod", "key.jks", "masterpass")
+    try:
+        with open(f"/proc/self/fd/{fd}", "rb") as f:
+            assert f.read() == b"keystore-bytes"
+        with pytest.raises(PermissionError):
+            os.write(fd, b"tamper")
+    finally:
+        os.close(fd)
+
+
+def _setup(runner, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("VAULT_CONFIG_DIR", str(tmp_path / ".vault-cli"))
+    runner.invoke(cli, ["setup"], input="\n\n\n\n")
+    jks_file = tmp_path / "test.jks"
+    jks_file.write_bytes(b"fake-jks-content")
+    runner.invoke(
+        cli,
+        ["add_file", "myapp", "dev", str(jks_file)],
+        input="masterpass\nmasterpass\n",
+    )
+
+
+def test_cli_get_file_stdout(tmp_path, monkeypatch):
+    runner = CliRunner()
+    _setup(runner, tmp_path, monkeypatch)
+    result = runner.invoke(
+        cli, ["get_file", "myapp", "dev", "test.jks", "--stdout"], input="masterpass\n"
+    )
+    assert result.exit_code == 0
+    assert b"fake-jks-content" in result.stdout_bytes
+    assert not list(tmp_path.glob("vault_test_*.jks"))
+
+
+@pytest.mark.skipif(not hasattr(os, "memfd_create"), reason="Linux only")
+def test_cli_get_file_exec_memfd(tmp_path, monkeypatch):
+    runner = CliRunner()
+    _setup(runner, tmp_path, monkeypatch)
+    check = (
+        "import sys; "
+        "sys.exit(0 if open(sys.argv[1], 'rb').read() == b'fake-jks-content' else 3)"
+    )
+    cmd = f'{sys.executable} -c "{check}" {{}}'
+    result = runner.invoke(
+        cli,
+        ["get_file", "myapp", "dev", "test.jks", "--exec", cmd],
+        input="masterpass\n",
+    )
+    assert result.exit_code == 0
+
+    # A command that cannot be run is reported, and the memfd still closed
+    opened, closed = [], []
+    open_memfd = VaultDB.open_file_secret_memfd
+    close = os.close
+
+    def recording_open(*args):
+        opened.append(open_memfd(*args))
+        return opened[-1]
+
+    def recording_close(fd):
+        closed.append(fd)
+        close(fd)
+
+    monkeypatch.setattr(VaultDB, "open_file_secret_memfd", recording_open)
+    monkeypatch.setattr(os, "close", recording_close)
+    result = runner.invoke(
+        cli,
+        ["get_file", "myapp", "dev", "test.jks", "--exec", "no-such-vault-cmd {}"],
+        input="masterpass\n",
+    )
+    assert result.exit_code == 127
+    assert "[ERROR] Cannot run no-such-vault-cmd" in result.output
+    assert len(opened) == 1 and opened[0] in closed
+
+    # A blank command is refused before anything is decrypted
+    for blank in ("", "  "):
+        result = runner.invoke(
+            cli,
+            ["get_file", "myapp", "dev", "test.jks", "--exec", blank],
+            input="masterpass\n",
+        )
+        assert result.exit_code == 2 and "--exec needs a command" in result.output
+    assert len(opened) == 1